@@ -0,0 +1,333 @@
+"""
+AT命令宏 - 不依赖Qt
+
+宏脚本每行一条语句，按设备响应的速度逐条执行：每条命令等响应结束（结束行、
+单行响应或空闲超时）就发出下一条，不插入固定的等待。图形界面、命令行工具共用，
+执行命令的方式由调用方提供。
+
+语法（# 开头为注释，关键字不区分大小写）:
+  AT+...                     发送命令并等待响应结束，响应中有 +LOGERROR 时中止
+  set 名称 = 值              变量；值是整数表达式（+ - * / // %）时按整数计算，否则为文本
+  for 名称 in 1..100 [step 2]  范围循环（含两端）
+  for 名称 in 10,20,30       列表循环
+  repeat N                   重复N次
+  end                        结束 for/repeat
+  expect 正则                上一条命令的响应中须有匹配的行，否则中止
+  wait 正则 [timeout 秒]     等待匹配的一行（从上一条命令发出后收到的行中查找）
+  onerror continue|abort     遇到 +LOGERROR 时继续执行或中止（默认中止）
+  print 文本                 输出一行文本
+  abort 文本                 中止宏
+
+命令、正则和文本中的 ${名称} 替换为变量值；expect/wait 正则中的命名分组
+(?P<名称>...) 匹配后写入变量。例:
+  set n = 5
+  for i in 1..${n}
+    AT+LOGINSERT=10010000000${i},2024,1,1,12,0,${i}
+    expect \\+LOGOK
+  end
+  AT+LOGCOUNT
+  expect ^(?P<total>\\d+)$
+  print 共 ${total} 条
+"""
+
+import ast
+import asyncio
+import operator
+import re
+import time
+from collections import deque, namedtuple
+
+from at_protocol import PREFIX_ERROR
+
+WAIT_TIMEOUT = 10.0  # wait 的默认超时（秒）
+MAX_BUFFERED_LINES = 1000  # wait 可以查找的最近收到的行数
+
+Step = namedtuple("Step", "line kind args body")
+StepResult = namedtuple("StepResult", "line kind text elapsed ok detail")
+
+_VARIABLE = re.compile(r"\$\{(\w+)\}")
+_RANGE = re.compile(r"^(\S+)\s+in\s+(.+?)\.\.(.+?)(?:\s+step\s+(\S+))?$", re.IGNORECASE)
+_LIST = re.compile(r"^(\S+)\s+in\s+(.+)$", re.IGNORECASE)
+_SET = re.compile(r"^(\w+)\s*=\s*(.*)$")
+_WAIT = re.compile(r"^(.*?)(?:\s+timeout\s+([\d.]+))?$", re.IGNORECASE)
+_OPERATORS = {
+    ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul,
+    ast.FloorDiv: operator.floordiv, ast.Div: operator.floordiv, ast.Mod: operator.mod,
+}
+
+
+class MacroError(Exception):
+    """宏脚本语法错误"""
+
+    def __init__(self, line, message):
+        super().__init__(f"第 {line} 行: {message}")
+        self.line = line
+
+
+class MacroAbort(Exception):
+    """宏执行中止（命令出错、expect不匹配、等待超时或abort语句）"""
+
+
+def parse_macro(text):
+    """解析宏脚本，返回Step列表（for/repeat的body为嵌套的Step列表）"""
+    root = []
+    stack = [(root, None)]
+    for number, raw in enumerate(text.splitlines(), 1):
+        line = raw.strip()
+        if not line or line.startswith('#'):
+            continue
+        if line.upper().startswith("AT"):
+            stack[-1][0].append(Step(number, "command", line, None))
+            continue
+        keyword, _, rest = line.partition(' ')
+        keyword = keyword.lower()
+        rest = rest.strip()
+        if keyword == "end":
+            if len(stack) == 1:
+                raise MacroError(number, "多余的 end")
+            stack.pop()
+        elif keyword in ("for", "repeat"):
+            if keyword == "for" and not (_RANGE.match(rest) or _LIST.match(rest)):
+                raise MacroError(number, "for 的格式为: for 名称 in 起..止 [step 步长] 或 for 名称 in a,b,c")
+            if keyword == "repeat" and not rest:
+                raise MacroError(number, "repeat 需要次数")
+            step = Step(number, keyword, rest, [])
+            stack[-1][0].append(step)
+            stack.append((step.body, step))
+        elif keyword == "set":
+            match = _SET.match(rest)
+            if not match:
+                raise MacroError(number, "set 的格式为: set 名称 = 值")
+            stack[-1][0].append(Step(number, "set", match.groups(), None))
+        elif keyword in ("expect", "wait"):
+            if not rest:
+                raise MacroError(number, f"{keyword} 需要正则表达式")
+            pattern, timeout = _WAIT.match(rest).groups() if keyword == "wait" else (rest, None)
+            try:
+                re.compile(_VARIABLE.sub("x", pattern))
+            except re.error as e:
+                raise MacroError(number, f"正则表达式错误: {e}")
+            stack[-1][0].append(Step(number, keyword, (pattern, float(timeout or WAIT_TIMEOUT)),
+                                     None))
+        elif keyword == "onerror":
+            if rest.lower() not in ("continue", "abort"):
+                raise MacroError(number, "onerror 只能是 continue 或 abort")
+            stack[-1][0].append(Step(number, "onerror", rest.lower(), None))
+        elif keyword in ("print", "abort"):
+            stack[-1][0].append(Step(number, keyword, rest, None))
+        else:
+            raise MacroError(number, f"未知语句: {keyword}")
+    if len(stack) > 1:
+        raise MacroError(stack[-1][1].line, f"{stack[-1][1].kind} 缺少 end")
+    return root
+
+
+def single_command(text):
+    """脚本只有一条不含变量的命令语句时返回该命令，否则返回None
+
+    这样的脚本不需要宏的开始/结束提示和耗时汇总，调用方可以直接发送。
+    """
+    try:
+        steps = parse_macro(text)
+    except MacroError:
+        return None
+    if len(steps) == 1 and steps[0].kind == "command" and not _VARIABLE.search(steps[0].args):
+        return steps[0].args
+    return None
+
+
+def count_commands(steps):
+    """脚本中命令语句的数量（不展开循环）"""
+    return sum(1 if step.kind == "command" else count_commands(step.body or [])
+               for step in steps)
+
+
+def _evaluate(text):
+    """整数表达式求值，不是整数表达式时返回原文本"""
+    try:
+        tree = ast.parse(text.strip(), mode="eval")
+    except SyntaxError:
+        return text
+
+    def visit(node):
+        if isinstance(node, ast.Constant) and isinstance(node.value, int):
+            return node.value
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+            value = visit(node.operand)
+            return -value if isinstance(node.op, ast.USub) else value
+        if isinstance(node, ast.BinOp) and type(node.op) in _OPERATORS:
+            return _OPERATORS[type(node.op)](visit(node.left), visit(node.right))
+        raise ValueError
+
+    try:
+        return visit(tree.body)
+    except (ValueError, ZeroDivisionError):
+        return text
+
+
+class MacroRunner:
+    """执行解析后的宏
+
+    execute(command) 为协程，发出命令并在响应结束后返回响应行列表；
+    收到的每一行（包括不属于命令的输出）应交给feed()，供 wait 查找。
+    每完成一条命令、expect或wait调用一次 on_step(StepResult)，elapsed单位为秒。
+    """
+
+    def __init__(self, execute, on_step=None, on_print=None, variables=None):
+        self.execute = execute
+        self.on_step = on_step
+        self.on_print = on_print or print
+        self.variables = dict(variables or {})
+        self.stats = {}  # 行号 -> [语句, 次数, 总耗时, 最大耗时]
+        self.commands = 0  # 已执行的命令数
+        self.started = None
+        self._abort_on_error = True
+        self._response = []  # 上一条命令的响应
+        self._received = deque(maxlen=MAX_BUFFERED_LINES)  # 上一条命令发出后收到的行
+        self._line_event = asyncio.Event()
+
+    def feed(self, line):
+        self._received.append(line)
+        self._line_event.set()
+
+    @property
+    def elapsed(self):
+        return time.monotonic() - self.started if self.started else 0.0
+
+    async def run(self, steps):
+        """执行全部语句，中止时抛出MacroAbort"""
+        self.started = time.monotonic()
+        await self._run_block(steps)
+
+    async def _run_block(self, steps):
+        for step in steps:
+            handler = getattr(self, f"_do_{step.kind}")
+            await handler(step)
+
+    def _substitute(self, step, text):
+        def replace(match):
+            name = match.group(1)
+            if name not in self.variables:
+                raise MacroAbort(f"第 {step.line} 行: 未定义的变量 {name}")
+            return str(self.variables[name])
+        return _VARIABLE.sub(replace, text)
+
+    def _integer(self, step, text):
+        value = _evaluate(self._substitute(step, text))
+        if not isinstance(value, int):
+            raise MacroAbort(f"第 {step.line} 行: 需要整数: {text}")
+        return value
+
+    def _record(self, step, text, started, ok, detail=""):
+        result = StepResult(step.line, step.kind, text, time.monotonic() - started, ok, detail)
+        # 汇总时命令按脚本原文（未替换变量）显示
+        label = step.args if step.kind == "command" else text
+        entry = self.stats.setdefault(step.line, [label, 0, 0.0, 0.0])
+        entry[1] += 1
+        entry[2] += result.elapsed
+        entry[3] = max(entry[3], result.elapsed)
+        if self.on_step:
+            self.on_step(result)
+        if not ok:
+            raise MacroAbort(f"第 {step.line} 行 {text}: {detail}")
+
+    async def _do_command(self, step):
+        command = self._substitute(step, step.args)
+        self._received.clear()
+        started = time.monotonic()
+        try:
+            self._response = await self.execute(command)
+        except MacroAbort:
+            raise
+        except Exception as e:
+            self._record(step, command, started, False, str(e) or type(e).__name__)
+        self.commands += 1
+        error = next((line for line in self._response if line.startswith(PREFIX_ERROR)), None)
+        self._record(step, command, started, error is None or not self._abort_on_error,
+                     error or "")
+
+    def _match(self, step, pattern, lines):
+        regex = re.compile(self._substitute(step, pattern))
+        for line in lines:
+            match = regex.search(line)
+            if match:
+                self.variables.update(match.groupdict())
+                return match
+        return None
+
+    async def _do_expect(self, step):
+        pattern = step.args[0]
+        started = time.monotonic()
+        match = self._match(step, pattern, self._response)
+        self._record(step, f"expect {pattern}", started, match is not None,
+                     "" if match else "响应中没有匹配的行")
+
+    async def _do_wait(self, step):
+        pattern, timeout = step.args
+        started = time.monotonic()
+        deadline = started + timeout
+        checked = 0
+        while True:
+            lines = list(self._received)
+            match = self._match(step, pattern, lines[checked:])
+            checked = len(lines)
+            if match:
+                break
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            self._line_event.clear()
+            try:
+                await asyncio.wait_for(self._line_event.wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
+        self._record(step, f"wait {pattern}", started, match is not None,
+                     "" if match else f"{timeout:g} 秒内没有匹配的行")
+
+    async def _do_set(self, step):
+        name, value = step.args
+        self.variables[name] = _evaluate(self._substitute(step, value))
+
+    async def _do_for(self, step):
+        match = _RANGE.match(step.args)
+        if match:
+            name, first, last, increment = match.groups()
+            first, last = self._integer(step, first), self._integer(step, last)
+            increment = self._integer(step, increment) if increment else (1 if last >= first else -1)
+            if increment == 0:
+                raise MacroAbort(f"第 {step.line} 行: step 不能为0")
+            values = range(first, last + (1 if increment > 0 else -1), increment)
+        else:
+            name, items = _LIST.match(step.args).groups()
+            values = [_evaluate(item) for item in self._substitute(step, items).split(',')]
+        for value in values:
+            self.variables[name] = value
+            await self._run_block(step.body)
+
+    async def _do_repeat(self, step):
+        for _ in range(self._integer(step, step.args)):
+            await self._run_block(step.body)
+
+    async def _do_onerror(self, step):
+        self._abort_on_error = step.args == "abort"
+
+    async def _do_print(self, step):
+        self.on_print(self._substitute(step, step.args))
+
+    async def _do_abort(self, step):
+        raise MacroAbort(self._substitute(step, step.args) or f"第 {step.line} 行: abort")
+
+
+def step_statistics(stats):
+    """MacroRunner.stats -> [(行号, 语句, 次数, 总耗时, 平均, 最大)]，按行号排序"""
+    return [(line, text, count, total, total / count, peak)
+            for line, (text, count, total, peak) in sorted(stats.items())]
+
+
+def format_statistics(stats):
+    """每步耗时汇总的文本行（毫秒）"""
+    lines = []
+    for line, text, count, total, average, peak in step_statistics(stats):
+        lines.append(f"第{line:>4}行 ×{count:<5} 平均 {average * 1000:7.1f} ms  "
+                     f"最大 {peak * 1000:7.1f} ms  合计 {total:7.2f} s  {text}")
+    return lines
@@ -0,0 +1,113 @@
+"""
+AT命令流水线 - 不依赖Qt
+
+BLE上每条命令的往返至少要等一到两个连接间隔。只读命令之间互不影响，
+可以不等上一条的响应就发出下一条：最多window条命令同时在途，
+设备按收到的顺序逐条响应，响应行依次分配给最早发出、尚未结束的命令。
+
+会修改设备状态的命令（AT+LOGCLEAR、AT+LOGINSERT等）、没有明确结束行的命令
+（AT+LOGHELP、AT+LOGSTATUS、AT+LOGSTATS）以及多行脚本要等之前的命令全部结束后才发出，
+在它们结束之前后续命令也不会发出。
+批量写入时可以打开pipelined_writes，让只追加记录的AT+LOGINSERT也同时在途。
+"""
+
+import asyncio
+from collections import deque
+
+from at_protocol import APPEND_COMMANDS
+
+DEFAULT_WINDOW = 4
+
+
+class CommandPipeline:
+    """在途命令窗口，元素为at_protocol.CommandProgress（按发送顺序）"""
+
+    def __init__(self, window=DEFAULT_WINDOW, pipelined_writes=False):
+        self.window = max(1, window)
+        self.pipelined_writes = pipelined_writes
+        self.outstanding = deque()
+        self._blocking = 0  # 在途的独占命令数
+        self._waiters = deque()
+
+    def __len__(self):
+        return len(self.outstanding)
+
+    @property
+    def waiting(self):
+        """等待放行的发送数"""
+        return len(self._waiters)
+
+    @property
+    def head(self):
+        """最早发出、尚未结束的命令"""
+        return self.outstanding[0] if self.outstanding else None
+
+    def may_overlap(self, progress):
+        """命令能否与其他命令同时在途"""
+        return progress.pipelinable or (self.pipelined_writes and progress.name in APPEND_COMMANDS)
+
+    def can_send(self, batch):
+        if not self.outstanding:
+            return True
+        if self._blocking or len(batch) > 1 or not self.may_overlap(batch[0]):
+            return False
+        return len(self.outstanding) < self.window
+
+    async def acquire(self, batch):
+        """等待可以发出batch（一条命令或一个脚本的全部命令）并登记为在途
+
+        调用方应按发送顺序逐个调用（同一时间只有一个协程在等待），以保证发送顺序。
+        """
+        while not self.can_send(batch):
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            await waiter
+        for progress in batch:
+            progress.done = False
+            self.outstanding.append(progress)
+            if not self.may_overlap(progress):
+                self._blocking += 1
+
+    def feed(self, response):
+        """把一行响应（at_protocol.classify_line的结果）分配给最早的在途命令，
+        返回False表示该行是续传的重复记录
+
+        没有在途命令时（例如设备主动输出）原样保留。
+        """
+        progress = self.head
+        if progress is None:
+            return True
+        keep = progress.accept(response)
+        if progress.is_complete(response):
+            self.complete(progress)
+        return keep
+
+    def complete(self, progress):
+        """命令结束（收到结束行、空闲或超时），放行等待的命令"""
+        try:
+            self.outstanding.remove(progress)
+        except ValueError:
+            return
+        progress.done = True
+        if not self.may_overlap(progress):
+            self._blocking -= 1
+        self._wake()
+        if progress.on_done is not None:
+            progress.on_done(progress)
+
+    def clear(self):
+        """放弃全部在途命令（连接断开），返回它们的列表
+
+        不调用on_done：续传时由resume()交给新的CommandProgress，不续传时由调用方处理。
+        """
+        pending = list(self.outstanding)
+        self.outstanding.clear()
+        self._blocking = 0
+        self._wake()
+        return pending
+
+    def _wake(self):
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
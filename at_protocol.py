@@ -0,0 +1,304 @@
+"""
+Flash日志AT协议 - 不依赖Qt
+
+UUID、命令编码、通知分包重组为完整行、响应行分类（+LOGDATA解析）和响应结束判断，
+供图形界面、无界面命令行工具和模拟设备共用。
+"""
+
+from collections import namedtuple
+from datetime import datetime
+from enum import IntEnum
+
+# AT命令服务和特征UUID
+AT_SERVICE_UUID = "00006E50-0000-1000-8000-00805F9B34FB"
+AT_TX_CHAR_UUID = "00006E51-0000-1000-8000-00805F9B34FB"
+AT_RX_CHAR_UUID = "00006E52-0000-1000-8000-00805F9B34FB"
+
+SURRON_NAME_PREFIX = "surron-"  # 只处理名称以此开头的设备（不区分大小写）
+LOG_CAPACITY = 3000  # 设备Flash日志容量（循环覆盖）
+
+PREFIX_OK = "+LOGOK:"
+PREFIX_ERROR = "+LOGERROR:"
+PREFIX_DATA = "+LOGDATA:"
+READ_COMPLETE = "Read complete"
+
+# 以 "+LOGOK: Read complete" 结束的读取命令
+DATA_COMMANDS = frozenset({
+    "AT+LOGREADALL", "AT+LOGLATEST", "AT+LOGRANGE", "AT+LOGTIME", "AT+LOGERROR",
+})
+# 只返回一行的命令
+SINGLE_LINE_COMMANDS = frozenset({
+    "AT+LOGCOUNT", "AT+LOGINSERT", "AT+LOGINSERTNOW", "AT+LOGCHECK", "AT+LOGCLEAR",
+})
+# 不修改设备状态、可以安全重发的命令
+READ_ONLY_COMMANDS = DATA_COMMANDS | {
+    "AT+LOGHELP", "AT+LOGSTATUS", "AT+LOGSTATS", "AT+LOGCOUNT", "AT+LOGCHECK",
+}
+# 只追加一条记录、响应只有一行的写命令；批量写入时可以选择让它们同时在途
+APPEND_COMMANDS = frozenset({"AT+LOGINSERT", "AT+LOGINSERTNOW"})
+MAX_TIMESTAMP = 0xFFFFFFFF
+# 无结束标记的多行响应中已知的最后一行（见README响应格式），收到即可提前结束；
+# 这一行不是协议保证的结束标记，固件省略或调换顺序时仍按空闲超时结束，
+# 因此这些命令不与其他命令同时在途（否则后续响应会被算到它们头上）
+RESPONSE_LAST_LINE = {
+    "AT+LOGSTATUS": "Total entries:",
+    "AT+LOGSTATS": "Newest time:",
+}
+
+LogRecord = namedtuple("LogRecord", "total index timestamp code checksum")
+
+
+class LineKind(IntEnum):
+    """响应行类型"""
+    TEXT = 0  # 无前缀的文本（计数、状态/统计的后续行、帮助）
+    OK = 1  # +LOGOK:
+    ERROR = 2  # +LOGERROR:
+    DATA = 3  # +LOGDATA:
+
+
+# 分类后的响应行：text为完整行，body为前缀之后的内容，record为DATA行解析出的LogRecord
+ResponseLine = namedtuple("ResponseLine", "kind text body record")
+
+# 每行都要分类：枚举成员和namedtuple构造都放到模块级，热路径上只剩查表和tuple.__new__
+_TEXT, _OK, _ERROR, _DATA = LineKind.TEXT, LineKind.OK, LineKind.ERROR, LineKind.DATA
+_new_tuple = tuple.__new__
+
+
+def is_surron_device(name):
+    """是否为Surron设备"""
+    return bool(name) and name.lower().startswith(SURRON_NAME_PREFIX)
+
+
+def encode_command(command):
+    """命令补齐行结束符并编码"""
+    if not command.endswith(('\r', '\n')):
+        command += '\r\n'
+    return command.encode('utf-8')
+
+
+def insert_command(code, timestamp):
+    """AT+LOGINSERT 命令（时间按本地时区拆分为年月日时分秒）"""
+    t = datetime.fromtimestamp(timestamp)
+    return (f"AT+LOGINSERT={code.upper()},{t.year},{t.month},{t.day},"
+            f"{t.hour},{t.minute},{t.second}")
+
+
+def command_name(command):
+    """命令名（等号之前的部分，大写）"""
+    return command.strip().partition('=')[0].upper()
+
+
+def _parse_fields(body):
+    fields = body.split(',')
+    if len(fields) != 5:
+        return None
+    try:
+        return _new_tuple(LogRecord, (int(fields[0]), int(fields[1]), int(fields[2]),
+                                      fields[3].upper(), fields[4].upper()))
+    except ValueError:
+        return None
+
+
+# 前缀（含冒号）-> 行类型
+_PREFIX_KINDS = {PREFIX_OK: _OK, PREFIX_ERROR: _ERROR, PREFIX_DATA: _DATA}
+_PREFIX_END = max(len(prefix) for prefix in _PREFIX_KINDS)
+
+
+def classify_line(line):
+    """一次前缀分派得到响应行类型，DATA行同时解析字段
+
+    所有前缀都以 +LOG 开头、以冒号结束：取到第一个冒号为止的前缀查一次表，
+    不逐个尝试startswith；没有冒号时切片为空串，查表落空即为文本行。
+    """
+    end = line.find(':', 4, _PREFIX_END) + 1
+    kind = _PREFIX_KINDS.get(line[:end])
+    if kind is None:
+        return _new_tuple(ResponseLine, (_TEXT, line, line, None))
+    body = line[end:].strip()
+    return _new_tuple(ResponseLine, (kind, line, body, _parse_fields(body) if kind is _DATA else None))
+
+
+def parse_log_data(line):
+    """解析 +LOGDATA 行，格式不符时返回None"""
+    return classify_line(line).record
+
+
+def has_end_marker(command):
+    """命令的响应是否有明确的结束行"""
+    name = command_name(command)
+    return name in DATA_COMMANDS or name in SINGLE_LINE_COMMANDS
+
+
+def is_response_complete(command, line):
+    """收到line后命令的响应是否已经结束
+
+    读取命令以 Read complete 结束，单行命令收到一行即结束，
+    状态、统计以已知的最后一行结束，任何命令收到 +LOGERROR 即结束；
+    其他命令（帮助）无结束标记，由调用方按空闲超时判断。
+    """
+    return _completes(command_name(command), classify_line(line))
+
+
+def _completes(name, response):
+    """is_response_complete的分类后版本（response为ResponseLine）"""
+    kind = response[0]
+    if kind is _ERROR:
+        return True
+    if name in DATA_COMMANDS:
+        return kind is _OK and READ_COMPLETE in response[2]
+    last_line = RESPONSE_LAST_LINE.get(name)
+    if last_line is not None:
+        return response[1].startswith(last_line)
+    return name in SINGLE_LINE_COMMANDS
+
+
+def is_pipelinable(command):
+    """命令能否与其他命令同时在途：只读，且有明确的结束行"""
+    return command_name(command) in READ_ONLY_COMMANDS and has_end_marker(command)
+
+
+class CommandProgress:
+    """正在执行的命令及已确认收到的 +LOGDATA，用于断线后续传
+
+    续传时按命令类型选择代价最小的方式：
+      READALL/LATEST/TIME  从最后确认的时间戳继续（AT+LOGTIME），跳过该时间戳上已收到的记录
+      RANGE                起始序号后移已确认的条数
+      其他只读命令         重发，跳过开头已确认的条数
+    """
+
+    def __init__(self, command, skip_count=0, skip_keys=frozenset()):
+        self.command = command.strip()
+        self.name = command_name(command)
+        self.acked = 0  # 已确认（含跳过）的 +LOGDATA 条数
+        self.last = None  # 最后确认的LogRecord
+        self.answered = False  # 是否收到过任何响应行
+        self.done = False  # 响应已结束（由CommandPipeline设置）
+        self.response = None  # 需要完整响应时设为列表，收到的行（不含重复记录）依次加入
+        self.on_done = None  # 响应结束时由CommandPipeline调用 on_done(progress)
+        self.timed_out = False  # 等待响应超时后放弃
+        self.interrupted = False  # 连接断开后没有续传
+        self.sent_ns = 0  # 发出时刻（time.monotonic_ns），用于计算响应延迟
+        self.quiet = False  # 后台轮询的命令：收发行不输出到通讯日志
+        self._skip_count = skip_count
+        self._skip_keys = skip_keys
+        self._last_keys = set()  # 最后一个时间戳上已收到的 (时间戳, 错误码)
+
+    @property
+    def resumable(self):
+        """中断后是否可以自动续传"""
+        return self.name in READ_ONLY_COMMANDS
+
+    @property
+    def pipelinable(self):
+        return is_pipelinable(self.command)
+
+    @property
+    def ends_on_idle(self):
+        """响应没有明确的结束行，按空闲超时结束（状态、统计收到已知的最后一行时提前结束）"""
+        return not has_end_marker(self.command)
+
+    def accept(self, response):
+        """登记一行响应（ResponseLine），返回False表示是续传产生的重复记录，应丢弃"""
+        record = response.record
+        if record is not None:
+            if self._skip_count:
+                self._skip_count -= 1
+                self.acked += 1
+                return False
+            key = (record.timestamp, record.code)
+            if key in self._skip_keys:
+                return False
+            if self.last is None or record.timestamp != self.last.timestamp:
+                self._last_keys = set()
+            self._last_keys.add(key)
+            self.last = record
+            self.acked += 1
+        self.answered = True
+        if self.response is not None:
+            self.response.append(response.text)
+        return True
+
+    def is_complete(self, response):
+        """收到response后命令是否已结束（ends_on_idle的命令只在出错时返回True）"""
+        return _completes(self.name, response)
+
+    def resume(self):
+        """生成续传用的CommandProgress（沿用已收到的响应和on_done）"""
+        resumed = self._resume()
+        resumed.response = self.response
+        resumed.on_done = self.on_done
+        resumed.quiet = self.quiet
+        return resumed
+
+    def _resume(self):
+        if self.last is None or self.acked == 0:
+            return CommandProgress(self.command)
+        arg = self.command.partition('=')[2]
+        if self.name in ("AT+LOGREADALL", "AT+LOGLATEST", "AT+LOGTIME"):
+            end = arg.split(',')[1] if self.name == "AT+LOGTIME" else MAX_TIMESTAMP
+            return CommandProgress(f"AT+LOGTIME={self.last.timestamp},{end}",
+                                   skip_keys=frozenset(self._last_keys))
+        if self.name == "AT+LOGRANGE":
+            start, end = (int(v) for v in arg.split(','))
+            return CommandProgress(f"AT+LOGRANGE={start + self.acked},{end}")
+        return CommandProgress(self.command, skip_count=self.acked)
+
+
+def _split_lines(text):
+    """按\r、\n和\r\n分行，返回去掉首尾空白后的非空行
+
+    不用str.splitlines：它还会在\x0b、\x0c、\x1c-\x1e、\x85、\u2028等字符处分行，
+    这些字符出现在设备的响应中时不应拆开一行。\r\n替换后多出的空行与其他空行一起丢弃。
+    """
+    if '\r' in text:
+        text = text.replace('\r', '\n')
+    return [line for line in map(str.strip, text.split('\n')) if line]
+
+
+class LineAssembler:
+    """把通知数据重组为完整行
+
+    一行可能被拆分到多个通知中，未结束的字节保留在复用的bytearray里，
+    因此跨通知拆开的多字节UTF-8字符也能正确解码。
+    \\r、\\n和\\r\\n都结束一行：单独的\\r立即交出该行，不必等残行超时；
+    被拆到两个通知中的\\r\\n只多出一个空行，会被丢弃。
+    用rfind在原始字节中找到最后一个行结束符，只解码其前面的完整行（每行只解码一次），
+    残行不解码，也不再把残行与新数据拼成文本后分割。
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()  # 未结束的行
+
+    def feed(self, data):
+        """输入一个通知的数据（bytes或bytearray），返回其中完整的非空行"""
+        buffer = self._buffer
+        end = max(data.rfind(b'\n'), data.rfind(b'\r'))
+        if end < 0:
+            buffer += data
+            return []
+        if buffer:
+            end += len(buffer)
+            buffer += data
+            data = buffer
+        # 通知不超过MTU，切片复制比memoryview对象更省（见benchmarks/bench_receive_alloc.py）
+        text = data[:end].decode('utf-8', 'ignore')
+        if data is buffer:
+            del buffer[:end + 1]
+        elif end + 1 < len(data):
+            buffer += data[end + 1:]
+        return _split_lines(text)
+
+    def feed_text(self, text):
+        """输入已解码的文本，返回其中完整的非空行"""
+        return self.feed(text.encode('utf-8'))
+
+    @property
+    def pending(self):
+        """是否有未结束的行"""
+        return bool(self._buffer)
+
+    def flush(self):
+        """取出剩余的未结束行"""
+        text = self._buffer.decode('utf-8', 'ignore')
+        self._buffer.clear()
+        return _split_lines(text)
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+响应行分类的微基准测试 - 逐个startswith vs 一次前缀分派
+
+旧的接收路径对每一行分别调用 parse_log_data（判断 +LOGDATA 前缀）和
+is_response_complete（判断 +LOGERROR、解析命令名、再判断 +LOGOK）；
+新的路径用 classify_line 一次得到类型和解析结果，之后只比较类型。
+两条路径对同一组响应（读取、计数、状态、统计、错误）的结果须一致。
+
+用法: python benchmarks/bench_classify.py [--entries 3000]
+"""
+
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from at_protocol import (DATA_COMMANDS, PREFIX_DATA, PREFIX_ERROR, PREFIX_OK,  # noqa: E402
+                         READ_COMPLETE, RESPONSE_LAST_LINE, SINGLE_LINE_COMMANDS, LineKind,
+                         LogRecord, _completes, classify_line, command_name)
+from simulated_device import SimulatedLogDevice  # noqa: E402
+
+COMMANDS = ["AT+LOGREADALL", "AT+LOGCOUNT", "AT+LOGSTATUS", "AT+LOGSTATS", "AT+LOGBAD"]
+
+
+def legacy_parse(line):
+    """分类前的 parse_log_data"""
+    if not line.startswith(PREFIX_DATA):
+        return None
+    fields = line[len(PREFIX_DATA):].strip().split(',')
+    if len(fields) != 5:
+        return None
+    try:
+        return LogRecord(int(fields[0]), int(fields[1]), int(fields[2]),
+                         fields[3].upper(), fields[4].upper())
+    except ValueError:
+        return None
+
+
+def legacy_complete(command, line):
+    """分类前的 is_response_complete"""
+    if line.startswith(PREFIX_ERROR):
+        return True
+    name = command_name(command)
+    if name in DATA_COMMANDS:
+        return line.startswith(PREFIX_OK) and READ_COMPLETE in line
+    last_line = RESPONSE_LAST_LINE.get(name)
+    if last_line is not None:
+        return line.startswith(last_line)
+    return name in SINGLE_LINE_COMMANDS
+
+
+def legacy_path(work):
+    out = []
+    for command, _, line in work:
+        record = legacy_parse(line)
+        if line.startswith(PREFIX_ERROR):
+            kind = LineKind.ERROR
+        elif line.startswith(PREFIX_OK):
+            kind = LineKind.OK
+        elif record is not None:
+            kind = LineKind.DATA
+        else:
+            kind = LineKind.TEXT
+        out.append((kind, record, legacy_complete(command, line)))
+    return out
+
+
+def classified_path(work):
+    out = []
+    for _, name, line in work:
+        response = classify_line(line)
+        out.append((response.kind, response.record, _completes(name, response)))
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--entries", type=int, default=3000, help="模拟设备中的日志条数")
+    args = parser.parse_args()
+
+    device = SimulatedLogDevice(entries=args.entries, seed=1)
+    work = [(command, command_name(command), line)
+            for command in COMMANDS for line in device.handle(command)]
+    print(f"{len(work)} 行响应")
+
+    same = legacy_path(work) == classified_path(work)
+    number = 20
+    legacy = min(timeit.repeat(lambda: legacy_path(work), number=number, repeat=9)) / number
+    classified = min(timeit.repeat(lambda: classified_path(work), number=number, repeat=9)) / number
+    per_line = 1e9 / len(work)
+    print(f"  逐个startswith: {legacy * per_line:7.0f} ns/行")
+    print(f"  前缀分派      : {classified * per_line:7.0f} ns/行, 加速 {legacy / classified:4.2f}x, "
+          f"结果{'一致' if same else '不一致!'}")
+    return 0 if same else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+长消息换行格式化的微基准测试
+
+验证控制台实际使用的 wrap_message 的耗时与行长度成线性关系：
+行长度每翻一倍，耗时也应大致翻一倍（每字符耗时基本不变）。
+
+用法: python benchmarks/bench_log_format.py
+"""
+
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from log_format import wrap_message  # noqa: E402
+
+LENGTHS = [1_000, 4_000, 16_000, 64_000, 256_000]
+
+
+def make_line(length, seed=0):
+    """生成类似 LOGSTATS / 十六进制转储的长行"""
+    rng = random.Random(seed)
+    words = []
+    total = 0
+    while total < length:
+        kind = rng.random()
+        if kind < 0.6:
+            word = f"{rng.randrange(256):02X}"
+        elif kind < 0.9:
+            word = f"+LOGDATA:{rng.randrange(3000)},{rng.randrange(3000)},{rng.randrange(1 << 32)}"
+        else:
+            word = "x" * rng.randrange(100, 300) + "<&>"
+        words.append(word)
+        total += len(word) + 1
+    return ' '.join(words)[:length]
+
+
+def main():
+    # 绕过LRU缓存，测量真实的格式化开销
+    fmt = wrap_message.__wrapped__
+
+    print(f"{'长度':>10} {'耗时(ms)':>12} {'ns/字符':>10}")
+    per_char = []
+    for length in LENGTHS:
+        line = make_line(length)
+        number = max(1, 200_000 // length)
+        best = min(timeit.repeat(lambda: fmt(line), number=number, repeat=5)) / number
+        ns = best / length * 1e9
+        per_char.append(ns)
+        print(f"{length:>10} {best * 1000:>12.3f} {ns:>10.1f}")
+
+    ratio = per_char[-1] / per_char[0]
+    print(f"\n最长/最短行的每字符耗时比: {ratio:.2f} (线性时应接近1)")
+
+    # 缓存命中：轮询场景下的重复行
+    line = make_line(4_000)
+    wrap_message.cache_clear()
+    wrap_message(line)
+    hit = min(timeit.repeat(lambda: wrap_message(line), number=10_000, repeat=5)) / 10_000
+    print(f"缓存命中耗时: {hit * 1e9:.0f} ns")
+
+    return 0 if ratio < 3.0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+事件循环模式基准测试 - 线程模式 vs Qt集成模式（qasync） vs 独立进程模式
+
+使用模拟设备，对两种模式运行同一组测试：
+  1. 通知吞吐：AT+LOGREADALL 读取全部日志，统计行/秒和通知到槽函数的延迟
+     （进程模式下通知在工作进程中发出，不统计延迟）
+  2. 命令往返：串行发送 AT+LOGCOUNT，统计发送到收到响应的耗时
+
+用法: QT_QPA_PLATFORM=offscreen python benchmarks/bench_loop_modes.py [--entries 3000] [--rounds 100]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt6.QtCore import QCoreApplication  # noqa: E402
+from PyQt6.QtWidgets import QApplication  # noqa: E402
+
+import ble_controller  # noqa: E402
+from ble_controller import (BLEController, LOOP_MODE_THREAD, LOOP_MODE_QT,  # noqa: E402
+                            LOOP_MODE_PROCESS, QASYNC_AVAILABLE, create_qt_event_loop)
+from ble_process import ProcessBLEController  # noqa: E402
+from log_format import RECEIVED_TYPES, message_type  # noqa: E402
+from simulated_device import SimulatedClient, SimulatedLogDevice, register_device  # noqa: E402
+
+SIM_ADDRESS = "SIM:BE:NC:00:00:01"
+
+
+class TimedClient(SimulatedClient):
+    """记录每条通知发出时刻的模拟客户端"""
+
+    sent_times = []
+
+    async def _notify(self, payload):
+        TimedClient.sent_times.append(time.perf_counter())
+        await super()._notify(payload)
+
+
+class Harness:
+    """在指定模式下驱动控制器并收集接收到的消息"""
+
+    def __init__(self, app, mode, device):
+        self.app = app
+        self.mode = mode
+        self.loop = create_qt_event_loop(app) if mode == LOOP_MODE_QT else None
+        if mode == LOOP_MODE_PROCESS:
+            self.controller = ProcessBLEController(autostart=False, simulated=[device])
+        else:
+            self.controller = BLEController(autostart=False, loop_mode=mode)
+        self.received = []  # (到达时刻, 文本)
+        self.connected = False
+        self.controller.logMessage.connect(self._on_log)
+        self.controller.connectedChanged.connect(self._on_connected)
+
+    def _on_log(self, message, msg_type, timestamp_ns, latency_ns):
+        if message_type(msg_type) in RECEIVED_TYPES:
+            self.received.append((time.perf_counter(), message))
+
+    def _on_connected(self, connected):
+        self.connected = connected
+
+    def wait_for(self, predicate, timeout=60.0):
+        """处理事件直到条件成立"""
+        if self.mode == LOOP_MODE_QT:
+            async def poll():
+                while not predicate():
+                    await asyncio.sleep(0.0005)
+            self.loop.run_until_complete(asyncio.wait_for(poll(), timeout))
+            return
+        deadline = time.monotonic() + timeout
+        while not predicate():
+            QCoreApplication.processEvents()
+            if time.monotonic() > deadline:
+                raise TimeoutError("等待超时")
+            time.sleep(0.0005)
+
+    def setup(self):
+        if self.mode == LOOP_MODE_QT:
+            # Qt模式的循环需要在运行中才能接收任务
+            self.loop.run_until_complete(asyncio.sleep(0))
+            self.controller.start(scan=False)
+        else:
+            self.controller.start(scan=False)
+            self.controller.wait_until_ready(5.0)
+        self.controller.connectDevice(SIM_ADDRESS)
+        self.wait_for(lambda: self.connected)
+        # 等待设备信息输出结束
+        self.wait_for(lambda: True)
+
+    def teardown(self):
+        # 等待最后一条命令的发送间隔结束
+        deadline = time.monotonic() + 0.2
+        self.wait_for(lambda: time.monotonic() > deadline)
+        self.controller.shutdown()
+        if self.loop is not None:
+            self.loop.close()
+            asyncio.set_event_loop(None)
+
+    def read_all(self):
+        """通知吞吐测试"""
+        self.received.clear()
+        TimedClient.sent_times.clear()
+        start = time.perf_counter()
+        self.controller.sendCommand("AT+LOGREADALL")
+        self.wait_for(lambda: self.received and "Read complete" in self.received[-1][1])
+        elapsed = time.perf_counter() - start
+        latencies = [(arrived - sent) * 1000
+                     for (arrived, _), sent in zip(self.received, TimedClient.sent_times)]
+        return len(self.received), elapsed, latencies
+
+    def round_trips(self, rounds):
+        """命令往返测试"""
+        samples = []
+        for _ in range(rounds):
+            count = len(self.received)
+            start = time.perf_counter()
+            self.controller.sendCommand("AT+LOGCOUNT")
+            self.wait_for(lambda: len(self.received) > count)
+            samples.append((time.perf_counter() - start) * 1000)
+        return samples
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def run_mode(app, mode, args):
+    device = dict(address=SIM_ADDRESS, entries=args.entries,
+                  command_latency=args.latency / 1000, seed=1)
+    register_device(SimulatedLogDevice(**device))
+    harness = Harness(app, mode, device)
+    try:
+        harness.setup()
+        lines, elapsed, latencies = harness.read_all()
+        rtts = harness.round_trips(args.rounds)
+    finally:
+        harness.teardown()
+
+    print(f"\n[{mode}]")
+    print(f"  读取全部: {lines} 行, {elapsed * 1000:.1f} ms, {lines / elapsed:,.0f} 行/秒")
+    if mode != LOOP_MODE_PROCESS:
+        print(f"  通知→槽延迟: 中位数 {statistics.median(latencies):.3f} ms, "
+              f"p99 {percentile(latencies, 99):.3f} ms")
+    print(f"  命令往返: 中位数 {statistics.median(rtts):.2f} ms, p99 {percentile(rtts, 99):.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--entries", type=int, default=3000, help="模拟设备中的日志条数")
+    parser.add_argument("--rounds", type=int, default=100, help="命令往返次数")
+    parser.add_argument("--latency", type=float, default=0.0, help="模拟设备命令延迟（毫秒）")
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv[:1])
+    ble_controller._import_bleak()
+    ble_controller.BleakClient = TimedClient
+
+    run_mode(app, LOOP_MODE_THREAD, args)
+    if QASYNC_AVAILABLE:
+        run_mode(app, LOOP_MODE_QT, args)
+    else:
+        print("\n[qt] 跳过: 未安装qasync")
+    run_mode(app, LOOP_MODE_PROCESS, args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+命令流水线基准测试 - 逐条执行 vs 流水线执行（不需要Qt）
+
+使用带链路延迟的模拟设备（每个方向约一个BLE连接间隔），执行同一组只读命令：
+分段读取全部日志（AT+LOGRANGE，每段 --chunk 条）加 AT+LOGCOUNT、AT+LOGSTATS。
+逐条执行每条命令都要等完整的往返；流水线执行最多 N 条命令同时在途。
+每种窗口大小都校验响应与逐条执行完全一致。
+
+用法: python benchmarks/bench_pipeline.py [--entries 3000] [--chunk 100] [--link-delay 15]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ble_session  # noqa: E402
+from ble_session import ATSession  # noqa: E402
+from simulated_device import (SimulatedClient, SimulatedLogDevice, SimulatedScanner,  # noqa: E402
+                              register_device)
+
+SIM_ADDRESS = "SIM:BE:NC:00:00:02"
+
+
+def workload(entries, chunk):
+    commands = [f"AT+LOGRANGE={start},{start + chunk - 1}" for start in range(1, entries + 1, chunk)]
+    return commands + ["AT+LOGCOUNT", "AT+LOGSTATS"]
+
+
+async def run(args):
+    register_device(SimulatedLogDevice(
+        address=SIM_ADDRESS, entries=args.entries, command_latency=args.latency / 1000,
+        notify_interval=args.notify_interval / 1000, link_delay=args.link_delay / 1000, seed=1))
+    commands = workload(args.entries, args.chunk)
+    print(f"{len(commands)} 条命令, 链路延迟 {args.link_delay:g} ms/方向, "
+          f"设备处理 {args.latency:g} ms/条")
+
+    async with ATSession(SIM_ADDRESS) as session:
+        start = time.perf_counter()
+        serial = [await session.command(command) for command in commands]
+        baseline = time.perf_counter() - start
+        lines = sum(len(response) for response in serial)
+        print(f"  逐条执行    : {baseline * 1000:8.1f} ms, {lines / baseline:8,.0f} 行/秒")
+
+        for window in args.windows:
+            start = time.perf_counter()
+            responses = await session.pipeline(commands, window=window)
+            elapsed = time.perf_counter() - start
+            status = "一致" if responses == serial else "不一致!"
+            print(f"  流水线 N={window:<3}: {elapsed * 1000:8.1f} ms, {lines / elapsed:8,.0f} 行/秒, "
+                  f"加速 {baseline / elapsed:4.1f}x, 响应{status}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--entries", type=int, default=3000, help="模拟设备中的日志条数")
+    parser.add_argument("--chunk", type=int, default=100, help="每条AT+LOGRANGE读取的条数")
+    parser.add_argument("--link-delay", type=float, default=15.0, help="单向链路延迟（毫秒）")
+    parser.add_argument("--latency", type=float, default=2.0, help="设备处理每条命令的时间（毫秒）")
+    parser.add_argument("--notify-interval", type=float, default=0.0, help="相邻通知的间隔（毫秒）")
+    parser.add_argument("--windows", type=int, nargs="+", default=[1, 2, 4, 8],
+                        help="要测试的在途窗口大小")
+    args = parser.parse_args()
+
+    ble_session.BleakClient = SimulatedClient
+    ble_session.BleakScanner = SimulatedScanner
+    asyncio.run(run(args))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+通知接收路径的内存分配基准测试 - 整段解码后替换分割 vs 字节缓冲区按行解码
+
+旧的接收路径把每个通知整段解码，再拼接残行、两次replace、split并逐行strip，
+每个通知取消并新建残行定时器；二进制数据用f-string列表格式化成HEX。
+新的路径把残行字节留在复用的bytearray中，用rfind找到最后的行边界，
+完整的行只解码一次，定时器只推迟截止时间，HEX用bytes.hex(' ')。
+分别比较行重组本身和BLEController._notification_handler整条路径（不连接界面）。
+
+用tracemalloc统计处理每个通知时的内存峰值和保留的内存（相对处理前的增量），
+两者之差是处理中途产生又释放的临时对象；另外不开tracemalloc测每个通知的耗时。
+两条路径得到的行须一致。
+
+用法: python benchmarks/bench_receive_alloc.py [--entries 3000] [--mtu 247]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt6.QtCore import QCoreApplication  # noqa: E402
+
+from at_protocol import LineAssembler  # noqa: E402
+from ble_controller import PARTIAL_LINE_TIMEOUT, BLEController  # noqa: E402
+from log_format import MessageType  # noqa: E402
+from simulated_device import SimulatedLogDevice  # noqa: E402
+
+COMMANDS = ["AT+LOGREADALL", "AT+LOGSTATS", "AT+LOGSTATUS"]
+BINARY_PAYLOAD = bytearray(range(0x80, 0x80 + 20))  # 无法解码为UTF-8的通知
+
+
+class LegacyAssembler:
+    """改为字节缓冲区之前的行重组（含通知处理函数中的解码）"""
+
+    def __init__(self):
+        self._partial = ""
+
+    def feed(self, data):
+        return self.feed_text(bytes(data).decode('utf-8', errors='ignore'))
+
+    def feed_text(self, text):
+        if not text:
+            return []
+        text = self._partial + text
+        lines = text.replace('\r\n', '\n').replace('\r', '\n').split('\n')
+        self._partial = lines.pop()
+        return [line.strip() for line in lines if line.strip()]
+
+    @property
+    def pending(self):
+        return bool(self._partial)
+
+
+class LegacyController(BLEController):
+    """通知处理函数和残行定时器换成改动之前的实现（抓包和接收时刻与现在相同）"""
+
+    def __init__(self):
+        super().__init__(autostart=False)
+        self._assembler = LegacyAssembler()
+
+    def _notification_handler(self, sender, data):
+        received_ns = time.monotonic_ns()
+        self._bytes_received += len(data)
+        self.capture.append(sender, data, received_ns)
+        text = bytes(data).decode('utf-8', errors='ignore')
+        if text:
+            for line in self._assembler.feed_text(text):
+                self._emit_received(line, received_ns)
+            self._schedule_partial_flush()
+        elif len(data) > 0:
+            hex_str = ' '.join([f'{b:02X}' for b in data])
+            self._log(f"← [HEX: {hex_str}]", MessageType.RECEIVED)
+
+    def _schedule_partial_flush(self):
+        if self._partial_timer is not None:
+            self._partial_timer.cancel()
+            self._partial_timer = None
+        if self._assembler.pending:
+            self._partial_timer = self.loop.call_later(PARTIAL_LINE_TIMEOUT, self._flush_partial)
+
+
+def legacy_hex(data):
+    return ' '.join([f'{b:02X}' for b in data])
+
+
+def buffered_hex(data):
+    return data.hex(' ').upper()
+
+
+def make_notifications(entries, mtu):
+    """设备连续输出的响应按每包 MTU-3 字节拆成通知（一个通知可含多行或半行）"""
+    device = SimulatedLogDevice(entries=entries, seed=1)
+    stream = b''.join((line + "\r\n").encode('utf-8')
+                      for command in COMMANDS for line in device.handle(command))
+    chunk = mtu - 3
+    return [bytearray(stream[i:i + chunk]) for i in range(0, len(stream), chunk)]
+
+
+def run(assembler, notifications):
+    lines = []
+    for data in notifications:
+        lines += assembler.feed(data)
+    return lines
+
+
+def measure_alloc(feed, notifications):
+    """每个通知的临时内存峰值和保留下来的内存（字节，相对处理前），返回两者的平均值
+
+    保留的是返回的行和残行缓冲区，峰值减去保留即为处理中途产生又释放的临时对象。
+    """
+    peaks = kept = 0
+    keep = []  # 保留返回值，使两条路径的差别只来自中间产生的临时对象
+    tracemalloc.start()
+    try:
+        for data in notifications:
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            keep.append(feed(data))
+            current, peak = tracemalloc.get_traced_memory()
+            peaks += peak - before
+            kept += current - before
+    finally:
+        tracemalloc.stop()
+    return peaks / len(notifications), kept / len(notifications)
+
+
+def measure_handler(factory, notifications):
+    """在运行中的事件循环里逐个调用控制器的通知处理函数，返回(峰值, 保留, ns/通知)"""
+    received = []
+    controller = factory()
+    controller.logMessage.connect(lambda message, *_: received.append(message))
+    loop = asyncio.new_event_loop()
+    controller.loop = loop
+
+    def handle(data):
+        controller._notification_handler(None, data)
+        return received[-1] if received else None
+
+    async def drive():
+        # 先让定时器堆达到稳定状态，再统计
+        for data in notifications:
+            handle(data)
+        await asyncio.sleep(0)
+        peak, kept = measure_alloc(handle, notifications)
+        await asyncio.sleep(0)
+        seconds = min(timeit.repeat(lambda: [handle(data) for data in notifications],
+                                    number=1, repeat=7))
+        return peak, kept, seconds * 1e9 / len(notifications)
+
+    try:
+        return loop.run_until_complete(drive())
+    finally:
+        controller._shutdown = True
+        loop.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--entries", type=int, default=3000, help="模拟设备中的日志条数")
+    parser.add_argument("--mtu", type=int, default=247, help="协商的MTU，每个通知 MTU-3 字节")
+    args = parser.parse_args()
+
+    QCoreApplication([])
+    notifications = make_notifications(args.entries, args.mtu)
+    legacy_lines = run(LegacyAssembler(), notifications)
+    buffered_lines = run(LineAssembler(), notifications)
+    same = legacy_lines == buffered_lines
+    print(f"{len(notifications)} 个通知, {len(legacy_lines)} 行, 每个通知 {args.mtu - 3} 字节")
+
+    number = 5
+    results = []
+    for label, factory in (("行重组 旧", LegacyAssembler), ("行重组 新", LineAssembler)):
+        peak, kept = measure_alloc(factory().feed, notifications)
+        seconds = min(timeit.repeat(lambda: run(factory(), notifications),
+                                    number=number, repeat=7)) / number
+        results.append((label, peak, kept, seconds * 1e9 / len(notifications)))
+
+    for label, factory in (("处理函数 旧", LegacyController),
+                           ("处理函数 新", lambda: BLEController(autostart=False))):
+        results.append((label, *measure_handler(factory, notifications)))
+
+    for label, feed in (("HEX f-string", legacy_hex), ("HEX bytes.hex", buffered_hex)):
+        peak, kept = measure_alloc(feed, [BINARY_PAYLOAD] * 50)
+        seconds = min(timeit.repeat(lambda: feed(BINARY_PAYLOAD), number=10000, repeat=7)) / 10000
+        results.append((label, peak, kept, seconds * 1e9))
+
+    for label, peak, kept, ns in results:
+        print(f"  {label:<14}: 峰值 {peak:6.0f} 字节/通知, 保留 {kept:6.0f}, 临时 {peak - kept:6.0f}, "
+              f"{ns:6.0f} ns/通知")
+    print(f"结果{'一致' if same else '不一致!'}")
+    return 0 if same else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
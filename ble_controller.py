@@ -1,20 +1,106 @@
 import asyncio
+import concurrent.futures
+import importlib
+import importlib.util
 import threading
 import time
-from PyQt6.QtCore import QObject, pyqtSignal
+from datetime import datetime
+from PyQt6.QtCore import QObject, QCoreApplication, pyqtSignal
+
+from at_macro import MacroAbort, MacroError, MacroRunner, format_statistics, parse_macro, \
+    step_statistics
+from at_pipeline import CommandPipeline, DEFAULT_WINDOW
+from at_protocol import (AT_SERVICE_UUID, AT_TX_CHAR_UUID, AT_RX_CHAR_UUID, is_surron_device,
+                         CommandProgress, LineAssembler, LineKind, classify_line)
+from ble_session import ATSessionError
+from device_registry import DeviceRegistry
+from log_format import (DEFAULT_VERBOSITY, MESSAGE_LEVELS, RECEIVED_MARK, RECEIVED_TYPES,
+                        LogLevel, MessageType)
+from log_watcher import LogWatcher
+from metrics import LATENCY_BUCKETS, LOOP_LAG_BUCKETS, metrics
+from packet_capture import PacketCapture
+from startup_profile import profiler, FIRST_LOOP_TICK
+
+# 只检查bleak是否存在，真正的导入推迟到后台事件循环线程中进行
+BLEAK_AVAILABLE = importlib.util.find_spec("bleak") is not None
+if not BLEAK_AVAILABLE:
+    print("警告: bleak库未安装，请运行: pip install bleak")
 
-try:
-    from bleak import BleakScanner, BleakClient
+BleakScanner = None
+BleakClient = None
 
-    BLEAK_AVAILABLE = True
-except ImportError:
-    print("警告: bleak库未安装，请运行: pip install bleak")
-    BLEAK_AVAILABLE = False
 
-# AT命令服务和特征UUID
-AT_SERVICE_UUID = "00006E50-0000-1000-8000-00805F9B34FB"
-AT_TX_CHAR_UUID = "00006E51-0000-1000-8000-00805F9B34FB"
-AT_RX_CHAR_UUID = "00006E52-0000-1000-8000-00805F9B34FB"
+def _import_bleak():
+    """导入bleak（首次启动事件循环时在后台线程调用）"""
+    global BleakScanner, BleakClient
+    if BleakClient is None:
+        with profiler.measure("import bleak", "import"):
+            from bleak import BleakScanner as scanner, BleakClient as client
+        BleakScanner, BleakClient = scanner, client
+
+# qasync为可选依赖，提供基于Qt事件循环的asyncio循环
+QASYNC_AVAILABLE = importlib.util.find_spec("qasync") is not None
+
+# 事件循环模式
+LOOP_MODE_THREAD = "thread"  # 独立线程运行asyncio循环，跨线程投递命令和信号
+LOOP_MODE_QT = "qt"  # asyncio循环与Qt事件循环合一，全部在主线程运行
+LOOP_MODE_PROCESS = "process"  # BLE通讯在独立进程中运行（见ble_process.py）
+
+RECONNECT_RETRY_MIN = 2.0  # 重连失败后等待下一次广播的最短间隔（秒），逐次翻倍
+RECONNECT_RETRY_MAX = 30.0
+PARTIAL_LINE_TIMEOUT = 0.2  # 没有行结束符的响应等待后续通知的时间（秒）
+RESPONSE_TIMEOUT = 10.0  # 在途命令等待下一行响应的最长时间（秒）
+IDLE_TIMEOUT = 0.5  # 无结束标记的命令：最后一行之后静默多久视为结束
+
+DEFAULT_MTU = 23  # BLE最小ATT MTU，无法获取协商结果时使用
+WRITE_PACING = 0.002  # 无应答写入分包之间的间隔（秒），避免塞满控制器缓冲区
+LINK_INFO_INTERVAL = 1.0  # MTU和吞吐量的上报周期（秒）
+LOOP_LAG_INTERVAL = 0.5  # 事件循环延迟的测量周期（秒）
+WATCH_RECONNECT_POLL = 0.5  # 监视新日志时连接中断，检查是否已自动重连的间隔（秒）
+
+
+def create_qt_event_loop(app):
+    """创建并设置与Qt事件循环集成的asyncio循环（需要qasync）"""
+    if not QASYNC_AVAILABLE:
+        raise RuntimeError("Qt集成事件循环需要qasync库，请运行: pip install qasync")
+    qasync = importlib.import_module("qasync")
+    loop = qasync.QEventLoop(app)
+    asyncio.set_event_loop(loop)
+    return loop
+
+
+def _is_text(data):
+    """非ASCII的通知能否解码出文本（包括在通知末尾被拆开的多字节字符）"""
+    if str(data, 'utf-8', 'ignore'):
+        return True
+    try:
+        data.decode('utf-8')
+    except UnicodeDecodeError as e:
+        return e.reason == "unexpected end of data"
+    return False
+
+
+def emit_typed_response(controller, response):
+    """按响应行类型发出控制器（或进程代理）对应的信号"""
+    kind = response.kind
+    if kind == LineKind.DATA and response.record is not None:
+        controller.recordReceived.emit(response.record)
+    elif kind == LineKind.OK:
+        controller.responseOk.emit(response.body)
+    elif kind == LineKind.ERROR:
+        controller.responseError.emit(response.body)
+    else:
+        controller.textReceived.emit(response.text)
+
+
+class _WatchSession:
+    """LogWatcher使用的会话：命令经控制器的流水线发出，收发行不输出到通讯日志"""
+
+    def __init__(self, controller):
+        self.controller = controller
+
+    async def command(self, command):
+        return await self.controller._execute_for_macro(command, quiet=True)
 
 
 class BLEController(QObject):
@@ -26,18 +112,36 @@ class BLEController(QObject):
     scanningChanged = pyqtSignal(bool)
     connectedChanged = pyqtSignal(bool)
     statusChanged = pyqtSignal(str)
-    logMessage = pyqtSignal(str, str)  # message, type
-
-    def __init__(self):
+    # message, log_format.MessageType, 时刻(time.monotonic_ns), 命令发出到收到该行的延迟(纳秒，无为-1)
+    logMessage = pyqtSignal(str, int, 'qint64', 'qint64')
+    linkStatsChanged = pyqtSignal(dict)  # 连接中断/重连统计，见link_stats
+    linkInfoChanged = pyqtSignal(dict)  # MTU、写入方式和吞吐量，见_link_info
+    macroStep = pyqtSignal(dict)  # 宏的一步完成，见at_macro.StepResult
+    macroFinished = pyqtSignal(dict)  # 宏结束，见_run_macro
+    # 按类型分发的接收行，只关心某类响应的模块只连接对应的信号
+    responseOk = pyqtSignal(str)  # +LOGOK: 之后的内容
+    responseError = pyqtSignal(str)  # +LOGERROR: 之后的内容
+    recordReceived = pyqtSignal(object)  # +LOGDATA 解析出的at_protocol.LogRecord
+    textReceived = pyqtSignal(str)  # 无前缀的文本行（以及格式不符的 +LOGDATA）
+    watchingChanged = pyqtSignal(bool)  # 是否正在监视新日志
+    # 监视发现的新记录：地址, 名称, at_protocol.LogRecord列表, 设备当前的日志条数
+    watchRecords = pyqtSignal(str, str, list, int)
+
+    def __init__(self, autostart=True, loop_mode=LOOP_MODE_THREAD, auto_reconnect=True,
+                 pipeline_window=DEFAULT_WINDOW, verbosity=DEFAULT_VERBOSITY):
         super().__init__()
+        self.loop_mode = loop_mode
+        self.setVerbosity(verbosity)
+        # 接收行是否按详细程度过滤；工作进程中关闭，由界面进程在还原类型化信号后过滤
+        self.filter_received = True
+        self.auto_reconnect = auto_reconnect
         self._scanning = False
         self._continuous_scanning = False
         self._connected = False
         self._status = "就绪"
         self.client = None
         self.loop = None
-        self.devices = {}
-        self.device_last_seen = {}  # 记录设备最后被发现的时间
+        self.registry = DeviceRegistry()  # 扫描到的设备及最后被发现的时间
         self._shutdown = False
         self.rx_char = None
         self.tx_char = None
@@ -45,29 +149,130 @@ class BLEController(QObject):
         self._disconnect_lock = threading.Lock()
         self._scan_task = None
         self._cleanup_task = None
+        self._info_task = None
+        self._link_info_task = None
+        self._loop_lag_task = None
+        self.loop_thread = None
+
+        # 通知重组和断线续传
+        self._assembler = LineAssembler()
+        self._partial_timer = None
+        self._partial_deadline = 0.0
+        self._partial_received_ns = 0  # 残行最后一个通知的接收时刻
+        # 在途命令窗口（pipeline_window=1为逐条执行），响应按发送顺序分配
+        self._pipeline = CommandPipeline(pipeline_window)
+        self._send_lock = asyncio.Lock()
+        self._last_response_at = 0.0
+        self._response_timer = None
+        self._interrupted = []  # 连接中断时在途的命令，重连后续传
+        self._address = None
+        self._tx_handle = None  # 特征句柄缓存，重连后直接按句柄取特征
+        self._rx_handle = None
+        self._user_disconnect = False
+        self._reconnect = None  # 等待重连的状态，见_on_link_lost
+        self._macro_runner = None  # 正在执行的宏
+        self._macro_task = None
+        self._watch_task = None  # 监视新日志的轮询任务
+
+        # MTU和写入方式（连接后协商），收发字节数用于计算吞吐量
+        self.mtu = DEFAULT_MTU
+        self._write_size = DEFAULT_MTU - 3
+        self._write_without_response = False
+        self._bytes_sent = 0
+        self._bytes_received = 0
+        # 每个通知的原始数据，供数据包面板查看（工作进程中由ble_process替换为转发）
+        self.capture = PacketCapture()
+        self.link_stats = {
+            "link_losses": 0,  # 意外断开次数
+            "reconnects": 0,  # 自动重连成功次数
+            "last_downtime": 0.0,  # 最近一次中断时长（秒）
+            "total_downtime": 0.0,  # 累计中断时长（秒）
+        }
+        self._register_metrics()
+
+        if autostart:
+            self.start()
+
+    def _register_metrics(self):
+        """登记运行指标（见metrics.py），多个控制器共用同名指标，函数以最后创建的控制器为准"""
+        self._adverts_total = metrics.counter("ble_adverts_total", "扫描收到的广播数")
+        self._notifications_total = metrics.counter("ble_notifications_total", "收到的通知数")
+        self._commands_total = metrics.counter("ble_commands_total", "发出的AT命令数")
+        self._timeouts_total = metrics.counter("ble_command_timeouts_total", "等待响应超时的命令数")
+        self._command_rtt = metrics.histogram(
+            "ble_command_rtt_seconds", "命令发出到收到结束行的时间", LATENCY_BUCKETS)
+        self._loop_lag = metrics.histogram(
+            "ble_event_loop_lag_seconds", "BLE事件循环定时回调的延迟", LOOP_LAG_BUCKETS)
+        metrics.counter("ble_rx_bytes_total", "接收的通知字节数", lambda: self._bytes_received)
+        metrics.counter("ble_tx_bytes_total", "写入的命令字节数", lambda: self._bytes_sent)
+        metrics.gauge("ble_pipeline_inflight", "在途命令数", lambda: len(self._pipeline))
+        metrics.gauge("ble_pipeline_waiting", "等待流水线放行的发送数",
+                      lambda: self._pipeline.waiting)
+        metrics.gauge("ble_devices_seen", "最近扫描到的设备数", lambda: len(self.registry))
+        metrics.gauge("ble_connected", "是否已连接设备", lambda: int(self._connected))
+
+    def start(self, scan=True):
+        """在后台启动BLE事件循环和持续扫描，不阻塞调用线程"""
+        if self.loop is not None or self.loop_thread is not None or self._shutdown:
+            return
 
-        if BLEAK_AVAILABLE:
-            self._start_event_loop()
-        else:
-            self.logMessage.emit("bleak库未安装，功能受限", "error")
+        if not BLEAK_AVAILABLE:
+            self._log("bleak库未安装，功能受限", MessageType.ERROR)
+            return
 
-    def _start_event_loop(self):
+        self._start_time = time.perf_counter()
+        if self.loop_mode == LOOP_MODE_QT:
+            self._attach_qt_event_loop(scan)
+        else:
+            self._start_event_loop(scan)
+
+    def _attach_qt_event_loop(self, scan):
+        """使用当前线程中与Qt集成的asyncio循环（由create_qt_event_loop创建）"""
+        _import_bleak()
+        self.loop = asyncio.get_event_loop()
+        self.loop.call_soon(profiler.mark, FIRST_LOOP_TICK, self._start_time)
+        self.loop.call_soon(self._start_loop_lag_monitor)
+        if scan:
+            self.loop.call_soon(self.startContinuousScanning)
+
+    def _submit(self, coro):
+        """把协程交给事件循环执行
+
+        线程模式下跨线程投递，返回concurrent.futures.Future；
+        Qt模式下已在循环所在线程，直接创建Task。
+        """
+        if self.loop_mode == LOOP_MODE_QT:
+            return asyncio.ensure_future(coro, loop=self.loop)
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def _start_event_loop(self, scan=True):
         """启动异步事件循环"""
         try:
-            self.loop_thread = threading.Thread(target=self._run_event_loop, daemon=True)
+            self._loop_ready = threading.Event()
+            self.loop_thread = threading.Thread(target=self._run_event_loop, args=(scan,), daemon=True)
             self.loop_thread.start()
-            # 等待循环启动
-            time.sleep(0.1)
-            # 启动持续扫描
-            self.startContinuousScanning()
         except Exception as e:
             print(f"启动事件循环失败: {e}")
 
-    def _run_event_loop(self):
+    def wait_until_ready(self, timeout=None):
+        """等待事件循环开始运行（线程模式），返回是否就绪"""
+        if self.loop_mode == LOOP_MODE_QT:
+            return self.loop is not None
+        ready = getattr(self, '_loop_ready', None)
+        return ready.wait(timeout) if ready else False
+
+    def _run_event_loop(self, scan=True):
         """运行异步事件循环"""
         try:
+            _import_bleak()
             self.loop = asyncio.new_event_loop()
             asyncio.set_event_loop(self.loop)
+            # 循环开始运行后立即启动持续扫描
+            self.loop.call_soon(profiler.mark, FIRST_LOOP_TICK, self._start_time)
+            self.loop.call_soon(self._loop_ready.set)
+            self.loop.call_soon(self._start_loop_lag_monitor)
+            if scan:
+                self.loop.call_soon(self.startContinuousScanning)
             self.loop.run_forever()
         except Exception as e:
             if not self._shutdown:
@@ -94,17 +299,18 @@ class BLEController(QObject):
                 if self.loop and not self.loop.is_closed():
                     try:
                         # 在事件循环中执行清理，设置超时
-                        future = asyncio.run_coroutine_threadsafe(
-                            self._cleanup_async(), self.loop
-                        )
-                        future.result(timeout=5.0)
+                        future = self._submit(self._cleanup_async())
+                        if self.loop_mode == LOOP_MODE_QT:
+                            self._wait_qt_future(future, timeout=5.0)
+                        else:
+                            future.result(timeout=5.0)
                     except Exception as e:
                         print(f"异步清理失败: {e}")
                         self._cleanup_sync()
 
-                    # 停止事件循环
+                    # 停止事件循环（Qt模式下循环随应用程序退出）
                     try:
-                        if not self.loop.is_closed():
+                        if self.loop_mode != LOOP_MODE_QT and not self.loop.is_closed():
                             self.loop.call_soon_threadsafe(self.loop.stop)
                     except Exception as e:
                         print(f"停止事件循环失败: {e}")
@@ -115,27 +321,65 @@ class BLEController(QObject):
                 self._cleanup_sync()
                 print("BLE控制器关闭完成")
 
+    def _wait_qt_future(self, future, timeout):
+        """Qt模式下在主线程等待任务完成，期间继续处理Qt/asyncio事件"""
+        if not self.loop.is_running():
+            # 应用程序事件循环已退出（或尚未进入），直接驱动asyncio循环
+            self.loop.run_until_complete(asyncio.wait_for(future, timeout))
+            return
+        deadline = time.monotonic() + timeout
+        while not future.done() and time.monotonic() < deadline:
+            QCoreApplication.processEvents()
+            time.sleep(0.005)
+        if not future.done():
+            raise TimeoutError("等待异步清理超时")
+
+    @staticmethod
+    async def _cancel_task(task):
+        """取消由_submit创建的任务并等待其结束"""
+        if isinstance(task, concurrent.futures.Future):
+            task = asyncio.wrap_future(task)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
     async def _cleanup_async(self):
         """异步清理资源"""
         try:
             # 取消持续扫描任务
             if self._scan_task:
-                self._scan_task.cancel()
-                try:
-                    await self._scan_task
-                except asyncio.CancelledError:
-                    pass
+                await self._cancel_task(self._scan_task)
                 self._scan_task = None
 
             # 取消清理任务
             if self._cleanup_task:
-                self._cleanup_task.cancel()
-                try:
-                    await self._cleanup_task
-                except asyncio.CancelledError:
-                    pass
+                await self._cancel_task(self._cleanup_task)
                 self._cleanup_task = None
 
+            # 取消尚未输出的设备信息
+            if self._info_task:
+                await self._cancel_task(self._info_task)
+                self._info_task = None
+
+            # 停止吞吐量上报
+            if self._link_info_task:
+                await self._cancel_task(self._link_info_task)
+                self._link_info_task = None
+
+            # 停止事件循环延迟测量
+            if self._loop_lag_task:
+                await self._cancel_task(self._loop_lag_task)
+                self._loop_lag_task = None
+
+            # 放弃等待中的重连
+            await self._cancel_reconnect()
+
+            # 停止正在执行的宏和新日志监视
+            await self._abort_macro()
+            await self._set_watching(False)
+
             # 停止扫描
             if self._scanner:
                 try:
@@ -185,10 +429,34 @@ class BLEController(QObject):
             self._continuous_scanning = False
             self._scan_task = None
             self._cleanup_task = None
+            self._info_task = None
+            self._link_info_task = None
+            self._loop_lag_task = None
+            self._reconnect = None
+            self._pipeline.clear()
+            self._interrupted = []
             print("同步清理完成")
         except Exception as e:
             print(f"同步清理失败: {e}")
 
+    def setVerbosity(self, level):
+        """设置日志详细程度（log_format.LogLevel），低于该级别的消息不发出信号
+
+        只是替换一个属性，可以在任何线程中调用，下一条消息起生效。
+        按类型分发的响应信号不受该阈值影响（进程模式下接收行总是转发，见ble_process）。
+        """
+        self.verbosity = LogLevel(level)
+
+    def setDebugMode(self, enabled):
+        """调试模式输出扫描、通知和设备服务等细节，关闭后恢复默认详细程度"""
+        self.setVerbosity(LogLevel.DEBUG if enabled else DEFAULT_VERBOSITY)
+
+    def _log(self, message, msg_type, level=None, timestamp=None):
+        """按详细程度过滤后发出logMessage，level默认取消息类型的级别，timestamp默认为当前时刻"""
+        if (MESSAGE_LEVELS[msg_type] if level is None else level) >= self.verbosity:
+            self.logMessage.emit(message, msg_type,
+                                 time.monotonic_ns() if timestamp is None else timestamp, -1)
+
     def startContinuousScanning(self):
         """开始持续扫描"""
         if not BLEAK_AVAILABLE or self._shutdown or self._continuous_scanning:
@@ -196,12 +464,8 @@ class BLEController(QObject):
 
         self._continuous_scanning = True
         if self.loop and not self.loop.is_closed():
-            self._scan_task = asyncio.run_coroutine_threadsafe(
-                self._continuous_scan_loop(), self.loop
-            )
-            self._cleanup_task = asyncio.run_coroutine_threadsafe(
-                self._device_cleanup_loop(), self.loop
-            )
+            self._scan_task = self._submit(self._continuous_scan_loop())
+            self._cleanup_task = self._submit(self._device_cleanup_loop())
 
     def stopContinuousScanning(self):
         """停止持续扫描"""
@@ -211,25 +475,45 @@ class BLEController(QObject):
     def connectDevice(self, address):
         """连接指定地址的设备"""
         if not BLEAK_AVAILABLE or self._shutdown:
-            self.logMessage.emit("无法连接设备", "error")
+            self._log("无法连接设备", MessageType.ERROR)
             return
 
         if self.loop and not self.loop.is_closed():
-            asyncio.run_coroutine_threadsafe(self._connect_device(address), self.loop)
+            self._submit(self._connect_device(address))
 
     def disconnectDevice(self):
         """断开当前连接"""
         if self.loop and not self.loop.is_closed():
-            asyncio.run_coroutine_threadsafe(self._disconnect_device(), self.loop)
+            self._submit(self._disconnect_device())
 
     def sendCommand(self, command):
         """发送AT命令"""
         if self.loop and not self.loop.is_closed():
-            asyncio.run_coroutine_threadsafe(self._send_command(command), self.loop)
+            self._submit(self._send_command(command))
+
+    def runMacro(self, text, name="宏"):
+        """执行宏脚本（语法见at_macro），语法错误时直接报告"""
+        try:
+            steps = parse_macro(text)
+        except MacroError as e:
+            self._log(f"{name}语法错误: {e}", MessageType.ERROR)
+            return
+        if self.loop and not self.loop.is_closed():
+            self._submit(self._run_macro(steps, name))
+
+    def abortMacro(self):
+        """停止正在执行的宏（已发出的命令继续完成）"""
+        if self.loop and not self.loop.is_closed():
+            self._submit(self._abort_macro())
+
+    def setWatching(self, enabled):
+        """开始或停止监视已连接设备的新日志（见log_watcher），断开连接时自动停止"""
+        if self.loop and not self.loop.is_closed():
+            self._submit(self._set_watching(enabled))
 
     async def _continuous_scan_loop(self):
         """持续扫描循环"""
-        self.logMessage.emit("开始持续扫描设备...", "info")
+        self._log("开始持续扫描设备...", MessageType.INFO, LogLevel.DEBUG)
         self._status = "持续扫描中..."
         self.statusChanged.emit(self._status)
 
@@ -247,7 +531,7 @@ class BLEController(QObject):
                     await asyncio.sleep(5.0)  # 出错时等待更长时间
 
         if not self._shutdown:
-            self.logMessage.emit("持续扫描已停止", "info")
+            self._log("持续扫描已停止", MessageType.INFO, LogLevel.DEBUG)
 
     async def _start_single_scan(self):
         """执行单次扫描"""
@@ -260,17 +544,20 @@ class BLEController(QObject):
 
             def detection_callback(device, advertisement_data):
                 if not self._shutdown:
+                    self._adverts_total.inc()
                     name = device.name if device.name else "Unknown"
                     address = device.address
                     rssi = advertisement_data.rssi
-                    current_time = time.time()
 
                     # 更新设备信息
-                    self.devices[address] = (name, rssi)
-                    self.device_last_seen[address] = current_time
+                    self.registry.seen(address, name, rssi)
+
+                    # 意外断开的设备重新广播时立即重连
+                    if self._reconnect and address == self._reconnect["address"]:
+                        self._schedule_reconnect()
 
                     # 只发送surron设备到界面
-                    if name.lower().startswith('surron-'):
+                    if is_surron_device(name):
                         self.deviceFound.emit(name, address, rssi)
 
             self._scanner = BleakScanner(detection_callback)
@@ -296,23 +583,10 @@ class BLEController(QObject):
         """设备清理循环 - 移除长时间未见的设备"""
         while self._continuous_scanning and not self._shutdown:
             try:
-                current_time = time.time()
-                devices_to_remove = []
-
-                # 检查哪些设备超过30秒未见
-                for address, last_seen in self.device_last_seen.items():
-                    if current_time - last_seen > 30.0:  # 30秒超时
-                        devices_to_remove.append(address)
-
-                # 移除超时的设备
-                for address in devices_to_remove:
-                    if address in self.devices:
-                        device_name = self.devices[address][0]
-                        if device_name.lower().startswith('surron-'):
-                            self.deviceLost.emit(address)
-                        del self.devices[address]
-                    if address in self.device_last_seen:
-                        del self.device_last_seen[address]
+                # 移除超过30秒未见的设备
+                for sighting in self.registry.expire(30.0):
+                    if is_surron_device(sighting.name):
+                        self.deviceLost.emit(sighting.address)
 
                 # 每5秒检查一次
                 await asyncio.sleep(5.0)
@@ -327,13 +601,22 @@ class BLEController(QObject):
         if self._shutdown or self._connected:
             return
 
+        # 手动连接取代等待中的自动重连
+        if self._reconnect:
+            await self._cancel_reconnect()
+            self._log("已取消自动重连", MessageType.INFO)
+
         try:
             self._status = "连接中..."
             self.statusChanged.emit(self._status)
-            self.logMessage.emit(f"正在连接 {address}...", "info")
+            self._log(f"正在连接 {address}...", MessageType.INFO)
 
             # 创建客户端并连接
-            self.client = BleakClient(address)
+            self._user_disconnect = False
+            self._pipeline.clear()
+            self._interrupted = []
+            self._address = address
+            self.client = BleakClient(address, disconnected_callback=self._on_client_disconnected)
             await asyncio.wait_for(self.client.connect(), timeout=10.0)
 
             if not self.client.is_connected:
@@ -341,35 +624,40 @@ class BLEController(QObject):
 
             # 验证服务和特征
             if not await self._verify_services():
+                self._user_disconnect = True
                 await self.client.disconnect()
                 return
 
             # 启用通知
             await self._setup_notifications()
+            await self._negotiate_mtu()
 
             if not self._shutdown:
+                self._tx_handle = self.tx_char.handle
+                self._rx_handle = self.rx_char.handle
                 self._connected = True
                 self.connectedChanged.emit(True)
-                device_name = self.devices.get(address, ("Unknown", 0))[0]
+                self._start_link_info()
+                device_name = self.registry.name(address)
                 self._status = f"已连接到 {device_name} ({address})"
                 self.statusChanged.emit(self._status)
-                self.logMessage.emit(f"成功连接到 {device_name}", "success")
+                self._log(f"成功连接到 {device_name}", MessageType.SUCCESS)
 
                 # 记录设备信息
-                services = await self.client.get_services()
-                self._log_device_info(services)
+                self._log_device_info(self.client.services)
 
         except Exception as e:
+            self._user_disconnect = True
             if not self._shutdown:
                 self._status = "连接失败，继续扫描中..."
                 self.statusChanged.emit(self._status)
-                self.logMessage.emit(f"连接失败: {str(e)}", "error")
+                self._log(f"连接失败: {str(e)}", MessageType.ERROR)
             await self._cleanup_connection()
 
     async def _verify_services(self):
         """验证设备服务和特征"""
         try:
-            services = await self.client.get_services()
+            services = self.client.services
             at_service = None
 
             for service in services:
@@ -378,7 +666,7 @@ class BLEController(QObject):
                     break
 
             if not at_service:
-                self.logMessage.emit(f"设备不支持AT服务 ({AT_SERVICE_UUID})", "error")
+                self._log(f"设备不支持AT服务 ({AT_SERVICE_UUID})", MessageType.ERROR)
                 return False
 
             # 检查特征
@@ -392,13 +680,13 @@ class BLEController(QObject):
                     self.rx_char = char
 
             if not self.tx_char or not self.rx_char:
-                self.logMessage.emit("设备缺少必要的AT特征", "error")
+                self._log("设备缺少必要的AT特征", MessageType.ERROR)
                 return False
 
             return True
 
         except Exception as e:
-            self.logMessage.emit(f"验证服务失败: {e}", "error")
+            self._log(f"验证服务失败: {e}", MessageType.ERROR)
             return False
 
     async def _setup_notifications(self):
@@ -406,9 +694,35 @@ class BLEController(QObject):
         try:
             if self.rx_char:
                 await self.client.start_notify(self.rx_char, self._notification_handler)
-                self.logMessage.emit("通知已启用", "success")
+                self._log("通知已启用", MessageType.SUCCESS, LogLevel.DEBUG)
         except Exception as e:
-            self.logMessage.emit(f"启用通知失败: {e}", "warning")
+            self._log(f"启用通知失败: {e}", MessageType.WARNING)
+
+    async def _negotiate_mtu(self):
+        """获取协商后的MTU，决定写入方式和分包大小"""
+        # BlueZ后端的mtu_size在获取前总是23，bleak提供了_acquire_mtu获取真实值
+        acquire = getattr(getattr(self.client, '_backend', None), '_acquire_mtu', None)
+        if acquire is not None:
+            try:
+                await asyncio.wait_for(acquire(), timeout=2.0)
+            except Exception as e:
+                print(f"获取MTU失败: {e}")
+
+        try:
+            self.mtu = self.client.mtu_size or DEFAULT_MTU
+        except Exception:
+            self.mtu = DEFAULT_MTU
+        self._write_without_response = "write-without-response" in self.tx_char.properties
+        write_size = self.mtu - 3
+        if self._write_without_response:
+            # 部分平台报告的特征上限比MTU更准确（未知时为默认的20）
+            char_limit = getattr(self.tx_char, 'max_write_without_response_size', None)
+            if char_limit and char_limit > 20:
+                write_size = min(write_size, char_limit)
+        self._write_size = max(20, write_size)
+        mode = "无应答写入" if self._write_without_response else "有应答写入"
+        self._log(f"MTU {self.mtu}，{mode}，每包 {self._write_size} 字节", MessageType.INFO,
+                  LogLevel.DEBUG)
 
     async def _disconnect_device(self):
         """安全断开设备连接"""
@@ -417,6 +731,16 @@ class BLEController(QObject):
             return
 
         try:
+            self._user_disconnect = True
+            self._abandon(self._pipeline.clear() + self._interrupted)
+            self._interrupted = []
+            if self._reconnect:
+                await self._cancel_reconnect()
+                if not self._shutdown:
+                    self._status = "已取消自动重连，继续扫描中..."
+                    self.statusChanged.emit(self._status)
+                    self._log("已取消自动重连", MessageType.INFO)
+
             if not self._connected and not self.client:
                 return
 
@@ -444,7 +768,7 @@ class BLEController(QObject):
                                 timeout=2.0
                             )
                             if not self._shutdown:
-                                self.logMessage.emit("已停止通知", "info")
+                                self._log("已停止通知", MessageType.INFO, LogLevel.DEBUG)
                         except Exception as e:
                             if not self._shutdown:
                                 print(f"停止通知失败: {e}")
@@ -456,7 +780,7 @@ class BLEController(QObject):
                                 timeout=3.0
                             )
                             if not self._shutdown:
-                                self.logMessage.emit("BLE连接已断开", "info")
+                                self._log("BLE连接已断开", MessageType.INFO, LogLevel.DEBUG)
                         except Exception as e:
                             if not self._shutdown:
                                 print(f"断开连接失败: {e}")
@@ -470,11 +794,11 @@ class BLEController(QObject):
             if not self._shutdown:
                 self._status = "已断开连接，继续扫描中..."
                 self.statusChanged.emit(self._status)
-                self.logMessage.emit("设备已断开连接", "success")
+                self._log("设备已断开连接", MessageType.SUCCESS)
 
         except Exception as e:
             if not self._shutdown:
-                self.logMessage.emit(f"断开连接异常: {str(e)}", "error")
+                self._log(f"断开连接异常: {str(e)}", MessageType.ERROR)
                 print(f"断开连接异常: {e}")
         finally:
             try:
@@ -496,33 +820,409 @@ class BLEController(QObject):
     async def _send_command(self, command):
         """异步发送命令实现"""
         if not self.client or not self._connected or self._shutdown:
-            self.logMessage.emit("设备未连接", "error")
+            self._log("设备未连接", MessageType.ERROR)
             return
 
         if not self.tx_char:
-            self.logMessage.emit("TX特征不可用", "error")
+            self._log("TX特征不可用", MessageType.ERROR)
             return
 
+        lines = [line.strip() for line in command.splitlines() if line.strip()]
+        if not lines:
+            return
         try:
-            display_cmd = command.strip()
-            self.logMessage.emit(f"→ {display_cmd}", "sent")
-
-            if not command.endswith('\r\n'):
-                if not command.endswith('\r') and not command.endswith('\n'):
-                    command += '\r\n'
-
-            data = command.encode('utf-8')
+            await self._pipelined_write([CommandProgress(line) for line in lines])
+        except Exception as e:
+            if not self._shutdown:
+                self._log(f"发送失败: {str(e)}", MessageType.ERROR)
+
+    async def _pipelined_write(self, batch, note=""):
+        """等待流水线放行后发出一条命令或一个多行脚本（batch为CommandProgress列表）"""
+        async with self._send_lock:
+            await self._pipeline.acquire(batch)
+            if not self._connected:
+                # 等待期间连接已断开
+                for progress in batch:
+                    progress.interrupted = True
+                    self._pipeline.complete(progress)
+                self._log("设备未连接", MessageType.ERROR)
+                return
 
+            sent_ns = time.monotonic_ns()
+            self._commands_total.inc(len(batch))
+            for progress in batch:
+                progress.sent_ns = sent_ns
+                if not progress.quiet:
+                    self._log(f"→ {progress.command}{note}", MessageType.SENT, timestamp=sent_ns)
+            if len(self._pipeline) == len(batch):
+                self._last_response_at = time.monotonic()
+            self._arm_response_timer()
+            try:
+                await self._write_command("\n".join(progress.command for progress in batch))
+            except Exception:
+                for progress in batch:
+                    progress.interrupted = True
+                    self._pipeline.complete(progress)
+                raise
+
+    async def _write_command(self, command):
+        """把命令（可以是多行脚本）写入TX特征
+
+        每行以CRLF结尾，整体按MTU分包；支持无应答写入时分包之间稍作间隔，
+        否则每包等待设备应答。
+        """
+        lines = [line.strip() for line in command.splitlines() if line.strip()]
+        data = ''.join(line + '\r\n' for line in lines).encode('utf-8')
+        size = self._write_size
+        response = not self._write_without_response
+
+        for start in range(0, len(data), size):
+            chunk = data[start:start + size]
             await asyncio.wait_for(
-                self.client.write_gatt_char(self.tx_char, data),
+                self.client.write_gatt_char(self.tx_char, chunk, response=response),
                 timeout=5.0
             )
+            self._bytes_sent += len(chunk)
+            if not response and start + size < len(data):
+                await asyncio.sleep(WRITE_PACING)
+
+    # ---- 宏 ----
+
+    async def _run_macro(self, steps, name):
+        """逐条执行宏：每条命令在响应结束后立即发出下一条"""
+        if self._macro_runner is not None:
+            self._log("已有宏正在执行，请先停止", MessageType.WARNING)
+            return
+        if not self._connected:
+            self._log("设备未连接", MessageType.ERROR)
+            return
+
+        runner = MacroRunner(self._execute_for_macro,
+                             on_step=lambda result: self.macroStep.emit(result._asdict()),
+                             on_print=lambda text: self._log(text, MessageType.INFO))
+        self._macro_runner = runner
+        self._macro_task = asyncio.current_task()
+        self._log(f"▶ 开始执行{name}", MessageType.INFO)
+        error = ""
+        try:
+            await runner.run(steps)
+        except MacroAbort as e:
+            error = str(e)
+        except asyncio.CancelledError:
+            error = "已停止"
+        finally:
+            self._macro_runner = None
+            self._macro_task = None
+
+        if self._shutdown:
+            return
+        if error:
+            self._log(f"■ {name}中止: {error}", MessageType.WARNING)
+        else:
+            self._log(f"■ {name}完成", MessageType.SUCCESS)
+        self._log(f"共执行 {runner.commands} 条命令，用时 {runner.elapsed:.2f} 秒", MessageType.INFO)
+        for line in format_statistics(runner.stats):
+            self._log(f"  {line}", MessageType.INFO)
+        self.macroFinished.emit({
+            "name": name,
+            "ok": not error,
+            "error": error,
+            "commands": runner.commands,
+            "elapsed": runner.elapsed,
+            "stats": step_statistics(runner.stats),
+        })
+
+    async def _abort_macro(self):
+        task = self._macro_task
+        if task is not None and task is not asyncio.current_task():
+            await self._cancel_task(task)
+
+    async def _execute_for_macro(self, command, quiet=False):
+        """发出一条命令，等待响应结束（断线重连后续传的部分也计入），返回响应行
+
+        quiet为True时收发行不输出到通讯日志、不发出按类型分发的信号（监视新日志的轮询）。
+        """
+        if not self._connected:
+            raise MacroAbort("设备未连接")
+        progress = CommandProgress(command)
+        progress.response = []
+        progress.quiet = quiet
+        finished = self.loop.create_future()
+        progress.on_done = lambda p: finished.done() or finished.set_result(p)
+        await self._pipelined_write([progress])
+        progress = await finished
+        if progress.interrupted:
+            raise MacroAbort(f"连接已断开: {command}")
+        if progress.timed_out:
+            raise MacroAbort(f"等待响应超时: {command}")
+        return progress.response
+
+    # ---- 监视新日志 ----
+
+    async def _set_watching(self, enabled):
+        task = self._watch_task
+        if not enabled:
+            if task is not None and task is not asyncio.current_task():
+                await self._cancel_task(task)
+            return
+        if task is not None:
+            return
+        if not self._connected:
+            self._log("设备未连接", MessageType.ERROR)
+            self.watchingChanged.emit(False)
+            return
+        self._watch_task = self.loop.create_task(self._watch_loop())
+
+    async def _watch_loop(self):
+        """轮询新增的日志，连接中断时等待自动重连后继续，用户断开或放弃重连时结束"""
+        address = self._address
+        name = self.registry.name(address)
+
+        def on_records(records, count):
+            for r in records:
+                self._log(f"🆕 {datetime.fromtimestamp(r.timestamp):%Y-%m-%d %H:%M:%S}  {r.code}  "
+                          f"(设备共 {count} 条)", MessageType.SUCCESS)
+            self.watchRecords.emit(address, name, list(records), count)
+
+        watcher = LogWatcher(_WatchSession(self), on_records)
+        self.watchingChanged.emit(True)
+        self._log(f"👀 开始监视 {name} 的新日志", MessageType.INFO)
+        error = ""
+        try:
+            while True:
+                try:
+                    await watcher.run()
+                except (MacroAbort, ATSessionError) as e:
+                    if self._connected and self._address == address:
+                        # 响应超时或无法解析：稍后继续轮询
+                        self._log(f"监视新日志: {e}", MessageType.WARNING)
+                        await asyncio.sleep(watcher.max_interval)
+                    elif not await self._wait_reconnected(address):
+                        error = str(e)
+                        break
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self._watch_task = None
+
+        if self._shutdown:
+            return
+        self.watchingChanged.emit(False)
+        reason = f"（{error}）" if error else ""
+        self._log(f"■ 已停止监视新日志{reason}，新增 {watcher.received} 条，"
+                  f"轮询 {watcher.polls} 次", MessageType.INFO)
+
+    async def _wait_reconnected(self, address):
+        """等待自动重连，返回是否已重新连接到address（用户断开或放弃重连时返回False）"""
+        while not self._connected and self._reconnect is not None and not self._shutdown:
+            await asyncio.sleep(WATCH_RECONNECT_POLL)
+        return self._connected and self._address == address
+
+    def _abandon(self, progresses):
+        """断开后不再续传的命令：通知等待其响应的宏"""
+        for progress in progresses:
+            progress.interrupted = True
+            if progress.on_done is not None:
+                progress.on_done(progress)
+
+    def _start_link_info(self):
+        if self._link_info_task is None or self._link_info_task.done():
+            self._link_info_task = self.loop.create_task(self._link_info_loop())
+
+    async def _link_info_loop(self):
+        """连接期间定期上报MTU和收发吞吐量"""
+        last_sent, last_received = self._bytes_sent, self._bytes_received
+        last_time = time.monotonic()
+        self.linkInfoChanged.emit(self._link_info(0.0, 0.0))
+        while self._connected and not self._shutdown:
+            await asyncio.sleep(LINK_INFO_INTERVAL)
+            now = time.monotonic()
+            elapsed = now - last_time
+            tx_rate = (self._bytes_sent - last_sent) / elapsed
+            rx_rate = (self._bytes_received - last_received) / elapsed
+            last_sent, last_received, last_time = self._bytes_sent, self._bytes_received, now
+            if self._connected:
+                self.linkInfoChanged.emit(self._link_info(tx_rate, rx_rate))
+
+    def _start_loop_lag_monitor(self):
+        if not self._shutdown:
+            self._loop_lag_task = self.loop.create_task(self._loop_lag_loop())
+
+    async def _loop_lag_loop(self):
+        """定期测量sleep比预定多等待的时间，即事件循环被占用而推迟回调的时长"""
+        while not self._shutdown:
+            expected = self.loop.time() + LOOP_LAG_INTERVAL
+            await asyncio.sleep(LOOP_LAG_INTERVAL)
+            self._loop_lag.observe(max(0.0, self.loop.time() - expected))
+
+    def _link_info(self, tx_rate, rx_rate):
+        return {
+            "mtu": self.mtu,
+            "write_size": self._write_size,
+            "write_without_response": self._write_without_response,
+            "tx_rate": tx_rate,  # 字节/秒
+            "rx_rate": rx_rate,
+        }
+
+    # ---- 断线重连 ----
+
+    def _on_client_disconnected(self, client):
+        """BleakClient断开回调（事件循环线程）"""
+        if client is not self.client or self._shutdown or self._user_disconnect:
+            return
+        self._on_link_lost()
 
-            await asyncio.sleep(0.1)
+    def _on_link_lost(self):
+        """连接意外中断：保留正在执行的命令，等待设备重新广播后重连"""
+        self.client = None
+        self.rx_char = None
+        self.tx_char = None
+        self._connected = False
+        self.connectedChanged.emit(False)
+        self.link_stats["link_losses"] += 1
+        self.linkStatsChanged.emit(dict(self.link_stats))
+
+        # 丢弃中断时未收完的半行，续传时会重新收到
+        self._assembler.flush()
+        device_name = self.registry.name(self._address)
+        self._interrupted = self._pipeline.clear()
+        pending = ""
+        if self._interrupted:
+            head = self._interrupted[0]
+            pending = f"，中断的命令: {head.command}（已确认 {head.acked} 条）"
+            if len(self._interrupted) > 1:
+                pending += f" 等 {len(self._interrupted)} 条"
+
+        if not self.auto_reconnect:
+            self._abandon(self._interrupted)
+            self._interrupted = []
+            self._status = "连接已中断，继续扫描中..."
+            self.statusChanged.emit(self._status)
+            self._log(f"与 {device_name} 的连接意外中断{pending}", MessageType.WARNING)
+            return
+
+        self._reconnect = {
+            "address": self._address,
+            "since": time.monotonic(),
+            "attempts": 0,
+            "retry_at": 0.0,
+            "task": None,
+        }
+        self._status = f"连接中断，等待 {device_name} 重新广播..."
+        self.statusChanged.emit(self._status)
+        self._log(f"与 {device_name} 的连接意外中断，将在设备重新广播时自动重连{pending}",
+                  MessageType.WARNING)
+        if not self._continuous_scanning:
+            self.startContinuousScanning()
 
+    def _schedule_reconnect(self):
+        """收到断开设备的广播时启动重连（失败后按退避间隔等待下一次广播）"""
+        state = self._reconnect
+        if state["task"] is not None or time.monotonic() < state["retry_at"]:
+            return
+        state["task"] = self.loop.create_task(self._reconnect_device(state))
+
+    async def _cancel_reconnect(self):
+        state, self._reconnect = self._reconnect, None
+        if state and state["task"] is not None and state["task"] is not asyncio.current_task():
+            await self._cancel_task(state["task"])
+
+    async def _reconnect_device(self, state):
+        """重新连接中断的设备，恢复通知并续传中断的命令"""
+        address = state["address"]
+        device_name = self.registry.name(address)
+        state["attempts"] += 1
+        self._status = f"正在重新连接 {device_name}（第 {state['attempts']} 次）..."
+        self.statusChanged.emit(self._status)
+
+        client = BleakClient(address, disconnected_callback=self._on_client_disconnected)
+        try:
+            self.client = client
+            await asyncio.wait_for(client.connect(), timeout=10.0)
+            if not self._resolve_cached_characteristics() and not await self._verify_services():
+                raise Exception("AT服务不可用")
+            await client.start_notify(self.rx_char, self._notification_handler)
+            await self._negotiate_mtu()
+        except asyncio.CancelledError:
+            # 重连被取消（断开、连接其他设备或退出）时不留下半开的连接
+            if self.client is client:
+                self.client = None
+            try:
+                await asyncio.wait_for(client.disconnect(), timeout=2.0)
+            except Exception:
+                pass
+            raise
         except Exception as e:
-            if not self._shutdown:
-                self.logMessage.emit(f"发送失败: {str(e)}", "error")
+            if self._reconnect is state:
+                self.client = None
+                try:
+                    await asyncio.wait_for(client.disconnect(), timeout=2.0)
+                except Exception:
+                    pass
+                delay = min(RECONNECT_RETRY_MAX, RECONNECT_RETRY_MIN * 2 ** (state["attempts"] - 1))
+                state["retry_at"] = time.monotonic() + delay
+                state["task"] = None
+                self._status = f"重新连接失败，等待 {device_name} 重新广播..."
+                self.statusChanged.emit(self._status)
+                self._log(f"重新连接失败: {str(e) or type(e).__name__}", MessageType.WARNING)
+            return
+
+        if self._reconnect is not state or self._shutdown:
+            return
+
+        downtime = time.monotonic() - state["since"]
+        self._reconnect = None
+        self._tx_handle = self.tx_char.handle
+        self._rx_handle = self.rx_char.handle
+        self._connected = True
+        self.connectedChanged.emit(True)
+        self._start_link_info()
+        self.link_stats["reconnects"] += 1
+        self.link_stats["last_downtime"] = downtime
+        self.link_stats["total_downtime"] += downtime
+        self.linkStatsChanged.emit(dict(self.link_stats))
+        self._status = f"已重新连接到 {device_name} ({address})"
+        self.statusChanged.emit(self._status)
+        self._log(f"已重新连接到 {device_name}，中断 {downtime:.1f} 秒", MessageType.SUCCESS)
+
+        await self._resume_inflight()
+
+    def _resolve_cached_characteristics(self):
+        """按缓存的句柄取回TX/RX特征，省去重新遍历服务"""
+        if self._tx_handle is None or self._rx_handle is None:
+            return False
+        try:
+            services = self.client.services
+            tx_char = services.get_characteristic(self._tx_handle)
+            rx_char = services.get_characteristic(self._rx_handle)
+        except Exception:
+            return False
+        if (not tx_char or not rx_char or tx_char.uuid.upper() != AT_TX_CHAR_UUID.upper()
+                or rx_char.uuid.upper() != AT_RX_CHAR_UUID.upper()):
+            return False
+        self.tx_char = tx_char
+        self.rx_char = rx_char
+        return True
+
+    async def _resume_inflight(self):
+        """按原顺序续传断开前在途的命令：读取命令从最后确认的记录继续，其余只读命令重发"""
+        interrupted, self._interrupted = self._interrupted, []
+        for progress in interrupted:
+            if not progress.resumable:
+                self._log(f"断开前的命令 {progress.command} 可能已执行，请确认后手动重发",
+                          MessageType.WARNING)
+                self._abandon([progress])
+                continue
+            resumed = progress.resume()
+            note = (f"（续传 {progress.command}，已确认 {progress.acked} 条）"
+                    if progress.acked else "（重发）")
+            try:
+                await self._pipelined_write([resumed], note)
+            except Exception as e:
+                if not self._shutdown:
+                    self._log(f"续传失败: {str(e)}", MessageType.ERROR)
+                self._abandon(interrupted[interrupted.index(progress) + 1:])
+                return
 
     def _notification_handler(self, sender, data):
         """BLE通知处理函数"""
@@ -530,46 +1230,121 @@ class BLEController(QObject):
             return
 
         try:
-            text = ""
-            try:
-                text = data.decode('utf-8', errors='ignore')
-            except:
-                try:
-                    text = data.decode('ascii', errors='ignore')
-                except:
-                    text = data.hex()
-
-            if text:
-                lines = text.replace('\r\n', '\n').replace('\r', '\n').split('\n')
-                for line in lines:
-                    line = line.strip()
-                    if line:
-                        self.logMessage.emit(f"← {line}", "received")
+            received_ns = time.monotonic_ns()
+            self._notifications_total.inc()
+            self._bytes_received += len(data)
+            seq = self.capture.append(sender, data, received_ns)
+
+            # 残行的后续数据和ASCII数据不必试解码；其他数据只在不含任何文本时按HEX显示
+            if self._assembler.pending or data.isascii() or _is_text(data):
+                # 跨通知重组完整的行，并登记到正在执行的命令
+                for line in self._assembler.feed(data):
+                    self._emit_received(line, received_ns)
+                self._partial_received_ns = received_ns
+                self._schedule_partial_flush()
             elif len(data) > 0:
-                hex_str = ' '.join([f'{b:02X}' for b in data])
-                self.logMessage.emit(f"← [HEX: {hex_str}]", "received")
+                self._log(f"← [HEX: {data.hex(' ').upper()}] (数据包 #{seq})", MessageType.RECEIVED,
+                          timestamp=received_ns)
 
         except Exception as e:
             if not self._shutdown:
                 print(f"通知处理异常: {e}")
 
+    def _schedule_partial_flush(self):
+        """残行在一段时间内没有后续通知时按完整行输出
+
+        每个通知只推迟截止时间，定时器到期时未到截止时间再重新登记，
+        不为每个通知取消并新建定时器。
+        """
+        if not self._assembler.pending:
+            return
+        self._partial_deadline = self.loop.time() + PARTIAL_LINE_TIMEOUT
+        if self._partial_timer is None:
+            self._partial_timer = self.loop.call_at(self._partial_deadline, self._flush_partial)
+
+    def _flush_partial(self):
+        self._partial_timer = None
+        if self._shutdown or not self._assembler.pending:
+            return
+        if self.loop.time() < self._partial_deadline:
+            self._partial_timer = self.loop.call_at(self._partial_deadline, self._flush_partial)
+            return
+        for line in self._assembler.flush():
+            self._emit_received(line, self._partial_received_ns)
+
+    def _emit_received(self, line, received_ns):
+        """分类后分配给最早的在途命令，并按类型输出一行响应
+
+        received_ns为该行最后一个通知的接收时刻，延迟从所属命令发出时算起。
+        """
+        self._last_response_at = time.monotonic()
+        response = classify_line(line)
+        head = self._pipeline.head
+        latency = received_ns - head.sent_ns if head is not None and head.sent_ns else -1
+        keep = self._pipeline.feed(response)
+        if latency >= 0 and head.done:
+            self._command_rtt.observe(latency / 1e9)
+        if not keep or (head is not None and head.quiet):
+            return  # 续传时重复收到的记录，或后台轮询的响应
+        if self._macro_runner is not None:
+            self._macro_runner.feed(line)
+        head = self._pipeline.head
+        if head is not None and head.ends_on_idle:
+            self._arm_response_timer(rearm=True)
+        msg_type = RECEIVED_TYPES[response.kind]
+        if not self.filter_received or MESSAGE_LEVELS[msg_type] >= self.verbosity:
+            self.logMessage.emit(f"{RECEIVED_MARK}{line}", msg_type, received_ns, latency)
+        emit_typed_response(self, response)
+
+    def _response_limit(self, head):
+        return IDLE_TIMEOUT if head.ends_on_idle and head.answered else RESPONSE_TIMEOUT
+
+    def _arm_response_timer(self, rearm=False):
+        """在途命令的超时检查：无结束标记的命令空闲后结束，其他命令超时后放弃"""
+        if self._response_timer is not None:
+            if not rearm:
+                return
+            self._response_timer.cancel()
+        head = self._pipeline.head
+        if head is None:
+            self._response_timer = None
+            return
+        remaining = self._last_response_at + self._response_limit(head) - time.monotonic()
+        self._response_timer = self.loop.call_later(max(0.01, remaining),
+                                                    self._check_response_timeout)
+
+    def _check_response_timeout(self):
+        self._response_timer = None
+        head = self._pipeline.head
+        if head is None or self._shutdown:
+            return
+        if time.monotonic() - self._last_response_at >= self._response_limit(head):
+            if not (head.ends_on_idle and head.answered):
+                head.timed_out = True
+                self._timeouts_total.inc()
+                self._log(f"等待响应超时: {head.command}", MessageType.WARNING)
+            self._pipeline.complete(head)
+            self._last_response_at = time.monotonic()
+        self._arm_response_timer()
+
     def _log_device_info(self, services):
-        """记录设备信息"""
+        """记录设备信息（稍后在事件循环中输出，不占用连接流程），只在调试模式下输出"""
+        if self.verbosity > LogLevel.DEBUG:
+            return
+        self._info_task = self.loop.create_task(self._log_device_info_later(services))
 
-        def log_info():
+    async def _log_device_info_later(self, services):
+        await asyncio.sleep(0.5)
+        if self._shutdown:
+            return
+        self._log("=== 设备信息 ===", MessageType.INFO, LogLevel.DEBUG)
+        for service in services:
             if self._shutdown:
-                return
-            time.sleep(0.5)
-            if not self._shutdown:
-                self.logMessage.emit("=== 设备信息 ===", "info")
-                for service in services:
-                    if self._shutdown:
-                        break
-                    self.logMessage.emit(f"服务: {service.uuid}", "info")
-                    for char in service.characteristics:
-                        if self._shutdown:
-                            break
-                        props = ', '.join(char.properties)
-                        self.logMessage.emit(f"  特征: {char.uuid} ({props})", "info")
-
-        threading.Thread(target=log_info, daemon=True).start()
\ No newline at end of file
+                break
+            self._log(f"服务: {service.uuid}", MessageType.INFO, LogLevel.DEBUG)
+            for char in service.characteristics:
+                if self._shutdown:
+                    break
+                props = ', '.join(char.properties)
+                self._log(f"  特征: {char.uuid} ({props})", MessageType.INFO,
+                          LogLevel.DEBUG)
@@ -0,0 +1,509 @@
+"""
+进程隔离的BLE工作进程
+
+扫描、连接和通知处理在独立进程中由BLEController完成，不受界面进程GIL的影响。
+工作进程把事件（完整的接收行、设备发现、状态变化）编码后写入共享内存环形缓冲区，
+界面进程取出后以与BLEController相同的信号发出；命令通过Pipe发往工作进程。
+按类型分发的接收行信号由界面进程从接收行的日志事件还原，不另占缓冲区；
+因此接收行不在工作进程中按详细程度过滤，由界面进程只过滤日志信号。
+工作进程的运行指标（metrics.py）定期以快照转发，界面进程的指标快照中包含它们。
+缓冲区由空变为非空时工作进程经Pipe发一个唤醒字节，界面进程立即取出，另有定时器兜底。
+"""
+
+import asyncio
+import json
+import multiprocessing
+import struct
+import threading
+import time
+from collections import deque
+
+from PyQt6.QtCore import QObject, QSocketNotifier, QTimer, Qt, pyqtSignal
+
+from at_protocol import LogRecord, classify_line
+from log_format import (DEFAULT_VERBOSITY, MESSAGE_LEVELS, RECEIVED_MARK, RECEIVED_TYPES, LogLevel,
+                        MessageType, message_type)
+from metrics import metrics
+from packet_capture import PacketCapture, characteristic_label
+from shm_ring import ShmRing, DEFAULT_CAPACITY
+
+DRAIN_INTERVAL_MS = 20  # 界面进程兜底取出事件的周期
+COMMAND_POLL_INTERVAL = 0.05  # 工作进程等待命令的超时（秒），期间重试积压的事件
+SHUTDOWN_TIMEOUT = 8.0
+METRICS_FORWARD_INTERVAL = 1.0  # 工作进程转发指标快照的周期（秒）
+
+# 事件类型（记录的第一个字节）
+EVENT_LOG = b'L'  # 类型(1字节) + 时刻(int64纳秒) + 延迟(int64纳秒) + 消息
+EVENT_FOUND = b'F'  # RSSI(int16) + 名称 \0 地址
+EVENT_LOST = b'X'  # 地址
+EVENT_SCANNING = b'S'  # 0/1
+EVENT_CONNECTED = b'C'  # 0/1
+EVENT_STATUS = b'T'  # 状态文本
+EVENT_LINK_STATS = b'R'  # 连接中断/重连统计（JSON）
+EVENT_LINK_INFO = b'M'  # MTU、写入方式和吞吐量（JSON）
+EVENT_MACRO_STEP = b'P'  # 宏的一步完成（JSON）
+EVENT_MACRO_DONE = b'D'  # 宏结束（JSON）
+EVENT_WATCHING = b'V'  # 0/1
+EVENT_WATCH_RECORDS = b'W'  # 监视发现的新记录（JSON：地址、名称、记录字段列表、设备条数）
+EVENT_METRICS = b'G'  # 工作进程的指标快照（JSON，见metrics.MetricsRegistry.snapshot）
+EVENT_PACKET = b'N'  # 一批原始通知，每个为：接收时刻(int64纳秒) + 数据长度(uint16)
+#                      + 特征名长度(1字节) + 特征名 + 数据
+
+_RSSI = struct.Struct('<h')
+_LOG = struct.Struct('<Bqq')
+_PACKET = struct.Struct('<qHB')
+PACKET_BATCH_BYTES = 16 * 1024  # 一批通知超过该大小时立即写入，不等本轮事件循环结束
+
+# 界面进程 -> 工作进程的命令及对应的BLEController方法
+COMMANDS = {
+    "start_scan": "startContinuousScanning",
+    "stop_scan": "stopContinuousScanning",
+    "connect": "connectDevice",
+    "disconnect": "disconnectDevice",
+    "send": "sendCommand",
+    "run_macro": "runMacro",
+    "abort_macro": "abortMacro",
+    "set_watching": "setWatching",
+    "set_verbosity": "setVerbosity",
+}
+
+
+class RingPublisher:
+    """工作进程中把BLEController信号编码写入环形缓冲区
+
+    信号可能来自事件循环线程或命令线程，写入时加锁；
+    缓冲区满时先暂存，待界面进程取走后按顺序补写。
+    超过缓冲区容量的记录永远写不进去，会堵住其后的所有事件，发布时直接丢弃并计数。
+    """
+
+    def __init__(self, ring, wake=None):
+        self.ring = ring
+        self.wake = wake  # 缓冲区由空变为非空时调用
+        self.backlog = deque()
+        self.dropped = 0  # 因超过缓冲区容量而丢弃的记录数
+        self._lock = threading.Lock()
+
+    def attach(self, controller):
+        """以直连方式连接控制器信号，在发出信号的线程中直接写入"""
+        direct = Qt.ConnectionType.DirectConnection
+        controller.logMessage.connect(self.on_log_message, direct)
+        controller.deviceFound.connect(self.on_device_found, direct)
+        controller.deviceLost.connect(self.on_device_lost, direct)
+        controller.scanningChanged.connect(self.on_scanning_changed, direct)
+        controller.connectedChanged.connect(self.on_connected_changed, direct)
+        controller.statusChanged.connect(self.on_status_changed, direct)
+        controller.linkStatsChanged.connect(self.on_link_stats_changed, direct)
+        controller.linkInfoChanged.connect(self.on_link_info_changed, direct)
+        controller.macroStep.connect(self.on_macro_step, direct)
+        controller.macroFinished.connect(self.on_macro_finished, direct)
+        controller.watchingChanged.connect(self.on_watching_changed, direct)
+        controller.watchRecords.connect(self.on_watch_records, direct)
+        controller.capture = PacketForwarder(self)
+
+    def publish(self, record):
+        if len(record) > self.ring.max_payload:
+            with self._lock:
+                self.dropped += 1
+            print(f"事件 {record[:1]!r} 长 {len(record)} 字节，超过环形缓冲区容量 "
+                  f"{self.ring.max_payload} 字节，已丢弃")
+            return
+        with self._lock:
+            was_empty = self.ring.pending_bytes() == 0
+            if self.backlog:
+                self._flush_locked()
+            if self.backlog or not self.ring.write(record):
+                self.backlog.append(record)
+            if was_empty and self.wake is not None:
+                self.wake()
+
+    def flush(self):
+        """补写积压的事件"""
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        backlog = self.backlog
+        if backlog and self.ring.pending_bytes() == 0 and self.wake is not None:
+            self.wake()
+        while backlog and self.ring.write(backlog[0]):
+            backlog.popleft()
+
+    def on_log_message(self, message, msg_type, timestamp, latency):
+        self.publish(EVENT_LOG + _LOG.pack(message_type(msg_type), timestamp, latency)
+                     + message.encode('utf-8'))
+
+    def on_device_found(self, name, address, rssi):
+        rssi = max(-32768, min(32767, rssi))
+        self.publish(EVENT_FOUND + _RSSI.pack(rssi) + f"{name}\0{address}".encode('utf-8'))
+
+    def on_device_lost(self, address):
+        self.publish(EVENT_LOST + address.encode('utf-8'))
+
+    def on_scanning_changed(self, scanning):
+        self.publish(EVENT_SCANNING + (b'\1' if scanning else b'\0'))
+
+    def on_connected_changed(self, connected):
+        self.publish(EVENT_CONNECTED + (b'\1' if connected else b'\0'))
+
+    def on_status_changed(self, status):
+        self.publish(EVENT_STATUS + status.encode('utf-8'))
+
+    def on_link_stats_changed(self, stats):
+        self.publish(EVENT_LINK_STATS + json.dumps(stats).encode('utf-8'))
+
+    def on_link_info_changed(self, info):
+        self.publish(EVENT_LINK_INFO + json.dumps(info).encode('utf-8'))
+
+    def on_macro_step(self, result):
+        self.publish(EVENT_MACRO_STEP + json.dumps(result).encode('utf-8'))
+
+    def on_macro_finished(self, summary):
+        self.publish(EVENT_MACRO_DONE + json.dumps(summary).encode('utf-8'))
+
+    def on_watching_changed(self, watching):
+        self.publish(EVENT_WATCHING + (b'\1' if watching else b'\0'))
+
+    def on_watch_records(self, address, name, records, count):
+        payload = json.dumps([address, name, records, count])
+        self.publish(EVENT_WATCH_RECORDS + payload.encode('utf-8'))
+
+
+class PacketForwarder:
+    """工作进程中代替PacketCapture：把原始通知转发给界面进程的ProcessBLEController.capture
+
+    同一轮事件循环中收到的通知合并为一个EVENT_PACKET，在这一轮结束时写入环形缓冲区，
+    避免每个通知都占用一条事件。事件按顺序无丢失地送达，两边的序号一致。
+    """
+
+    def __init__(self, publisher):
+        self.publisher = publisher
+        self.end_seq = 0
+        self._labels = {}  # 特征对象 -> 编码后的特征名
+        self._batch = bytearray()
+
+    def append(self, characteristic, data, timestamp=None):
+        label = self._labels.get(characteristic)
+        if label is None:
+            label = self._labels[characteristic] = characteristic_label(characteristic).encode('utf-8')
+        if timestamp is None:
+            timestamp = time.monotonic_ns()
+        if not self._batch:
+            self._batch += EVENT_PACKET
+            asyncio.get_running_loop().call_soon(self.flush)
+        self._batch += _PACKET.pack(timestamp, len(data), len(label))
+        self._batch += label
+        self._batch += data
+        if len(self._batch) >= PACKET_BATCH_BYTES:
+            self.flush()
+        self.end_seq += 1
+        return self.end_seq - 1
+
+    def flush(self):
+        if self._batch:
+            self.publisher.publish(bytes(self._batch))
+            self._batch.clear()
+
+
+def _use_simulated_devices(devices):
+    """工作进程中改用模拟设备（基准测试和无设备调试用）"""
+    import ble_controller
+    import simulated_device
+
+    for kwargs in devices:
+        simulated_device.register_device(simulated_device.SimulatedLogDevice(**kwargs))
+    ble_controller.BLEAK_AVAILABLE = True
+    ble_controller.BleakClient = simulated_device.SimulatedClient
+    ble_controller.BleakScanner = simulated_device.SimulatedScanner
+
+
+def run_worker(ring_name, conn, scan=True, simulated=None, verbosity=DEFAULT_VERBOSITY):
+    """工作进程入口：运行BLEController，直到收到shutdown命令或界面进程退出"""
+    from ble_controller import BLEController
+
+    if simulated:
+        _use_simulated_devices(simulated)
+
+    def wake():
+        try:
+            conn.send_bytes(b'')
+        except OSError:
+            pass
+
+    ring = ShmRing.attach(ring_name)
+    publisher = RingPublisher(ring, wake)
+    metrics.gauge("ble_ring_backlog_records", "环形缓冲区已满时暂存的事件数",
+                  lambda: len(publisher.backlog))
+    metrics.counter("ble_ring_dropped_records_total", "超过环形缓冲区容量而丢弃的事件数",
+                    lambda: publisher.dropped)
+    # 详细程度在工作进程中生效，被过滤的消息不写入环形缓冲区；
+    # 接收行例外，界面进程要从中还原按类型分发的数据信号，由界面进程过滤
+    controller = BLEController(autostart=False, verbosity=verbosity)
+    controller.filter_received = False
+    publisher.attach(controller)
+    controller.start(scan=scan)
+    # 事件循环就绪前收到的命令会被控制器忽略
+    controller.wait_until_ready(5.0)
+    next_metrics = time.monotonic()
+
+    try:
+        while True:
+            try:
+                if conn.poll(COMMAND_POLL_INTERVAL):
+                    command, *args = conn.recv()
+                    if command == "shutdown":
+                        break
+                    getattr(controller, COMMANDS[command])(*args)
+            except (EOFError, OSError):
+                # 界面进程已退出
+                break
+            except Exception as e:
+                print(f"BLE工作进程处理命令失败: {e}")
+            if time.monotonic() >= next_metrics:
+                next_metrics += METRICS_FORWARD_INTERVAL
+                publisher.publish(EVENT_METRICS + json.dumps(metrics.snapshot()).encode('utf-8'))
+            publisher.flush()
+    finally:
+        controller.shutdown()
+        publisher.flush()
+        ring.close()
+
+
+class ProcessBLEController(QObject):
+    """在独立进程中运行BLE通讯的控制器，信号和方法与BLEController一致"""
+
+    deviceFound = pyqtSignal(str, str, int)  # name, address, rssi
+    deviceLost = pyqtSignal(str)  # address - 设备离线信号
+    scanningChanged = pyqtSignal(bool)
+    connectedChanged = pyqtSignal(bool)
+    statusChanged = pyqtSignal(str)
+    logMessage = pyqtSignal(str, int, 'qint64', 'qint64')  # message, 类型, 时刻, 延迟（见BLEController）
+    linkStatsChanged = pyqtSignal(dict)
+    linkInfoChanged = pyqtSignal(dict)
+    macroStep = pyqtSignal(dict)
+    macroFinished = pyqtSignal(dict)
+    watchingChanged = pyqtSignal(bool)
+    watchRecords = pyqtSignal(str, str, list, int)
+    responseOk = pyqtSignal(str)
+    responseError = pyqtSignal(str)
+    recordReceived = pyqtSignal(object)
+    textReceived = pyqtSignal(str)
+
+    def __init__(self, autostart=True, ring_capacity=DEFAULT_CAPACITY, simulated=None,
+                 verbosity=DEFAULT_VERBOSITY):
+        super().__init__()
+        self.verbosity = LogLevel(verbosity)
+        self._scanning = False
+        self._connected = False
+        self._status = "就绪"
+        self.link_stats = {}
+        self._shutdown = False
+        self._ring_capacity = ring_capacity
+        self._simulated = simulated
+        self.ring = None
+        self.process = None
+        self._conn = None
+        self._notifier = None
+        self.capture = PacketCapture()  # 工作进程转发的原始通知
+        self.worker_metrics = {}  # 工作进程最近转发的指标快照
+        metrics.add_collector(self._collect_worker_metrics)
+        metrics.gauge("ble_ring_pending_bytes", "环形缓冲区中尚未取出的字节数",
+                      lambda: self.ring.pending_bytes() if self.ring is not None else 0)
+
+        self._drain_timer = QTimer(self)
+        self._drain_timer.setInterval(DRAIN_INTERVAL_MS)
+        self._drain_timer.timeout.connect(self.drain)
+
+        if autostart:
+            self.start()
+
+    def start(self, scan=True):
+        """启动工作进程，不阻塞调用线程"""
+        if self.process is not None or self._shutdown:
+            return
+
+        try:
+            self.ring = ShmRing.create(self._ring_capacity)
+            # 界面进程已加载Qt，用spawn启动干净的解释器而不是fork
+            context = multiprocessing.get_context("spawn")
+            self._conn, child_conn = context.Pipe()
+            self.process = context.Process(
+                target=run_worker, args=(self.ring.name, child_conn, scan, self._simulated,
+                                           int(self.verbosity)),
+                name="ble-worker", daemon=True)
+            self.process.start()
+            child_conn.close()
+            self._notifier = QSocketNotifier(self._conn.fileno(), QSocketNotifier.Type.Read, self)
+            self._notifier.activated.connect(self._on_wake)
+            self._drain_timer.start()
+        except Exception as e:
+            print(f"启动BLE工作进程失败: {e}")
+            self.logMessage.emit(f"启动BLE工作进程失败: {e}", MessageType.ERROR, time.monotonic_ns(), -1)
+            self.process = None
+            if self.ring is not None:
+                self.ring.close()
+                self.ring = None
+
+    def wait_until_ready(self, timeout=None):
+        """工作进程是否已启动"""
+        return self.process is not None and self.process.is_alive()
+
+    def _send(self, command, *args):
+        if self._shutdown or self._conn is None:
+            return
+        try:
+            self._conn.send((command, *args))
+        except (BrokenPipeError, OSError) as e:
+            print(f"发送到BLE工作进程失败: {e}")
+
+    def startContinuousScanning(self):
+        self._send("start_scan")
+
+    def stopContinuousScanning(self):
+        self._send("stop_scan")
+
+    def connectDevice(self, address):
+        self._send("connect", address)
+
+    def disconnectDevice(self):
+        self._send("disconnect")
+
+    def sendCommand(self, command):
+        self._send("send", command)
+
+    def runMacro(self, text, name="宏"):
+        self._send("run_macro", text, name)
+
+    def abortMacro(self):
+        self._send("abort_macro")
+
+    def setWatching(self, enabled):
+        self._send("set_watching", enabled)
+
+    def setVerbosity(self, level):
+        self.verbosity = LogLevel(level)
+        self._send("set_verbosity", int(self.verbosity))
+
+    def setDebugMode(self, enabled):
+        self.setVerbosity(LogLevel.DEBUG if enabled else DEFAULT_VERBOSITY)
+
+    def _on_wake(self):
+        """收到唤醒字节"""
+        try:
+            while self._conn.poll():
+                self._conn.recv_bytes()
+        except (EOFError, OSError):
+            # 工作进程已退出，由drain报告
+            self._notifier.setEnabled(False)
+        self.drain()
+
+    def drain(self):
+        """取出工作进程发布的事件并发出对应信号"""
+        if self.ring is None:
+            return
+        for record in self.ring.read_all():
+            self._dispatch(record)
+
+        if self.process is not None and not self.process.is_alive() and not self._shutdown:
+            self._drain_timer.stop()
+            self.logMessage.emit(f"BLE工作进程意外退出 (代码 {self.process.exitcode})",
+                                 MessageType.ERROR, time.monotonic_ns(), -1)
+            if self._connected:
+                self._connected = False
+                self.connectedChanged.emit(False)
+
+    def _dispatch(self, record):
+        kind, body = record[:1], record[1:]
+        if kind == EVENT_LOG:
+            msg_type, timestamp, latency = _LOG.unpack_from(body)
+            msg_type = MessageType(msg_type)
+            message = body[_LOG.size:].decode('utf-8')
+            # 单调时钟在各进程间一致，工作进程的时刻可以直接使用
+            if msg_type in RECEIVED_TYPES and message.startswith(RECEIVED_MARK):
+                # 接收行不论详细程度都会转发，数据信号总是发出，日志在这里过滤
+                if MESSAGE_LEVELS[msg_type] >= self.verbosity:
+                    self.logMessage.emit(message, msg_type, timestamp, latency)
+                self._emit_typed(message[len(RECEIVED_MARK):])
+            else:
+                self.logMessage.emit(message, msg_type, timestamp, latency)
+        elif kind == EVENT_PACKET:
+            self._capture_packets(body)
+        elif kind == EVENT_FOUND:
+            name, _, address = body[_RSSI.size:].decode('utf-8').partition('\0')
+            self.deviceFound.emit(name, address, _RSSI.unpack_from(body)[0])
+        elif kind == EVENT_LOST:
+            self.deviceLost.emit(body.decode('utf-8'))
+        elif kind == EVENT_SCANNING:
+            self._scanning = body == b'\1'
+            self.scanningChanged.emit(self._scanning)
+        elif kind == EVENT_CONNECTED:
+            self._connected = body == b'\1'
+            self.connectedChanged.emit(self._connected)
+        elif kind == EVENT_STATUS:
+            self._status = body.decode('utf-8')
+            self.statusChanged.emit(self._status)
+        elif kind == EVENT_LINK_STATS:
+            self.link_stats = json.loads(body)
+            self.linkStatsChanged.emit(self.link_stats)
+        elif kind == EVENT_LINK_INFO:
+            self.linkInfoChanged.emit(json.loads(body))
+        elif kind == EVENT_MACRO_STEP:
+            self.macroStep.emit(json.loads(body))
+        elif kind == EVENT_MACRO_DONE:
+            self.macroFinished.emit(json.loads(body))
+        elif kind == EVENT_WATCHING:
+            self.watchingChanged.emit(body == b'\1')
+        elif kind == EVENT_WATCH_RECORDS:
+            address, name, records, count = json.loads(body)
+            self.watchRecords.emit(address, name, [LogRecord(*r) for r in records], count)
+        elif kind == EVENT_METRICS:
+            self.worker_metrics = json.loads(body)
+
+    def _capture_packets(self, body):
+        offset = 0
+        while offset < len(body):
+            timestamp, length, label_length = _PACKET.unpack_from(body, offset)
+            start = offset + _PACKET.size + label_length
+            label = body[offset + _PACKET.size:start]
+            offset = start + length
+            self.capture.append(label.decode('utf-8'), body[start:offset], timestamp)
+
+    def _collect_worker_metrics(self):
+        return self.worker_metrics
+
+    def _emit_typed(self, line):
+        """还原按类型分发的接收行信号（没有连接时跳过分类）"""
+        if (self.receivers(self.recordReceived) or self.receivers(self.responseOk)
+                or self.receivers(self.responseError) or self.receivers(self.textReceived)):
+            from ble_controller import emit_typed_response
+            emit_typed_response(self, classify_line(line))
+
+    def shutdown(self):
+        """通知工作进程退出并释放共享内存"""
+        if self._shutdown:
+            return
+        print("开始关闭BLE工作进程...")
+        try:
+            self._send("shutdown")
+            self._shutdown = True
+            if self.process is not None:
+                self.process.join(SHUTDOWN_TIMEOUT)
+                if self.process.is_alive():
+                    print("BLE工作进程未按时退出，强制结束")
+                    self.process.terminate()
+                    self.process.join(1.0)
+        except Exception as e:
+            print(f"关闭BLE工作进程时出错: {e}")
+        finally:
+            self._drain_timer.stop()
+            if self._notifier is not None:
+                self._notifier.setEnabled(False)
+                self._notifier = None
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+            if self.ring is not None:
+                self.ring.close()
+                self.ring = None
+            self._connected = False
+            metrics.remove_collector(self._collect_worker_metrics)
+            print("BLE工作进程已关闭")
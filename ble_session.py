@@ -0,0 +1,291 @@
+"""
+无界面BLE AT会话 - 只依赖asyncio和bleak，不导入Qt
+
+扫描Surron设备、按名称或地址连接、发送AT命令并收集响应、完整下载日志。
+供命令行工具 surron_cli.py 使用。
+"""
+
+import asyncio
+import importlib.util
+from collections import deque
+
+from at_pipeline import CommandPipeline, DEFAULT_WINDOW
+from at_protocol import (AT_SERVICE_UUID, AT_TX_CHAR_UUID, AT_RX_CHAR_UUID,
+                         CommandProgress, LineAssembler, LineKind, classify_line, encode_command,
+                         has_end_marker, is_response_complete, is_surron_device)
+
+BLEAK_AVAILABLE = importlib.util.find_spec("bleak") is not None
+
+BleakScanner = None
+BleakClient = None
+
+CONNECT_TIMEOUT = 10.0
+WRITE_TIMEOUT = 5.0
+RESPONSE_TIMEOUT = 10.0  # 等待下一行响应的最长时间
+IDLE_TIMEOUT = 0.5  # 无结束标记的命令：最后一行之后静默多久视为结束
+
+
+def _import_bleak():
+    """首次使用时导入bleak"""
+    global BleakScanner, BleakClient
+    if BleakClient is None:
+        if not BLEAK_AVAILABLE:
+            raise ATSessionError("bleak库未安装，请运行: pip install bleak")
+        from bleak import BleakScanner as scanner, BleakClient as client
+        BleakScanner, BleakClient = scanner, client
+
+
+class ATSessionError(Exception):
+    """连接或通讯失败"""
+
+
+async def scan(timeout=3.0, surron_only=True):
+    """扫描设备，返回 {地址: (名称, RSSI)}"""
+    _import_bleak()
+    devices = {}
+
+    def detection_callback(device, advertisement_data):
+        name = device.name if device.name else "Unknown"
+        if surron_only and not is_surron_device(name):
+            return
+        devices[device.address] = (name, advertisement_data.rssi)
+
+    scanner = BleakScanner(detection_callback)
+    await scanner.start()
+    try:
+        await asyncio.sleep(timeout)
+    finally:
+        await scanner.stop()
+    return devices
+
+
+async def watch_adverts(registry):
+    """持续扫描，把每次广播登记到DeviceRegistry，直到任务被取消"""
+    _import_bleak()
+
+    def detection_callback(device, advertisement_data):
+        name = device.name if device.name else "Unknown"
+        registry.seen(device.address, name, advertisement_data.rssi)
+
+    scanner = BleakScanner(detection_callback)
+    await scanner.start()
+    try:
+        await asyncio.Future()
+    finally:
+        await scanner.stop()
+
+
+async def resolve_target(target, timeout=5.0):
+    """按地址或名称（不区分大小写）查找设备，返回 (地址, 名称)"""
+    devices = await scan(timeout, surron_only=False)
+    wanted = target.lower()
+    for address, (name, _) in devices.items():
+        if address.lower() == wanted or name.lower() == wanted:
+            return address, name
+    raise ATSessionError(f"未找到设备: {target}")
+
+
+class ATSession:
+    """单个设备的AT命令会话"""
+
+    def __init__(self, address, name="Unknown", on_line=None):
+        self.address = address
+        self.name = name
+        self.on_line = on_line  # 每收到一行调用 on_line(line)
+        self.client = None
+        self.tx_char = None
+        self.rx_char = None
+        self.bytes_received = 0
+        self._assembler = LineAssembler()
+        self._lines = asyncio.Queue()  # 响应行；None用于唤醒等待（发送结束或连接断开）
+        self._lost = False
+        self._lock = asyncio.Lock()
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.disconnect()
+
+    @property
+    def is_connected(self):
+        return self.client is not None and self.client.is_connected
+
+    async def connect(self, timeout=CONNECT_TIMEOUT):
+        """连接设备、查找AT特征并启用通知"""
+        _import_bleak()
+        self._lost = False
+        self.client = BleakClient(self.address, disconnected_callback=self._on_disconnected)
+        try:
+            await asyncio.wait_for(self.client.connect(), timeout=timeout)
+            if not self.client.is_connected:
+                raise ATSessionError("连接失败")
+
+            service = next((s for s in self.client.services
+                            if s.uuid.upper() == AT_SERVICE_UUID), None)
+            if service is None:
+                raise ATSessionError(f"设备不支持AT服务 ({AT_SERVICE_UUID})")
+            for char in service.characteristics:
+                if char.uuid.upper() == AT_TX_CHAR_UUID:
+                    self.tx_char = char
+                elif char.uuid.upper() == AT_RX_CHAR_UUID:
+                    self.rx_char = char
+            if not self.tx_char or not self.rx_char:
+                raise ATSessionError("设备缺少必要的AT特征")
+
+            await self.client.start_notify(self.rx_char, self._notification_handler)
+        except Exception:
+            await self.disconnect()
+            raise
+
+    async def disconnect(self):
+        """断开连接"""
+        client, self.client = self.client, None
+        if client is None:
+            return
+        try:
+            if client.is_connected:
+                await asyncio.wait_for(client.disconnect(), timeout=2.0)
+        except Exception as e:
+            print(f"断开BLE连接失败: {e}")
+
+    def _on_disconnected(self, client):
+        """连接意外断开：唤醒正在等待响应的命令"""
+        if client is self.client:
+            self._lost = True
+            self._lines.put_nowait(None)
+
+    async def _write(self, command):
+        try:
+            await asyncio.wait_for(
+                self.client.write_gatt_char(self.tx_char, encode_command(command)),
+                timeout=WRITE_TIMEOUT)
+        except (ATSessionError, asyncio.TimeoutError):
+            raise
+        except Exception as e:
+            raise ATSessionError(f"写入失败: {e}") from e
+
+    def _notification_handler(self, sender, data):
+        self.bytes_received += len(data)
+        for line in self._assembler.feed(data):
+            if self.on_line:
+                self.on_line(line)
+            self._lines.put_nowait(line)
+
+    async def command(self, command, timeout=RESPONSE_TIMEOUT, idle_timeout=IDLE_TIMEOUT):
+        """发送一条AT命令，返回响应行列表
+
+        有结束标记的命令收到结束行即返回，相邻两行间隔超过timeout视为失败；
+        其他命令在最后一行之后静默idle_timeout秒返回。
+        """
+        if not self.is_connected:
+            raise ATSessionError("设备未连接")
+
+        async with self._lock:
+            # 丢弃上一条命令之后才到达的多余行
+            while not self._lines.empty():
+                self._lines.get_nowait()
+
+            await self._write(command)
+
+            lines = []
+            idle_ends = not has_end_marker(command)
+            while True:
+                wait = idle_timeout if lines and idle_ends else timeout
+                try:
+                    line = await asyncio.wait_for(self._lines.get(), timeout=wait)
+                except asyncio.TimeoutError:
+                    if lines and idle_ends:
+                        return lines
+                    raise ATSessionError(f"等待响应超时: {command}")
+                if line is None:
+                    if self._lost:
+                        raise ATSessionError("连接意外断开")
+                    continue
+                lines.append(line)
+                if is_response_complete(command, line):
+                    return lines
+
+    async def pipeline(self, commands, window=DEFAULT_WINDOW, timeout=RESPONSE_TIMEOUT,
+                       idle_timeout=IDLE_TIMEOUT):
+        """流水线执行多条AT命令，返回与commands对应的响应行列表
+
+        最多window条只读命令同时在途（见at_pipeline），window=1时与逐条调用command()相同。
+        """
+        responses = []
+        await self.stream(commands, lambda command, lines: responses.append(lines),
+                          window, timeout=timeout, idle_timeout=idle_timeout)
+        return responses
+
+    async def stream(self, commands, on_response, window=DEFAULT_WINDOW, pipelined_writes=False,
+                     timeout=RESPONSE_TIMEOUT, idle_timeout=IDLE_TIMEOUT):
+        """流水线执行commands（可以是生成器），每条命令结束时按顺序调用
+        on_response(command, lines)
+
+        pipelined_writes=True 时AT+LOGINSERT也同时在途（用于批量写入）。
+        """
+        if not self.is_connected:
+            raise ATSessionError("设备未连接")
+
+        async with self._lock:
+            while not self._lines.empty():
+                self._lines.get_nowait()
+
+            pipeline = CommandPipeline(window, pipelined_writes)
+            sent = deque()  # 已发出、尚未结束的命令
+
+            async def send_all():
+                for command in commands:
+                    progress = CommandProgress(command)
+                    await pipeline.acquire([progress])
+                    sent.append(progress)
+                    await self._write(progress.command)
+
+            sender = asyncio.ensure_future(send_all())
+            # 发送结束（或出错）时放入None唤醒接收循环
+            sender.add_done_callback(lambda _: self._lines.put_nowait(None))
+            lines = []
+            try:
+                while sent or not sender.done():
+                    progress = sent[0] if sent else None
+                    idle = bool(lines) and progress.ends_on_idle
+                    try:
+                        line = await asyncio.wait_for(
+                            self._lines.get(), timeout=idle_timeout if idle else timeout)
+                    except asyncio.TimeoutError:
+                        if not idle:
+                            raise ATSessionError(f"等待响应超时: {progress.command}"
+                                                 if progress else "等待响应超时")
+                        pipeline.complete(progress)
+                    else:
+                        if line is None:
+                            if self._lost:
+                                raise ATSessionError("连接意外断开")
+                            sender.result()  # 发送出错时抛出
+                            continue
+                        progress = sent[0] if sent else None
+                        if progress is None:
+                            continue  # 不属于任何命令的多余行
+                        pipeline.feed(classify_line(line))
+                        lines.append(line)
+                    if progress is not None and progress.done:
+                        sent.popleft()
+                        on_response(progress.command, lines)
+                        lines = []
+                sender.result()
+            finally:
+                if not sender.done():
+                    sender.cancel()
+                    await asyncio.gather(sender, return_exceptions=True)
+
+    async def download(self, command="AT+LOGREADALL"):
+        """读取日志，返回LogRecord列表"""
+        records = []
+        for line in await self.command(command):
+            response = classify_line(line)
+            if response.record is not None:
+                records.append(response.record)
+            elif response.kind == LineKind.ERROR:
+                raise ATSessionError(line)
+        return records
@@ -1,7 +1,10 @@
 from PyQt6.QtWidgets import (QWidget, QHBoxLayout, QVBoxLayout, QPushButton,
-                             QLabel, QListWidget, QTextEdit, QListWidgetItem, QFrame)
+                             QLabel, QTextEdit, QFrame)
 from PyQt6.QtCore import Qt, pyqtSignal, QPoint, QPropertyAnimation, QEasingCurve
-from PyQt6.QtGui import QPainter, QPen, QColor, QFont, QIcon, QPainterPath
+from PyQt6.QtGui import QPainter, QPen, QColor, QFont, QIcon, QPainterPath, QTextCursor
+
+from log_format import LINE_SEPARATOR
+from ui_components import MessageFormats, DeviceListWidget as BaseDeviceListWidget
 
 
 class WindowControlButton(QPushButton):
@@ -251,14 +254,13 @@ class StatusIndicator(QWidget):
             painter.drawEllipse(2, 2, 4, 4)
 
 
-class DeviceListWidget(QListWidget):
-    """自定义设备列表控件"""
+class DeviceListWidget(BaseDeviceListWidget):
+    """自定义设备列表控件 - 共用模型/代理模型实现，仅外观不同"""
 
     def __init__(self):
         super().__init__()
-        self.setMinimumHeight(300)
         self.setStyleSheet("""
-            QListWidget {
+            QTableView {
                 background: #f8f9fa;
                 border: 1px solid #dee2e6;
                 border-radius: 8px;
@@ -266,53 +268,28 @@ class DeviceListWidget(QListWidget):
                 font-size: 12px;
                 outline: none;
             }
-            QListWidget::item {
+            QTableView::item {
                 background: white;
-                border-radius: 6px;
                 padding: 8px;
-                margin: 2px;
-                border: 1px solid #e9ecef;
+                border-bottom: 1px solid #e9ecef;
             }
-            QListWidget::item:hover {
+            QTableView::item:hover {
                 background: #f1f3f4;
-                border: 1px solid #667eea;
-                transform: translateY(-1px);
             }
-            QListWidget::item:selected {
+            QTableView::item:selected {
                 background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
                     stop:0 rgba(102, 126, 234, 0.1), stop:1 rgba(102, 126, 234, 0.05));
-                border: 2px solid #667eea;
                 font-weight: bold;
                 color: #333;
             }
         """)
 
-    def add_device(self, name, address, rssi):
-        """添加设备到列表"""
-        # 检查是否已存在
-        for i in range(self.count()):
-            item = self.item(i)
-            if item.data(1) == address:
-                # 更新现有项
-                item.setText(f"📱 {name}\n📍 {address}\n📶 RSSI: {rssi} dBm")
-                return
-
-        # 添加新项
-        item = QListWidgetItem(f"📱 {name}\n📍 {address}\n📶 RSSI: {rssi} dBm")
-        item.setData(1, address)  # 存储地址
-        self.addItem(item)
-
-    def get_selected_address(self):
-        """获取选中设备的地址"""
-        current_item = self.currentItem()
-        if current_item:
-            return current_item.data(1)
-        return None
-
 
 class LogTextEdit(QTextEdit):
     """自定义日志文本控件"""
 
+    _formats = None  # 所有实例共享的MessageFormats
+
     def __init__(self):
         super().__init__()
         self.setReadOnly(True)
@@ -348,34 +325,22 @@ class LogTextEdit(QTextEdit):
             }
         """)
 
-    def add_log_message(self, message, msg_type, timestamp):
-        """添加日志消息"""
-        # 根据类型设置颜色和图标
-        type_config = {
-            "error": {"color": "#ff6b6b", "icon": "❌"},
-            "success": {"color": "#51cf66", "icon": "✅"},
-            "warning": {"color": "#ffd43b", "icon": "⚠️"},
-            "sent": {"color": "#74c0fc", "icon": "📤"},
-            "received": {"color": "#69db7c", "icon": "📥"},
-            "info": {"color": "#91a7ff", "icon": "ℹ️"}
-        }
-
-        config = type_config.get(msg_type, {"color": "#ffffff", "icon": "📝"})
-
-        # 创建HTML格式的消息
-        html_msg = f'''
-        <div style="margin: 2px 0; padding: 4px 8px; border-left: 3px solid {config['color']}; background: rgba(255,255,255,0.02);">
-            <span style="color: #888; font-size: 11px;">[{timestamp}]</span>
-            <span style="color: {config['color']}; margin: 0 4px;">{config['icon']}</span>
-            <span style="color: {config['color']};">{message}</span>
-        </div>
-        '''
+        # 消息格式只在启动时创建一次
+        if LogTextEdit._formats is None:
+            LogTextEdit._formats = MessageFormats(font_size=13, timestamp_size=11,
+                                                  block_margin=2, icon_on_own_line=False)
+        self.formats = LogTextEdit._formats
+        self._cursor = QTextCursor(self.document())
 
+    def add_log_message(self, message, msg_type, timestamp, wall_time=None):
+        """添加日志消息（wall_time与ui_components.LogTextEdit一致，这里不使用）"""
         # 存储纯文本版本用于保存
         plain_msg = f"[{timestamp}] {message}"
         self.log_content.append(plain_msg)
 
-        self.insertHtml(html_msg)
+        # 按类型取预先创建的格式，只插入纯文本
+        self._cursor.movePosition(QTextCursor.MoveOperation.End)
+        self.formats.append(self._cursor, message.replace('\n', LINE_SEPARATOR), msg_type, timestamp)
 
         # 自动滚动到底部
         scrollbar = self.verticalScrollBar()
@@ -385,6 +350,7 @@ class LogTextEdit(QTextEdit):
         """清除日志"""
         self.clear()
         self.log_content.clear()
+        self._cursor = QTextCursor(self.document())
 
     def get_log_content(self):
         """获取日志内容"""
@@ -416,6 +382,74 @@ class GlowEffect(QWidget):
             color.setAlpha(alpha // 8)  # 降低透明度使效果更柔和
 
 
+# 帮助内容 - 模块级常量，只构建一次
+HELP_HTML = """
+<div style="font-family: Arial, sans-serif; line-height: 1.6; color: #2d3748;">
+
+<h2 style="color: #4a5568; border-bottom: 2px solid #e2e8f0; padding-bottom: 10px;">
+🔧 Surron BLE AT通讯工具 v2.1.0
+</h2>
+
+<h3 style="color: #2d3748; margin-top: 25px;">🚀 快速开始</h3>
+<ol style="padding-left: 20px;">
+<li><b>设备扫描</b>: 点击 "🔍 开始扫描" 搜索附近的Surron设备</li>
+<li><b>选择设备</b>: 在列表中单击选择设备，或双击直接连接</li>
+<li><b>建立连接</b>: 点击 "🔗 连接设备" 或双击设备建立连接</li>
+<li><b>发送命令</b>: 使用快捷按钮或手动输入AT命令</li>
+</ol>
+
+<h3 style="color: #2d3748; margin-top: 25px;">📊 状态指示</h3>
+<ul style="padding-left: 20px;">
+<li><b style="color: #e53e3e;">🔴 红色</b>: 错误状态</li>
+<li><b style="color: #d69e2e;">🟡 黄色</b>: 连接中/扫描中</li>
+<li><b style="color: #38a169;">🟢 绿色</b>: 已连接</li>
+<li><b style="color: #a0aec0;">⚪ 灰色</b>: 断开连接</li>
+</ul>
+
+<h3 style="color: #2d3748; margin-top: 25px;">⚡ 快捷命令</h3>
+<div style="background: #f7fafc; padding: 15px; border-radius: 8px; border-left: 4px solid #4a5568;">
+<ul style="margin: 0; padding-left: 20px;">
+<li><b>📋 读取5条</b>: AT+LOGLATEST=5</li>
+<li><b>📊 获取状态</b>: AT+LOGSTATUS</li>
+<li><b>🔧 系统信息</b>: AT+LOGSTATS</li>
+<li><b>📈 日志统计</b>: AT+LOGCOUNT</li>
+<li><b>🗑️ 清除日志</b>: AT+LOGCLEAR</li>
+</ul>
+</div>
+
+<h3 style="color: #2d3748; margin-top: 25px;">🪟 窗口操作</h3>
+<ul style="padding-left: 20px;">
+<li><b>移动窗口</b>: 拖拽标题栏</li>
+<li><b>最大化/还原</b>: 双击标题栏或点击最大化按钮</li>
+<li><b>最小化</b>: 点击最小化按钮</li>
+<li><b>关闭程序</b>: 点击关闭按钮</li>
+</ul>
+
+<h3 style="color: #2d3748; margin-top: 25px;">💡 使用技巧</h3>
+<div style="background: #edf2f7; padding: 15px; border-radius: 8px;">
+<ul style="margin: 0; padding-left: 20px;">
+<li>设备列表显示RSSI信号强度，选择信号强的设备</li>
+<li>日志区域支持彩色显示，方便区分不同类型的消息</li>
+<li>可以使用 Enter 键快速发送命令</li>
+<li>长时间无响应时，尝试重新连接设备</li>
+</ul>
+</div>
+
+<h3 style="color: #2d3748; margin-top: 25px;">🆘 故障排除</h3>
+<ul style="padding-left: 20px;">
+<li><b>扫描不到设备</b>: 确保设备已开机且在附近</li>
+<li><b>连接失败</b>: 检查设备是否被其他程序占用</li>
+<li><b>命令无响应</b>: 检查设备连接状态，必要时重新连接</li>
+</ul>
+
+<div style="text-align: center; margin-top: 30px; padding: 15px; background: #f0fff4; border-radius: 8px; border: 1px solid #9ae6b4;">
+<p style="margin: 0; color: #2d3748;"><b>开发者</b>: T01284 | <b>版本</b>: 2.1.0</p>
+</div>
+
+</div>
+        """
+
+
 class HelpDialog(QWidget):
     """自定义帮助对话框"""
 
@@ -512,75 +546,8 @@ class HelpDialog(QWidget):
         scroll_area = QWidget()
         scroll_layout = QVBoxLayout(scroll_area)
 
-        help_text = """
-<div style="font-family: Arial, sans-serif; line-height: 1.6; color: #2d3748;">
-
-<h2 style="color: #4a5568; border-bottom: 2px solid #e2e8f0; padding-bottom: 10px;">
-🔧 Surron BLE AT通讯工具 v2.1.0
-</h2>
-
-<h3 style="color: #2d3748; margin-top: 25px;">🚀 快速开始</h3>
-<ol style="padding-left: 20px;">
-<li><b>设备扫描</b>: 点击 "🔍 开始扫描" 搜索附近的Surron设备</li>
-<li><b>选择设备</b>: 在列表中单击选择设备，或双击直接连接</li>
-<li><b>建立连接</b>: 点击 "🔗 连接设备" 或双击设备建立连接</li>
-<li><b>发送命令</b>: 使用快捷按钮或手动输入AT命令</li>
-</ol>
-
-<h3 style="color: #2d3748; margin-top: 25px;">📊 状态指示</h3>
-<ul style="padding-left: 20px;">
-<li><b style="color: #e53e3e;">🔴 红色</b>: 错误状态</li>
-<li><b style="color: #d69e2e;">🟡 黄色</b>: 连接中/扫描中</li>
-<li><b style="color: #38a169;">🟢 绿色</b>: 已连接</li>
-<li><b style="color: #a0aec0;">⚪ 灰色</b>: 断开连接</li>
-</ul>
-
-<h3 style="color: #2d3748; margin-top: 25px;">⚡ 快捷命令</h3>
-<div style="background: #f7fafc; padding: 15px; border-radius: 8px; border-left: 4px solid #4a5568;">
-<ul style="margin: 0; padding-left: 20px;">
-<li><b>📋 读取5条</b>: AT+LOGLATEST=5</li>
-<li><b>📊 获取状态</b>: AT+LOGSTATUS</li>
-<li><b>🔧 系统信息</b>: AT+LOGSTATS</li>
-<li><b>📈 日志统计</b>: AT+LOGCOUNT</li>
-<li><b>🗑️ 清除日志</b>: AT+LOGCLEAR</li>
-</ul>
-</div>
-
-<h3 style="color: #2d3748; margin-top: 25px;">🪟 窗口操作</h3>
-<ul style="padding-left: 20px;">
-<li><b>移动窗口</b>: 拖拽标题栏</li>
-<li><b>最大化/还原</b>: 双击标题栏或点击最大化按钮</li>
-<li><b>最小化</b>: 点击最小化按钮</li>
-<li><b>关闭程序</b>: 点击关闭按钮</li>
-</ul>
-
-<h3 style="color: #2d3748; margin-top: 25px;">💡 使用技巧</h3>
-<div style="background: #edf2f7; padding: 15px; border-radius: 8px;">
-<ul style="margin: 0; padding-left: 20px;">
-<li>设备列表显示RSSI信号强度，选择信号强的设备</li>
-<li>日志区域支持彩色显示，方便区分不同类型的消息</li>
-<li>可以使用 Enter 键快速发送命令</li>
-<li>长时间无响应时，尝试重新连接设备</li>
-</ul>
-</div>
-
-<h3 style="color: #2d3748; margin-top: 25px;">🆘 故障排除</h3>
-<ul style="padding-left: 20px;">
-<li><b>扫描不到设备</b>: 确保设备已开机且在附近</li>
-<li><b>连接失败</b>: 检查设备是否被其他程序占用</li>
-<li><b>命令无响应</b>: 检查设备连接状态，必要时重新连接</li>
-</ul>
-
-<div style="text-align: center; margin-top: 30px; padding: 15px; background: #f0fff4; border-radius: 8px; border: 1px solid #9ae6b4;">
-<p style="margin: 0; color: #2d3748;"><b>开发者</b>: T01284 | <b>版本</b>: 2.1.0</p>
-</div>
-
-</div>
-        """
-
-        from PyQt6.QtWidgets import QTextEdit
         text_edit = QTextEdit()
-        text_edit.setHtml(help_text)
+        text_edit.setHtml(HELP_HTML)
         text_edit.setReadOnly(True)
         text_edit.setStyleSheet("""
             QTextEdit {
@@ -0,0 +1,75 @@
+"""
+扫描到的设备登记表 - 不依赖Qt
+
+由扫描回调更新，记录每台设备的名称、最新和平滑后的RSSI、首次/最后发现时间。
+BLEController用它判断设备离线，调度器用它选择下一台要下载的设备。
+"""
+
+import time
+
+RSSI_SMOOTHING = 0.3  # RSSI指数平滑系数，越大越跟随最新值
+
+
+class Sighting:
+    """一台设备的广播记录"""
+
+    __slots__ = ('address', 'name', 'rssi', 'rssi_avg', 'first_seen', 'last_seen', 'adverts')
+
+    def __init__(self, address, name, rssi, now):
+        self.address = address
+        self.name = name
+        self.rssi = rssi
+        self.rssi_avg = float(rssi)
+        self.first_seen = now
+        self.last_seen = now
+        self.adverts = 1
+
+
+class DeviceRegistry:
+    """地址 -> Sighting"""
+
+    def __init__(self):
+        self.devices = {}
+
+    def __len__(self):
+        return len(self.devices)
+
+    def __contains__(self, address):
+        return address in self.devices
+
+    def __iter__(self):
+        return iter(list(self.devices.values()))
+
+    def get(self, address):
+        return self.devices.get(address)
+
+    def name(self, address, default="Unknown"):
+        sighting = self.devices.get(address)
+        return sighting.name if sighting else default
+
+    def seen(self, address, name, rssi, now=None):
+        """登记一次广播，返回对应的Sighting"""
+        now = time.time() if now is None else now
+        sighting = self.devices.get(address)
+        if sighting is None:
+            sighting = self.devices[address] = Sighting(address, name, rssi, now)
+            return sighting
+        sighting.name = name
+        sighting.rssi = rssi
+        sighting.rssi_avg += RSSI_SMOOTHING * (rssi - sighting.rssi_avg)
+        sighting.last_seen = now
+        sighting.adverts += 1
+        return sighting
+
+    def recent(self, max_age, now=None):
+        """最近max_age秒内发现过的设备"""
+        now = time.time() if now is None else now
+        return [s for s in self.devices.values() if now - s.last_seen <= max_age]
+
+    def expire(self, max_age, now=None):
+        """移除超过max_age秒未发现的设备，返回被移除的Sighting列表"""
+        now = time.time() if now is None else now
+        expired = [s for s in self.devices.values() if now - s.last_seen > max_age]
+        for sighting in expired:
+            del self.devices[sighting.address]
+        return expired
@@ -0,0 +1,124 @@
+"""
+诊断面板 - 列出运行指标（见metrics.py）的当前值和最近一秒的变化
+
+计数器显示累计值和每秒速率（广播、通知、收发字节等），仪表显示当前值（队列深度等），
+直方图显示累计样本数和均值，以及区间内的样本数、均值和p95（命令往返时间、事件循环延迟、
+日志追加耗时）。面板有自己的MetricsSampler，只在可见时采样，不影响导出文件中的速率。
+"""
+
+import math
+
+from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QLabel, QTableWidget, QTableWidgetItem,
+                             QHeaderView, QAbstractItemView)
+from PyQt6.QtCore import Qt, QTimer
+
+from metrics import MetricsSampler
+
+REFRESH_INTERVAL_MS = 1000
+
+
+def _format_number(value):
+    if isinstance(value, float) and not value.is_integer():
+        return f"{value:,.3f}"
+    return f"{int(value):,}"
+
+
+def _format_ms(seconds):
+    if math.isnan(seconds):
+        return "-"
+    if math.isinf(seconds):
+        return "超出分桶"
+    return f"{seconds * 1000:.1f} ms"
+
+
+def _describe(name, entry, sample):
+    """指标的当前值和区间变化的显示文本"""
+    if entry["type"] == "histogram":
+        count = entry["count"]
+        mean = entry["sum"] / count if count else math.nan
+        interval = sample["intervals"].get(name)
+        change = ""
+        if interval is not None and interval["count"]:
+            change = (f"{interval['count']} 次 · 均值 {_format_ms(interval['mean'])} · "
+                      f"p95 ≤ {_format_ms(interval['p95'])}")
+        return f"{count} 次 · 均值 {_format_ms(mean)}", change
+    value = _format_number(entry["value"])
+    rate = sample["rates"].get(name)
+    return value, f"{rate:,.1f} /s" if rate is not None else ""
+
+
+class DiagnosticsPanel(QWidget):
+    """运行指标表格"""
+
+    COLUMNS = ["指标", "当前值", "最近变化", "说明"]
+
+    def __init__(self, registry, export_dir=None):
+        super().__init__()
+        self.sampler = MetricsSampler(registry)
+        self._rows = {}  # 指标名称 -> 行号
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        if export_dir:
+            export_text = f"指标每隔一段时间写入 {export_dir}（Prometheus文本格式和JSON）"
+        else:
+            export_text = "指标未导出到文件（启动时加 --metrics-dir 目录）"
+        self.export_label = QLabel(export_text)
+        layout.addWidget(self.export_label)
+
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.table.setWordWrap(False)
+        self.table.verticalHeader().setVisible(False)
+        header = self.table.horizontalHeader()
+        for column, width in enumerate((230, 170, 260)):
+            header.setSectionResizeMode(column, QHeaderView.ResizeMode.Interactive)
+            header.resizeSection(column, width)
+        header.setStretchLastSection(True)
+        layout.addWidget(self.table)
+
+        self.setStyleSheet("""
+            QTableWidget {
+                background: #1e1e1e;
+                color: #d4d4d4;
+                border: 1px solid #333;
+                border-radius: 8px;
+                font-family: 'Consolas', 'Monaco', 'Courier New', monospace;
+                font-size: 12px;
+                selection-background-color: #3390ff;
+            }
+        """)
+
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setInterval(REFRESH_INTERVAL_MS)
+        self.refresh_timer.timeout.connect(self.refresh)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh()
+        self.refresh_timer.start()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.refresh_timer.stop()
+
+    def refresh(self):
+        """采样并更新表格，新出现的指标（例如工作进程转发的）追加到末尾"""
+        sample = self.sampler.sample()
+        for name, entry in sample["metrics"].items():
+            row = self._rows.get(name)
+            if row is None:
+                row = self._rows[name] = self.table.rowCount()
+                self.table.insertRow(row)
+                self.table.setItem(row, 0, QTableWidgetItem(name))
+                for column in (1, 2):
+                    item = QTableWidgetItem()
+                    item.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+                    self.table.setItem(row, column, item)
+                self.table.setItem(row, 3, QTableWidgetItem(entry["help"]))
+            value, change = _describe(name, entry, sample)
+            self.table.item(row, 1).setText(value)
+            self.table.item(row, 2).setText(change)
@@ -0,0 +1,184 @@
+"""
+多设备并发下载 - 不依赖Qt
+
+为每台设备建立独立的ATSession（各自的通知重组和命令队列），
+用信号量限制同时连接的设备数；BlueZ等适配器同一时间只能建立一个连接，
+因此建立连接的阶段串行，连接后的下载并发进行。
+"""
+
+import asyncio
+import time
+
+from at_protocol import parse_log_data
+from ble_session import ATSession
+
+DEFAULT_CONCURRENCY = 3
+
+# 设备下载状态
+STATE_WAITING = "等待"
+STATE_CONNECTING = "连接中"
+STATE_DOWNLOADING = "下载中"
+STATE_DONE = "完成"
+STATE_FAILED = "失败"
+
+
+class DeviceProgress:
+    """单台设备的下载进度和吞吐量"""
+
+    def __init__(self, address, name):
+        self.address = address
+        self.name = name
+        self.state = STATE_WAITING
+        self.total = None  # 设备报告的记录总数（收到第一条+LOGDATA后已知）
+        self.received = 0
+        self.bytes = 0
+        self.started = None
+        self.finished = None
+        self.error = None
+        self.session = None
+
+    def on_line(self, line):
+        record = parse_log_data(line)
+        if record is not None:
+            self.received += 1
+            self.total = record.total
+
+    @property
+    def elapsed(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.monotonic()) - self.started
+
+    @property
+    def records_per_second(self):
+        elapsed = self.elapsed
+        return self.received / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def bytes_per_second(self):
+        elapsed = self.elapsed
+        received = self.session.bytes_received if self.session else self.bytes
+        return received / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def done(self):
+        return self.state in (STATE_DONE, STATE_FAILED)
+
+
+class FleetHarvester:
+    """并发下载多台设备的日志
+
+    on_result(address, name, records) 在每台设备下载完成后调用（事件循环线程内）。
+    """
+
+    def __init__(self, concurrency=DEFAULT_CONCURRENCY, on_result=None):
+        self.concurrency = max(1, concurrency)
+        self.on_result = on_result
+        self.progress = {}  # 地址 -> DeviceProgress（按加入顺序）
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._connect_lock = asyncio.Lock()
+
+    async def harvest(self, targets):
+        """下载 [(地址, 名称)] 中的所有设备，返回进度字典"""
+        for address, name in targets:
+            self.progress.setdefault(address, DeviceProgress(address, name))
+        await asyncio.gather(*(self._harvest_one(self.progress[address])
+                               for address, _ in targets))
+        return self.progress
+
+    async def _harvest_one(self, progress):
+        async with self._semaphore:
+            progress.started = time.monotonic()
+            session = ATSession(progress.address, progress.name, on_line=progress.on_line)
+            progress.session = session
+            try:
+                progress.state = STATE_CONNECTING
+                async with self._connect_lock:
+                    await session.connect()
+                progress.state = STATE_DOWNLOADING
+                records = await session.download()
+                await session.disconnect()
+            except Exception as e:
+                progress.state = STATE_FAILED
+                progress.error = str(e) or type(e).__name__
+                await session.disconnect()
+                return
+            finally:
+                progress.finished = time.monotonic()
+                progress.bytes = session.bytes_received
+                progress.session = None
+
+            progress.total = len(records)
+            progress.received = len(records)
+            progress.state = STATE_DONE
+            if self.on_result:
+                self.on_result(progress.address, progress.name, records)
+
+    async def run(self, scheduler, duration=None, poll_interval=0.5):
+        """按调度器的选择持续下载，直到duration秒后（None表示一直运行）
+
+        有空闲名额时向调度器取下一台设备，下载结束后把结果反馈给调度器。
+        """
+        deadline = None if duration is None else time.monotonic() + duration
+        tasks = set()
+        try:
+            while deadline is None or time.monotonic() < deadline:
+                while len(tasks) < self.concurrency:
+                    sighting = scheduler.next()
+                    if sighting is None:
+                        break
+                    progress = DeviceProgress(sighting.address, sighting.name)
+                    self.progress.pop(sighting.address, None)
+                    self.progress[sighting.address] = progress
+                    tasks.add(asyncio.ensure_future(self._scheduled_harvest(scheduler, progress)))
+
+                if tasks:
+                    _, tasks = await asyncio.wait(tasks, timeout=poll_interval,
+                                                  return_when=asyncio.FIRST_COMPLETED)
+                else:
+                    await asyncio.sleep(poll_interval)
+        finally:
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        return self.progress
+
+    async def _scheduled_harvest(self, scheduler, progress):
+        try:
+            await self._harvest_one(progress)
+        finally:
+            scheduler.finished(progress.address, progress.state == STATE_DONE)
+
+    # ---- 汇总 ----
+
+    def aggregate(self):
+        """整体进度: (完成台数, 失败台数, 已收记录, 已知总记录, 合计条/秒)"""
+        items = list(self.progress.values())
+        done = sum(1 for p in items if p.state == STATE_DONE)
+        failed = sum(1 for p in items if p.state == STATE_FAILED)
+        received = sum(p.received for p in items)
+        total = sum(p.total or 0 for p in items)
+        active = [p for p in items if p.started is not None]
+        if active:
+            span = max((p.finished or time.monotonic()) for p in active) - min(p.started for p in active)
+        else:
+            span = 0.0
+        rate = received / span if span > 0 else 0.0
+        return done, failed, received, total, rate
+
+
+def format_progress(harvester):
+    """整体进度和每台设备吞吐量的文本表格"""
+    done, failed, received, total, rate = harvester.aggregate()
+    count = len(harvester.progress)
+    percent = f"{received * 100 / total:.0f}%" if total else "-"
+    lines = [
+        f"总进度: {done}/{count} 台完成, {failed} 台失败, 记录 {received}/{total or '?'} ({percent}),"
+        f" 合计 {rate:,.0f} 条/秒, 并发 {harvester.concurrency}",
+        f"{'名称':<16} {'地址':<20} {'状态':<6} {'记录':>11} {'条/秒':>8} {'KB/秒':>8} {'耗时(s)':>8}",
+    ]
+    for p in harvester.progress.values():
+        records = f"{p.received}/{p.total if p.total is not None else '?'}"
+        lines.append(f"{p.name[:16]:<16} {p.address:<20} {p.state:<6} {records:>11} "
+                     f"{p.records_per_second:>8,.0f} {p.bytes_per_second / 1024:>8.1f} "
+                     f"{p.elapsed:>8.1f}" + (f"  {p.error}" if p.error else ""))
+    return "\n".join(lines)
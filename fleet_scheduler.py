@@ -0,0 +1,112 @@
+"""
+车队下载调度 - 不依赖Qt
+
+从设备登记表（扫描回调实时更新）中选出下一台要下载的Surron设备，
+目标是单位时间内收集尽可能多的日志：
+  - 信号越强，连接越快、下载越稳定
+  - 距上次同步越久、估计未同步的日志越多，收益越大
+成功下载后的window秒内不再下载同一台设备；失败的设备按指数退避重试。
+"""
+
+import time
+
+from at_protocol import LOG_CAPACITY, is_surron_device
+
+DEFAULT_WINDOW = 1800.0  # 同一设备两次成功下载的最小间隔（秒）
+ADVERT_MAX_AGE = 10.0  # 超过此时间未收到广播视为已离开
+BACKOFF_BASE = 15.0  # 第一次失败后的等待（秒），之后逐次翻倍
+BACKOFF_MAX = 600.0
+
+RSSI_FLOOR = -100.0  # RSSI归一化区间
+RSSI_CEIL = -40.0
+STALE_HORIZON = 24 * 3600.0  # 超过此时间未同步视为“最久未同步”
+
+
+def _clamp(value):
+    return 0.0 if value < 0.0 else 1.0 if value > 1.0 else value
+
+
+class HarvestScheduler:
+    """按评分选择下一台设备
+
+    评分 = w_rssi * 信号强度 + w_stale * 未同步时长 + w_unsynced * 估计未同步条数，
+    三项都归一化到0~1。sync_stats为 {地址: (最近同步时间, 日志增长速率 条/秒)}，
+    通常来自LogStore.sync_stats()。
+    """
+
+    def __init__(self, registry, sync_stats=None, window=DEFAULT_WINDOW,
+                 weights=(1.0, 1.0, 1.0), backoff_base=BACKOFF_BASE, backoff_max=BACKOFF_MAX,
+                 advert_max_age=ADVERT_MAX_AGE):
+        self.registry = registry
+        self.window = window
+        self.weights = weights
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.advert_max_age = advert_max_age
+        self.last_sync = {}  # 地址 -> 最近成功同步时间
+        self.log_rate = {}  # 地址 -> 日志增长速率（条/秒）
+        self.failures = {}  # 地址 -> 连续失败次数
+        self.retry_at = {}  # 地址 -> 允许重试的时间
+        self.in_progress = set()
+        for address, (last_sync, rate) in (sync_stats or {}).items():
+            if last_sync is not None:
+                self.last_sync[address] = last_sync
+            self.log_rate[address] = rate
+
+    def unsynced_estimate(self, address, now):
+        """估计设备上尚未同步的日志条数"""
+        last_sync = self.last_sync.get(address)
+        if last_sync is None:
+            return LOG_CAPACITY
+        return min(LOG_CAPACITY, self.log_rate.get(address, 0.0) * (now - last_sync))
+
+    def score(self, sighting, now):
+        """设备的调度评分，越大越优先"""
+        w_rssi, w_stale, w_unsynced = self.weights
+        rssi = _clamp((sighting.rssi_avg - RSSI_FLOOR) / (RSSI_CEIL - RSSI_FLOOR))
+        last_sync = self.last_sync.get(sighting.address)
+        stale = 1.0 if last_sync is None else _clamp((now - last_sync) / STALE_HORIZON)
+        unsynced = self.unsynced_estimate(sighting.address, now) / LOG_CAPACITY
+        return w_rssi * rssi + w_stale * stale + w_unsynced * unsynced
+
+    def eligible(self, sighting, now):
+        """设备当前是否可以下载"""
+        address = sighting.address
+        if address in self.in_progress or not is_surron_device(sighting.name):
+            return False
+        if now - sighting.last_seen > self.advert_max_age:
+            return False
+        last_sync = self.last_sync.get(address)
+        if last_sync is not None and now - last_sync < self.window:
+            return False
+        return now >= self.retry_at.get(address, 0.0)
+
+    def candidates(self, now=None):
+        """可下载的设备，按评分从高到低 [(评分, Sighting)]"""
+        now = time.time() if now is None else now
+        ranked = [(self.score(s, now), s) for s in self.registry if self.eligible(s, now)]
+        ranked.sort(key=lambda item: item[0], reverse=True)
+        return ranked
+
+    def next(self, now=None):
+        """取出评分最高的设备并标记为下载中，没有可下载的设备时返回None"""
+        ranked = self.candidates(now)
+        if not ranked:
+            return None
+        sighting = ranked[0][1]
+        self.in_progress.add(sighting.address)
+        return sighting
+
+    def finished(self, address, success, now=None):
+        """记录一次下载的结果"""
+        now = time.time() if now is None else now
+        self.in_progress.discard(address)
+        if success:
+            self.last_sync[address] = now
+            self.failures.pop(address, None)
+            self.retry_at.pop(address, None)
+            return
+        failures = self.failures.get(address, 0) + 1
+        self.failures[address] = failures
+        self.retry_at[address] = now + min(self.backoff_max,
+                                           self.backoff_base * 2 ** (failures - 1))
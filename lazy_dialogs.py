@@ -0,0 +1,54 @@
+"""
+延迟加载的对话框 - 首次使用时才导入模块并创建，之后复用同一实例
+"""
+
+import importlib
+
+from PyQt6.QtCore import Qt
+
+
+class LazyDialog:
+    """按需导入并缓存对话框实例
+
+    module_name/class_name 指定对话框类，类的构造函数需接受 parent 参数；
+    模块无法导入时使用 fallback(parent) 创建替代对话框。
+    """
+
+    def __init__(self, module_name, class_name, fallback=None):
+        self.module_name = module_name
+        self.class_name = class_name
+        self.fallback = fallback
+        self._instance = None
+
+    @property
+    def loaded(self):
+        """对话框是否已创建"""
+        return self._instance is not None
+
+    def instance(self, parent=None):
+        """获取对话框实例，首次调用时导入并创建"""
+        if self._instance is None:
+            try:
+                module = importlib.import_module(self.module_name)
+                dialog = getattr(module, self.class_name)(parent)
+            except ImportError:
+                if self.fallback is None:
+                    raise
+                dialog = self.fallback(parent)
+            # 关闭时只隐藏，保留实例供下次直接显示
+            dialog.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose, False)
+            self._instance = dialog
+        return self._instance
+
+    def show(self, parent=None):
+        """显示对话框（居中于父窗口）"""
+        dialog = self.instance(parent)
+        if parent is not None:
+            parent_rect = parent.geometry()
+            x = parent_rect.x() + (parent_rect.width() - dialog.width()) // 2
+            y = parent_rect.y() + (parent_rect.height() - dialog.height()) // 2
+            dialog.move(x, y)
+        dialog.show()
+        dialog.raise_()
+        dialog.activateWindow()
+        return dialog
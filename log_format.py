@@ -0,0 +1,178 @@
+"""
+日志文本格式化工具 - 不依赖Qt，供控制台显示和导出共用
+"""
+
+import time
+from datetime import datetime
+from enum import IntEnum
+from functools import lru_cache
+
+# 换行参数
+WRAP_WIDTH = 100  # 超过该长度的消息按词换行
+HARD_WRAP_WIDTH = 120  # 单个词超过该长度时强制拆分
+SPLIT_SEARCH_START = 80  # 强制拆分时从该位置开始寻找分割字符
+SPLIT_CHARS = frozenset(',;=:-_')
+
+# Unicode行分隔符 - 在同一文本块内换行，保证一条消息对应一个块
+LINE_SEPARATOR = '\u2028'
+
+
+class MessageType(IntEnum):
+    """日志消息类型"""
+    INFO = 0
+    SUCCESS = 1
+    WARNING = 2
+    ERROR = 3
+    SENT = 4
+    RECEIVED = 5  # 接收的无前缀文本
+    OTHER = 6
+    RESPONSE_OK = 7  # 接收的 +LOGOK
+    RESPONSE_ERROR = 8  # 接收的 +LOGERROR
+    RESPONSE_DATA = 9  # 接收的 +LOGDATA
+
+
+# 接收行的消息类型，按at_protocol.LineKind取值排列（文本、OK、ERROR、DATA）
+RECEIVED_TYPES = (MessageType.RECEIVED, MessageType.RESPONSE_OK, MessageType.RESPONSE_ERROR,
+                  MessageType.RESPONSE_DATA)
+RECEIVED_MARK = "← "  # 接收行在控制台中的前缀
+
+
+class LogLevel(IntEnum):
+    """日志详细程度，低于控制器阈值的消息在发出信号前丢弃"""
+    DEBUG = 0  # 调试细节：扫描开始、设备服务/特征列表、通知开关等
+    INFO = 1
+    WARNING = 2
+    ERROR = 3
+
+
+DEFAULT_VERBOSITY = LogLevel.INFO
+
+# 每种消息类型的默认级别，发出时可以单独指定（例如调试细节用DEBUG）
+MESSAGE_LEVELS = {
+    MessageType.INFO: LogLevel.INFO,
+    MessageType.SUCCESS: LogLevel.INFO,
+    MessageType.WARNING: LogLevel.WARNING,
+    MessageType.ERROR: LogLevel.ERROR,
+    MessageType.SENT: LogLevel.INFO,
+    MessageType.RECEIVED: LogLevel.INFO,
+    MessageType.OTHER: LogLevel.INFO,
+    MessageType.RESPONSE_OK: LogLevel.INFO,
+    MessageType.RESPONSE_ERROR: LogLevel.WARNING,
+    MessageType.RESPONSE_DATA: LogLevel.INFO,
+}
+
+
+class SessionClock:
+    """把time.monotonic_ns时刻换算为墙上时间
+
+    会话开始时记录一次墙上时间和单调时钟的对应关系，之后的时刻都按单调时钟推算，
+    不受系统时间调整影响。单调时钟在同一台机器的各进程间一致，工作进程的时刻也可以换算。
+    """
+
+    def __init__(self):
+        self.wall_ns = time.time_ns()
+        self.monotonic_ns = time.monotonic_ns()
+
+    def wall_time(self, timestamp_ns):
+        """单调时钟时刻对应的墙上时间（秒）"""
+        return (self.wall_ns + timestamp_ns - self.monotonic_ns) / 1e9
+
+    def format(self, timestamp_ns, latency_ns=-1):
+        """格式化为 HH:MM:SS.mmm，有延迟（命令发出到收到该行）时附加 +毫秒"""
+        text = datetime.fromtimestamp(self.wall_time(timestamp_ns)).strftime("%H:%M:%S.%f")[:-3]
+        if latency_ns >= 0:
+            text += f" +{latency_ns / 1e6:.1f}ms"
+        return text
+
+
+session_clock = SessionClock()  # 本进程的会话时钟
+
+
+# 每种消息类型的显示颜色和图标
+MESSAGE_STYLES = {
+    MessageType.ERROR: ("#ff6b6b", "❌"),
+    MessageType.SUCCESS: ("#51cf66", "✅"),
+    MessageType.WARNING: ("#ffd43b", "⚠️"),
+    MessageType.SENT: ("#74c0fc", "📤"),
+    MessageType.RECEIVED: ("#69db7c", "📥"),
+    MessageType.RESPONSE_OK: ("#8ce99a", "🆗"),
+    MessageType.RESPONSE_ERROR: ("#ff8787", "🚫"),
+    MessageType.RESPONSE_DATA: ("#66d9e8", "📄"),
+    MessageType.INFO: ("#91a7ff", "ℹ️"),
+    MessageType.OTHER: ("#ffffff", "📝"),
+}
+
+_TYPE_BY_NAME = {t.name.lower(): t for t in MessageType}
+
+
+def message_type(value):
+    """把字符串或整数形式的消息类型转换为MessageType"""
+    if isinstance(value, MessageType):
+        return value
+    if isinstance(value, str):
+        return _TYPE_BY_NAME.get(value, MessageType.OTHER)
+    try:
+        return MessageType(value)
+    except ValueError:
+        return MessageType.OTHER
+
+
+def _split_long_word(word, out):
+    """把超长的单词在分割字符处拆开，结果追加到out，返回剩余部分"""
+    start = 0
+    length = len(word)
+    while length - start > HARD_WRAP_WIDTH:
+        split_at = -1
+        # 只在 [80, 120) 的窗口内查找，每次至少前进80个字符，总体线性
+        for i in range(start + SPLIT_SEARCH_START, start + HARD_WRAP_WIDTH):
+            if word[i] in SPLIT_CHARS:
+                split_at = i + 1
+                break
+        if split_at < 0:
+            break
+        out.append(word[start:split_at])
+        start = split_at
+    return word[start:] if start else word
+
+
+def _wrap(message):
+    """单次遍历完成换行，返回各行"""
+    lines = []
+    parts = []  # 当前行的词
+    line_len = 0  # 当前行长度（含空格）
+
+    for word in message.split(' '):
+        # 当前行加上新词超过宽度时换行
+        if parts and line_len + 1 + len(word) > WRAP_WIDTH:
+            lines.append(' '.join(parts).strip())
+            parts = []
+            line_len = 0
+
+        if not parts and len(word) > HARD_WRAP_WIDTH:
+            word = _split_long_word(word, lines)
+
+        if parts:
+            line_len += 1 + len(word)
+        else:
+            line_len = len(word)
+        parts.append(word)
+
+    if parts:
+        lines.append(' '.join(parts).strip())
+
+    return lines
+
+
+@lru_cache(maxsize=256)
+def wrap_message(message):
+    """纯文本换行，行之间用LINE_SEPARATOR连接
+
+    轮询时大量重复出现的相同行直接从LRU缓存返回。
+    """
+    if not message:
+        return message
+
+    if len(message) <= WRAP_WIDTH:
+        return message.replace('\n', LINE_SEPARATOR)
+
+    return LINE_SEPARATOR.join(_wrap(message.replace('\n', ' ')))
@@ -0,0 +1,351 @@
+"""
+控制台日志的增量倒排索引 - 不依赖Qt
+
+每条日志追加时即时更新索引（词 -> 行号列表），过滤时只查索引，
+不需要重新扫描或重建控制台文档。
+ASCII词按整词索引（查询时在词表中找包含查询词的词）；中文等非ASCII文本没有分词，
+按单字和相邻两字索引，查询时取各二元组倒排列表的交集。
+几乎每行都包含的查询词（例如单个字母）不合并倒排列表，直接在C层面逐行校验原文。
+"""
+
+import re
+import time
+from bisect import bisect_left, bisect_right
+
+from log_format import message_type
+
+_TOKEN_RE = re.compile(r'[0-9A-Za-z_]+')
+_WIDE_RE = re.compile(r'[^\x00-\x7f]+')  # 非ASCII字符串
+_ERROR_CODE_RE = re.compile(r'[0-9a-f]{12}')
+ERROR_CODE_LENGTH = 12
+
+REGEX_CACHE_SIZE = 8  # 最多缓存的正则查询结果数
+REGEX_CHUNK_LINES = 65536  # 正则快速路径每次拼接的行数
+
+# 正则能否改写为在小写文本上区分大小写匹配（见_lowercase_pattern）：
+# 表示具体字符的转义（\x41、\u00C9、八进制/反向引用）、\A/\Z、(?...)结构和字符类中的大写字母都不改写
+_UNSAFE_PATTERN_RE = re.compile(r'\\[0-9xuUNAZ]|\(\?|\[[^\]]*[A-Z]')
+_PATTERN_LETTER_RE = re.compile(r'\\.|[A-Z]', re.DOTALL)
+
+
+def normalize_error_prefix(prefix):
+    """错误码前缀的统一形式（去掉空白、大写），索引查询和逐行匹配都使用它"""
+    return prefix.strip().upper()
+
+
+def _error_codes(tokens):
+    """小写词中的错误码（12位十六进制），转换为大写"""
+    return [token.upper() for token in tokens
+            if len(token) == ERROR_CODE_LENGTH and _ERROR_CODE_RE.fullmatch(token)]
+
+
+def _grams(run):
+    """非ASCII字符串的索引键：单字和相邻两字"""
+    return set(run).union(run[i:i + 2] for i in range(len(run) - 1))
+
+
+def _lowercase_pattern(pattern):
+    """不区分大小写的正则改写为小写后区分大小写的形式，不能保证等价时返回None
+
+    re.IGNORECASE会关闭正则引擎的字面量快速查找，在已小写的文本上用小写模式匹配要快得多。
+    转义序列原样保留（\\D、\\S等不受影响）。
+    """
+    if not pattern.isascii() or _UNSAFE_PATTERN_RE.search(pattern):
+        return None
+    return _PATTERN_LETTER_RE.sub(lambda m: m.group() if len(m.group()) == 2 else m.group().lower(),
+                                  pattern)
+
+
+class LogFilter:
+    """过滤条件，未设置的条件不参与过滤"""
+
+    __slots__ = ('types', 'text', 'regex', 'error_prefix', 'start_time', 'end_time')
+
+    def __init__(self, types=None, text="", regex=False, error_prefix="",
+                 start_time=None, end_time=None):
+        self.types = frozenset(message_type(t) for t in types) if types else None
+        self.text = text
+        self.regex = regex
+        self.error_prefix = normalize_error_prefix(error_prefix)
+        self.start_time = start_time
+        self.end_time = end_time
+
+    def is_empty(self):
+        """是否没有任何过滤条件"""
+        return (not self.types and not self.text and not self.error_prefix
+                and self.start_time is None and self.end_time is None)
+
+
+class LogIndex:
+    """日志行索引 - 行号即追加顺序"""
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        """清空索引"""
+        self.texts = []  # 行号 -> 小写的消息文本（只用于匹配，不区分大小写）
+        self.types = []  # 行号 -> MessageType
+        self.times = []  # 行号 -> 追加时间（秒）
+        self.postings = {}  # 小写词 -> 行号列表（升序）
+        self.gram_postings = {}  # 非ASCII单字/二元组 -> 行号列表
+        self.type_postings = {}  # MessageType -> 行号列表
+        self.code_postings = {}  # 错误码字节前缀 -> 行号列表
+        self._regex_cache = {}  # 正则 -> [编译结果, 命中行号, 已扫描到的行号, 是否小写快速路径]
+        self._multiline = False  # 是否有含换行符的行（此时不能按行拼接后查找）
+        self._vocab_blob = '\n'  # 词表拼接串，用于子串查找
+        self._vocab_pending = []  # 尚未拼入词表串的新词
+
+    def __len__(self):
+        return len(self.texts)
+
+    def add(self, text, msg_type, timestamp=None):
+        """追加一行并更新索引，返回行号"""
+        line_id = len(self.texts)
+        msg_type = message_type(msg_type)
+
+        lowered = text.lower()
+        tokens = set(_TOKEN_RE.findall(lowered))
+        self.texts.append(lowered)
+        if '\n' in lowered:
+            self._multiline = True
+        self.types.append(msg_type)
+        self.times.append(time.time() if timestamp is None else timestamp)
+        self.type_postings.setdefault(msg_type, []).append(line_id)
+
+        code_postings = self.code_postings
+        for code in _error_codes(tokens):
+            # 错误码按字节前缀建索引（1~6字节），与AT+LOGERROR的匹配字节数对应
+            for n in range(2, ERROR_CODE_LENGTH + 1, 2):
+                postings = code_postings.get(code[:n])
+                if postings is None:
+                    code_postings[code[:n]] = [line_id]
+                elif postings[-1] != line_id:
+                    postings.append(line_id)
+
+        for token in tokens:
+            postings = self.postings.get(token)
+            if postings is None:
+                postings = self.postings[token] = []
+                self._vocab_pending.append(token)
+            postings.append(line_id)
+
+        if not lowered.isascii():
+            gram_postings = self.gram_postings
+            grams = set()
+            for run in _WIDE_RE.findall(lowered):
+                grams.update(_grams(run))
+            for gram in grams:
+                postings = gram_postings.get(gram)
+                if postings is None:
+                    gram_postings[gram] = [line_id]
+                else:
+                    postings.append(line_id)
+
+        return line_id
+
+    # ---- 查询 ----
+
+    def query(self, log_filter):
+        """返回满足过滤条件的行号列表（升序）"""
+        lo, hi = self._time_bounds(log_filter)
+        if lo >= hi:
+            return []
+
+        # 各条件对应的候选行号列表，取最短的一个作为遍历起点
+        candidates = []
+        if log_filter.types:
+            candidates.append(self._union(self.type_postings.get(t, ()) for t in log_filter.types))
+        if log_filter.error_prefix:
+            candidates.append(self._code_candidates(log_filter.error_prefix))
+        exact = False  # 文本候选是否已是精确结果（单个ASCII词且使用了索引）
+        if log_filter.text and not log_filter.regex:
+            text_ids = self._text_candidates(log_filter.text, hi - lo)
+            if text_ids is not None:
+                candidates.append(text_ids)
+                exact = self._is_single_token(log_filter.text)
+
+        if candidates:
+            candidates = sorted((self._slice(c, lo, hi) for c in candidates), key=len)
+            ids = candidates[0]
+            for other in candidates[1:]:
+                if not ids:
+                    break
+                other = set(other)
+                ids = [i for i in ids if i in other]
+        else:
+            ids = range(lo, hi)
+
+        if log_filter.text:
+            if log_filter.regex:
+                matched = self._regex_matches(log_filter.text)
+                ids = [i for i in ids if i in matched]
+            elif not exact:
+                # 倒排索引只给出候选（或查询词不够有选择性），再校验原文
+                needle = log_filter.text.lower()
+                texts = self.texts
+                ids = [i for i in ids if needle in texts[i]]
+
+        return list(ids)
+
+    def matches(self, line_id, log_filter):
+        """检查单行是否满足条件 - 过滤生效期间用于新追加的行"""
+        if log_filter.types and self.types[line_id] not in log_filter.types:
+            return False
+        ts = self.times[line_id]
+        if log_filter.start_time is not None and ts < log_filter.start_time:
+            return False
+        if log_filter.end_time is not None and ts > log_filter.end_time:
+            return False
+        text = self.texts[line_id]
+        if log_filter.error_prefix:
+            prefix = log_filter.error_prefix
+            if not any(code.startswith(prefix)
+                       for code in _error_codes(_TOKEN_RE.findall(text))):
+                return False
+        if log_filter.text:
+            if log_filter.regex:
+                return line_id in self._regex_matches(log_filter.text)
+            return log_filter.text.lower() in text
+        return True
+
+    def _time_bounds(self, log_filter):
+        """时间条件转换为行号区间 [lo, hi)"""
+        lo, hi = 0, len(self.times)
+        if log_filter.start_time is not None:
+            lo = bisect_left(self.times, log_filter.start_time)
+        if log_filter.end_time is not None:
+            hi = bisect_right(self.times, log_filter.end_time)
+        return lo, hi
+
+    @staticmethod
+    def _slice(ids, lo, hi):
+        """截取有序行号列表中位于 [lo, hi) 的部分"""
+        return ids[bisect_left(ids, lo):bisect_left(ids, hi)]
+
+    @staticmethod
+    def _union(lists):
+        lists = [lst for lst in lists if lst]
+        if len(lists) == 1:
+            return lists[0]
+        return sorted(set().union(*lists))
+
+    @staticmethod
+    def _is_single_token(text):
+        return _TOKEN_RE.fullmatch(text) is not None
+
+    def _code_candidates(self, prefix):
+        """错误码前缀（normalize_error_prefix的结果） -> 行号列表"""
+        if len(prefix) > ERROR_CODE_LENGTH:
+            return []
+        if len(prefix) % 2 == 0:
+            return self.code_postings.get(prefix, [])
+        # 奇数长度前缀：合并下一个十六进制位的16个分支
+        return self._union(self.code_postings.get(prefix + c, ()) for c in '0123456789ABCDEF')
+
+    def _text_candidates(self, text, limit):
+        """子串查询 -> 候选行号列表，没有可用的索引条件时返回None（由query逐行校验）
+
+        ASCII词只扫描词表（远小于行数），取包含查询词的所有词的倒排列表之并；
+        倒排列表总长超过limit（时间范围内的行数）的词几乎不缩小范围，合并反而比逐行校验慢，跳过。
+        非ASCII部分取二元组倒排列表的交集。各部分的候选取交集，最终由query校验原文。
+        """
+        text = text.lower()
+        lists = [self._gram_candidates(run) for run in set(_WIDE_RE.findall(text))]
+        for token in set(_TOKEN_RE.findall(text)):
+            postings = [self.postings[word] for word in self._matching_tokens(token)]
+            if sum(map(len, postings)) <= limit:
+                lists.append(self._union(postings))
+        return self._intersect(lists) if lists else None
+
+    def _gram_candidates(self, run):
+        """非ASCII字符串 -> 包含其全部单字/二元组的行号列表"""
+        if len(run) == 1:
+            return self.gram_postings.get(run, [])
+        return self._intersect([self.gram_postings.get(run[i:i + 2], [])
+                                for i in range(len(run) - 1)])
+
+    @staticmethod
+    def _intersect(lists):
+        """有序行号列表的交集，从最短的一个开始"""
+        lists = sorted(lists, key=len)
+        result = lists[0]
+        for ids in lists[1:]:
+            if not result:
+                break
+            ids = set(ids)
+            result = [i for i in result if i in ids]
+        return result
+
+    def _matching_tokens(self, needle):
+        """词表中包含needle的所有词
+
+        词表以换行分隔拼接成一个字符串，用str.find在C层面查找，
+        新词只在查询时批量追加。
+        """
+        if self._vocab_pending:
+            self._vocab_blob += '\n'.join(self._vocab_pending) + '\n'
+            self._vocab_pending = []
+
+        blob = self._vocab_blob
+        words = []
+        pos = blob.find(needle)
+        while pos >= 0:
+            start = blob.rfind('\n', 0, pos) + 1
+            end = blob.find('\n', pos)
+            words.append(blob[start:end])
+            pos = blob.find(needle, end)
+        return words
+
+    def _regex_matches(self, pattern):
+        """正则命中的行号集合，按模式缓存，新行到来时只扫描增量部分"""
+        entry = self._regex_cache.get(pattern)
+        if entry is None:
+            try:
+                lowered = _lowercase_pattern(pattern)
+                if lowered is not None:
+                    compiled = re.compile(lowered, re.MULTILINE)
+                else:
+                    compiled = re.compile(pattern, re.IGNORECASE)
+            except re.error:
+                return set()
+            if len(self._regex_cache) >= REGEX_CACHE_SIZE:
+                del self._regex_cache[next(iter(self._regex_cache))]
+            entry = self._regex_cache[pattern] = [compiled, set(), 0, lowered is not None]
+
+        compiled, matched, scanned, fast = entry
+        texts = self.texts
+        if fast and not self._multiline:
+            for start in range(scanned, len(texts), REGEX_CHUNK_LINES):
+                matched.update(self._search_lines(compiled, start,
+                                                  min(start + REGEX_CHUNK_LINES, len(texts))))
+        else:
+            search = compiled.search
+            matched.update(i for i in range(scanned, len(texts)) if search(texts[i]))
+        entry[2] = len(texts)
+        return matched
+
+    def _search_lines(self, compiled, start, end):
+        """把 [start, end) 行以换行符拼接后整体查找，返回命中的行号
+
+        模式以MULTILINE编译，^/$ 按行匹配；查找结果所在的行再单独校验一次
+        （\\s、[^x] 等可能跨行匹配），之后从下一行开始继续查找，每行最多校验一次。
+        """
+        texts = self.texts
+        blob = '\n'.join(texts[start:end])
+        search = compiled.search
+        hits = []
+        line, line_pos = start, 0  # 当前行号及其在blob中的起点
+        match = search(blob)
+        while match is not None:
+            pos = match.start()
+            line += blob.count('\n', line_pos, pos)
+            line_end = blob.find('\n', pos)
+            if search(texts[line]):
+                hits.append(line)
+            if line_end < 0:
+                break
+            line += 1
+            line_pos = line_end + 1
+            match = search(blob, line_pos)
+        return hits
@@ -0,0 +1,226 @@
+"""
+批量写入测试日志 - 不依赖Qt
+
+把CSV、JSONL或按分布生成的日志通过 AT+LOGINSERT 写入测试设备，用于复现现场问题。
+多条写入同时在途（见at_pipeline），速度取决于设备确认的速度；每条都核对 +LOGOK
+（响应中带有 [错误码] 回显时同时核对错误码）。
+进度定期写入检查点文件，连接中断后重连继续，下次以同一来源运行时从检查点继续。
+中断时已发出但未确认的写入可能已经生效，重连后用 AT+LOGLATEST 核对，避免重复写入。
+"""
+
+import asyncio
+import csv
+import json
+import os
+import random
+import re
+import time
+from collections import Counter
+from datetime import datetime
+
+from at_protocol import LineKind, classify_line, insert_command, parse_log_data
+from ble_session import ATSession, ATSessionError
+
+DEFAULT_WINDOW = 8
+CHECKPOINT_INTERVAL = 1.0  # 检查点写入间隔（秒）
+RECONNECT_DELAY = 1.0  # 第一次重连前的等待（秒），之后逐次翻倍
+
+# 生成日志时各类错误码前缀的权重（与模拟设备一致的四类）
+DEFAULT_CATEGORIES = {"10": 4, "20": 3, "30": 2, "40": 1}
+
+_ECHO_RE = re.compile(r'\[([0-9A-Fa-f]{12})\]')  # +LOGOK中回显的错误码，例如 [10AB00000001]
+
+
+def _entry(fields):
+    """CSV行或JSON对象 -> (错误码, 时间戳)，时间可以是timestamp（秒）或time（ISO格式）"""
+    code = str(fields["code"]).strip().upper()
+    if len(code) != 12:
+        raise ValueError(f"错误码必须为12位十六进制: {code}")
+    int(code, 16)
+    if fields.get("timestamp") not in (None, ""):
+        timestamp = int(float(fields["timestamp"]))
+    else:
+        timestamp = int(datetime.fromisoformat(str(fields["time"])).timestamp())
+    return code, timestamp
+
+
+def read_csv(path):
+    """读取CSV（需要code列和timestamp或time列，可直接使用命令行工具导出的文件）"""
+    with open(path, newline="", encoding="utf-8") as f:
+        return [_entry(row) for row in csv.DictReader(f)]
+
+
+def read_jsonl(path):
+    """读取JSONL，每行一个含code和timestamp或time的对象"""
+    with open(path, encoding="utf-8") as f:
+        return [_entry(json.loads(line)) for line in f if line.strip()]
+
+
+def generate(count, start_time=None, interval=30.0, categories=None, seed=None):
+    """按错误码类别权重和平均间隔生成日志 [(错误码, 时间戳)]"""
+    rng = random.Random(seed)
+    categories = categories or DEFAULT_CATEGORIES
+    prefixes, weights = list(categories), list(categories.values())
+    timestamp = int(time.time() - count * interval) if start_time is None else int(start_time)
+    entries = []
+    for _ in range(count):
+        timestamp += max(1, int(rng.expovariate(1.0 / interval)))
+        code = (rng.choices(prefixes, weights)[0] + f"{rng.randrange(256):02X}"
+                + f"{rng.randrange(1 << 32):08X}")
+        entries.append((code, timestamp))
+    return entries
+
+
+class Checkpoint:
+    """批量写入进度文件 {source, total, done, rejected}"""
+
+    def __init__(self, path, source, total):
+        self.path = path
+        self.source = source
+        self.total = total
+        self.done = 0
+        self.rejected = 0
+
+    def load(self):
+        """读取已有的进度，来源不同时拒绝继续"""
+        if not self.path or not os.path.exists(self.path):
+            return
+        with open(self.path, encoding="utf-8") as f:
+            state = json.load(f)
+        if state.get("source") != self.source or state.get("total") != self.total:
+            raise ValueError(f"检查点 {self.path} 属于其他数据来源: {state.get('source')}")
+        self.done = state["done"]
+        self.rejected = state.get("rejected", 0)
+
+    def save(self):
+        if not self.path:
+            return
+        temp = self.path + ".tmp"
+        with open(temp, "w", encoding="utf-8") as f:
+            json.dump({"source": self.source, "total": self.total, "done": self.done,
+                       "rejected": self.rejected, "updated": time.time()}, f)
+        os.replace(temp, self.path)
+
+
+class BulkInserter:
+    """把entries写入一台设备，断线后自动重连继续
+
+    on_progress(inserter) 在每次保存检查点时调用。
+    """
+
+    def __init__(self, address, name, entries, checkpoint, window=DEFAULT_WINDOW,
+                 retries=5, on_progress=None):
+        self.address = address
+        self.name = name
+        self.entries = entries
+        self.checkpoint = checkpoint
+        self.window = window
+        self.retries = retries
+        self.on_progress = on_progress
+        self.errors = []  # (序号, 设备的错误响应)
+        self.reconnects = 0
+        self.started = None
+        self.inserted = 0  # 本次运行设备确认写入的条数
+        self._saved_at = 0.0
+
+    @property
+    def done(self):
+        return self.checkpoint.done
+
+    @property
+    def inserts_per_second(self):
+        elapsed = time.monotonic() - self.started if self.started else 0.0
+        return self.inserted / elapsed if elapsed > 0 else 0.0
+
+    async def run(self):
+        """写入全部记录，返回被设备拒绝的条数"""
+        self.started = time.monotonic()
+        failures = 0
+        session = None
+        # 从检查点继续时，上次中断前在途的写入同样需要核对
+        unconfirmed = self.checkpoint.done > 0
+        try:
+            while self.checkpoint.done < len(self.entries):
+                try:
+                    if session is None:
+                        session = ATSession(self.address, self.name)
+                        await session.connect()
+                        if unconfirmed:
+                            await self._reconcile(session)
+                            unconfirmed = False
+                    await session.stream(self._commands(), self._on_response, self.window,
+                                         pipelined_writes=True)
+                except (ATSessionError, asyncio.TimeoutError, OSError) as e:
+                    self._save()
+                    failures += 1
+                    unconfirmed = True
+                    if failures > self.retries:
+                        raise ATSessionError(f"重连 {self.retries} 次后仍失败: {e}")
+                    if session is not None:
+                        await session.disconnect()
+                        session = None
+                    self.reconnects += 1
+                    await asyncio.sleep(RECONNECT_DELAY * 2 ** (failures - 1))
+                else:
+                    failures = 0
+        finally:
+            self._save()
+            if session is not None:
+                await session.disconnect()
+        return self.checkpoint.rejected
+
+    def _commands(self):
+        for code, timestamp in self.entries[self.checkpoint.done:]:
+            yield insert_command(code, timestamp)
+
+    def _on_response(self, command, lines):
+        """核对一条写入的响应（按发送顺序到达）"""
+        index = self.checkpoint.done
+        code = self.entries[index][0]
+        line = lines[0] if lines else ""
+        response = classify_line(line)
+        if response.kind == LineKind.ERROR:
+            self.checkpoint.rejected += 1
+            self.errors.append((index, line))
+        elif response.kind != LineKind.OK:
+            raise ATSessionError(f"第 {index + 1} 条写入的响应不符: {line or '(空)'}")
+        else:
+            # 只有部分固件在 +LOGOK 中回显错误码，有回显时才核对
+            echo = _ECHO_RE.search(response.body)
+            if echo is not None and echo.group(1).upper() != code:
+                raise ATSessionError(f"第 {index + 1} 条写入的响应不符: {line}")
+            self.inserted += 1
+        self.checkpoint.done += 1
+        if time.monotonic() - self._saved_at >= CHECKPOINT_INTERVAL:
+            self._save()
+
+    def _save(self):
+        self._saved_at = time.monotonic()
+        self.checkpoint.save()
+        if self.on_progress:
+            self.on_progress(self)
+
+    async def _reconcile(self, session):
+        """中断时已发出但未确认的写入：与设备最新的记录比对，已生效的计为完成
+
+        AT+LOGLATEST=N 返回最后写入的N条，但不假定它们的排列顺序：按 (错误码, 时间戳)
+        计数比对。设备按收到的顺序执行写入，因此生效的是待确认记录的一个前缀，
+        取在最新记录中都能找到的最长前缀。
+        """
+        done = self.checkpoint.done
+        pending = self.entries[done:done + self.window]
+        latest = Counter()
+        for line in await session.command(f"AT+LOGLATEST={len(pending)}"):
+            record = parse_log_data(line)
+            if record is not None:
+                latest[(record.code, record.timestamp)] += 1
+        applied = 0
+        for entry in pending:
+            if not latest[entry]:
+                break
+            latest[entry] -= 1
+            applied += 1
+        if applied:
+            self.checkpoint.done += applied
+            self.inserted += applied
+            self._save()
@@ -0,0 +1,112 @@
+"""
+本地日志库 - 基于sqlite3，不依赖Qt
+
+保存从各设备下载的日志记录（按设备、时间戳、错误码去重）
+以及每台设备最近一次同步的信息。
+"""
+
+import sqlite3
+import time
+
+DEFAULT_DB_PATH = "surron_logs.db"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS devices (
+    address     TEXT PRIMARY KEY,
+    name        TEXT,
+    last_sync   REAL,
+    last_count  INTEGER,
+    sync_count  INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS logs (
+    device      TEXT NOT NULL,
+    timestamp   INTEGER NOT NULL,
+    code        TEXT NOT NULL,
+    checksum    TEXT,
+    fetched_at  REAL NOT NULL,
+    PRIMARY KEY (device, timestamp, code)
+);
+"""
+
+
+class LogStore:
+    """本地日志库"""
+
+    def __init__(self, path=DEFAULT_DB_PATH):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(_SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def add_records(self, address, name, records, device_count=None):
+        """保存一次同步得到的记录，返回新增条数
+
+        device_count 为设备端当前的日志总数（默认取记录数）。
+        """
+        now = time.time()
+        with self.conn:
+            before = self.conn.total_changes
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO logs (device, timestamp, code, checksum, fetched_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                ((address, r.timestamp, r.code, r.checksum, now) for r in records))
+            inserted = self.conn.total_changes - before
+            self.conn.execute(
+                "INSERT INTO devices (address, name, last_sync, last_count, sync_count)"
+                " VALUES (?, ?, ?, ?, 1)"
+                " ON CONFLICT(address) DO UPDATE SET name = excluded.name,"
+                " last_sync = excluded.last_sync, last_count = excluded.last_count,"
+                " sync_count = sync_count + 1",
+                (address, name, now, len(records) if device_count is None else device_count))
+        return inserted
+
+    def device(self, address):
+        """设备的同步信息，从未同步过时返回None"""
+        row = self.conn.execute("SELECT * FROM devices WHERE address = ?", (address,)).fetchone()
+        return dict(row) if row else None
+
+    def devices(self):
+        """所有设备的同步信息"""
+        return [dict(row) for row in self.conn.execute("SELECT * FROM devices ORDER BY address")]
+
+    def sync_stats(self):
+        """每台设备的 {地址: (最近同步时间, 日志增长速率 条/秒)}
+
+        速率由本地已有记录的条数和设备时间戳跨度估算，记录不足时为0。
+        """
+        stats = {}
+        for address, last_sync, count, first, last in self.conn.execute(
+                "SELECT d.address, d.last_sync, COUNT(l.code), MIN(l.timestamp), MAX(l.timestamp)"
+                " FROM devices d LEFT JOIN logs l ON l.device = d.address GROUP BY d.address"):
+            span = (last - first) if count > 1 else 0
+            stats[address] = (last_sync, count / span if span > 0 else 0.0)
+        return stats
+
+    def records(self, address=None):
+        """按时间顺序返回记录 (device, timestamp, code, checksum)"""
+        if address is None:
+            cursor = self.conn.execute(
+                "SELECT device, timestamp, code, checksum FROM logs ORDER BY device, timestamp")
+        else:
+            cursor = self.conn.execute(
+                "SELECT device, timestamp, code, checksum FROM logs WHERE device = ?"
+                " ORDER BY timestamp", (address,))
+        return [tuple(row) for row in cursor]
+
+    def count(self, address=None):
+        """记录条数"""
+        if address is None:
+            return self.conn.execute("SELECT COUNT(*) FROM logs").fetchone()[0]
+        return self.conn.execute("SELECT COUNT(*) FROM logs WHERE device = ?",
+                                 (address,)).fetchone()[0]
@@ -0,0 +1,164 @@
+"""
+监视设备新增日志 - 不依赖Qt
+
+轮询 AT+LOGCOUNT（一行响应，不读Flash日志区），条数变化时只用
+AT+LOGLATEST=<增量+1> 取回新增的记录：多取的一条应是上次最新的记录，用于确认衔接；
+对不上（日志被清空或覆盖）时加倍回溯，直到找到上次最新的记录或取完全部日志。
+
+轮询间隔自适应：有新记录后回到最短间隔，没有变化时逐次放大到最长间隔，
+默认最长1秒，新错误在1秒内可见。日志写满（LOG_CAPACITY）后条数不再变化，
+改为轮询 AT+LOGLATEST=1 比对最新一条。
+"""
+
+import asyncio
+import time
+
+from at_protocol import LOG_CAPACITY, LineKind, classify_line
+from ble_session import ATSession, ATSessionError
+
+MIN_INTERVAL = 0.2  # 有新记录后的轮询间隔（秒）
+MAX_INTERVAL = 1.0  # 无变化时放大到的最长间隔（秒）
+BACKOFF = 1.5  # 每次无变化时间隔乘以的系数
+RECONNECT_DELAY = 1.0  # 连接中断后第一次重连前的等待（秒），之后逐次翻倍
+
+
+def _key(record):
+    return record.timestamp, record.code
+
+
+class LogWatcher:
+    """监视一台已连接设备的新增日志
+
+    on_records(records, count) 在每次取回新记录时调用，count为设备当前的日志条数。
+    """
+
+    def __init__(self, session, on_records, min_interval=MIN_INTERVAL,
+                 max_interval=MAX_INTERVAL, backoff=BACKOFF):
+        self.session = session
+        self.on_records = on_records
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.backoff = backoff
+        self.interval = min_interval
+        self.count = None  # 设备上次的日志条数
+        self.newest = None  # 已知最新一条的 (时间戳, 错误码)
+        self.polls = 0  # 轮询命令数
+        self.fetches = 0  # 取回新记录的命令数
+        self.received = 0  # 取回的新记录条数
+        self.cleared = 0  # 发现日志被清空的次数
+
+    async def _count(self):
+        lines = await self.session.command("AT+LOGCOUNT")
+        try:
+            return int(lines[0])
+        except (IndexError, ValueError):
+            raise ATSessionError(f"AT+LOGCOUNT 响应无法解析: {lines[0] if lines else '(空)'}")
+
+    async def _latest(self, n):
+        records = []
+        for line in await self.session.command(f"AT+LOGLATEST={n}"):
+            response = classify_line(line)
+            if response.record is not None:
+                records.append(response.record)
+            elif response.kind == LineKind.ERROR:
+                raise ATSessionError(line)
+        return records
+
+    async def start(self):
+        """记录当前的条数和最新一条作为起点（已有的日志不输出）"""
+        self.count = await self._count()
+        latest = await self._latest(1) if self.count else []
+        self.newest = _key(latest[-1]) if latest else None
+        self.interval = self.min_interval
+
+    async def poll(self):
+        """轮询一次，返回新增的记录（按时间顺序），并调整下一次的间隔"""
+        if self.count is None:
+            await self.start()
+            return []
+        self.polls += 1
+        count = await self._count()
+        if count == self.count and count < LOG_CAPACITY:
+            records = []
+        elif count == self.count:
+            # 已写满，条数不变：比对最新一条
+            self.polls += 1
+            latest = await self._latest(1)
+            changed = latest and _key(latest[-1]) != self.newest
+            records = await self._fetch(1, count) if changed else []
+        else:
+            if count < self.count:
+                self.cleared += 1
+            records = await self._fetch(count - self.count, count)
+        self.count = count
+
+        if records:
+            self.newest = _key(records[-1])
+            self.received += len(records)
+            self.interval = self.min_interval
+            self.on_records(records, count)
+        else:
+            self.interval = min(self.max_interval, self.interval * self.backoff)
+        return records
+
+    async def _fetch(self, delta, count):
+        """取回上次最新一条之后的记录"""
+        if count == 0:
+            self.newest = None
+            return []
+        n = min(count, max(1, delta) + (1 if self.newest else 0))
+        while True:
+            self.fetches += 1
+            records = await self._latest(n)
+            if self.newest is None:
+                return records
+            for i in range(len(records) - 1, -1, -1):
+                if _key(records[i]) == self.newest:
+                    return records[i + 1:]
+            if n >= count:
+                # 上次最新的记录已不在设备上（清空或被覆盖），取回的都是新记录
+                return records
+            n = min(count, n * 2)
+
+    async def run(self, duration=None):
+        """轮询直到duration秒后（默认一直运行）"""
+        deadline = None if duration is None else time.monotonic() + duration
+        while deadline is None or time.monotonic() < deadline:
+            started = time.monotonic()
+            await self.poll()
+            # 间隔从本次轮询开始计算，命令往返不额外增加延迟
+            next_poll = started + self.interval
+            if deadline is not None:
+                next_poll = min(next_poll, deadline)
+            await asyncio.sleep(max(0.0, next_poll - time.monotonic()))
+
+
+async def watch(address, name, on_records, duration=None, retries=5, on_reconnect=None,
+                **options):
+    """连接设备并监视新增日志，连接中断后重连继续，返回LogWatcher"""
+    deadline = None if duration is None else time.monotonic() + duration
+    watcher = None
+    failures = 0
+    while deadline is None or time.monotonic() < deadline:
+        session = ATSession(address, name)
+        try:
+            await session.connect()
+            if watcher is None:
+                watcher = LogWatcher(session, on_records, **options)
+            else:
+                # 沿用上次的条数和最新记录，中断期间新增的记录在下一次轮询时取回
+                watcher.session = session
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            failures = 0
+            await watcher.run(remaining)
+            return watcher
+        except (ATSessionError, asyncio.TimeoutError, OSError) as e:
+            failures += 1
+            if failures > retries:
+                raise ATSessionError(f"重连 {retries} 次后仍失败: {e}")
+            if on_reconnect:
+                on_reconnect(e)
+            await asyncio.sleep(RECONNECT_DELAY * 2 ** (failures - 1))
+        finally:
+            await session.disconnect()
+    return watcher
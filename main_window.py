@@ -1,38 +1,77 @@
 import os
+import time
 from datetime import datetime
 from PyQt6.QtWidgets import (QMainWindow, QVBoxLayout, QHBoxLayout, QWidget,
-                             QFileDialog, QMessageBox)
-from PyQt6.QtCore import Qt, pyqtSlot
+                             QFileDialog, QMessageBox, QStackedWidget, QLabel, QCheckBox)
+from PyQt6.QtCore import Qt, QTimer, pyqtSlot
 
-from ble_controller import BLEController
-from ui_components import (get_app_stylesheet, create_title_label, create_footer_label,
-                           create_left_panel, create_right_panel, DeviceListWidget,
-                           LogTextEdit)
+from at_macro import single_command
+from ble_controller import BLEController, LOOP_MODE_THREAD, LOOP_MODE_PROCESS
+from log_format import DEFAULT_VERBOSITY, LogLevel, session_clock
+from lazy_dialogs import LazyDialog
+from metrics import LOOP_LAG_BUCKETS, UI_BUCKETS, MetricsSampler, metrics, write_snapshot
+from startup_profile import profiler
+from ui_components import (get_app_stylesheet, set_state_property, create_title_label,
+                           create_footer_label, create_left_panel, create_right_panel,
+                           DeviceListWidget, LogTextEdit, LogFilterBar, FilteredLogView)
 
-# 尝试导入帮助对话框
-try:
-    from help_dialog import HelpDialog
-except ImportError:
-    HelpDialog = None
+UI_LAG_INTERVAL_MS = 500  # 界面事件循环延迟的测量周期
+DEFAULT_METRICS_INTERVAL = 10.0  # 指标文件的写入周期（秒）
+
+
+def _format_rate(bytes_per_second):
+    if bytes_per_second >= 1024:
+        return f"{bytes_per_second / 1024:.1f} KB/s"
+    return f"{bytes_per_second:.0f} B/s"
 
 
 class MainWindow(QMainWindow):
     """主窗口类 - 负责UI组装和事件处理"""
 
-    def __init__(self):
+    def __init__(self, loop_mode=LOOP_MODE_THREAD, debug=False, metrics_dir=None,
+                 metrics_interval=DEFAULT_METRICS_INTERVAL):
         super().__init__()
-        self.controller = BLEController()
+        # BLE控制器在窗口显示后才在后台启动，避免拖慢启动
+        verbosity = LogLevel.DEBUG if debug else DEFAULT_VERBOSITY
+        if loop_mode == LOOP_MODE_PROCESS:
+            from ble_process import ProcessBLEController
+            self.controller = ProcessBLEController(autostart=False, verbosity=verbosity)
+        else:
+            self.controller = BLEController(autostart=False, loop_mode=loop_mode,
+                                            verbosity=verbosity)
         self.selected_address = ""
+        self._background_started = False
+        self.log_store = None  # 监视到新日志时才打开本地库
+        # 帮助对话框在第一次点击时才导入和创建，之后复用
+        self.help_dialog = LazyDialog("help_dialog", "HelpDialog",
+                                      fallback=self._create_help_message_box)
+        self.metrics_dir = metrics_dir
         self.setupUI()
         self.connectSignals()
+        self._setup_metrics(metrics_interval)
+
+    def showEvent(self, event):
+        """首次显示后启动后台BLE服务"""
+        super().showEvent(event)
+        if not self._background_started:
+            self._background_started = True
+            QTimer.singleShot(0, self.controller.start)
 
     def closeEvent(self, event):
         """窗口关闭事件 - 安全关闭应用"""
         try:
             print("开始安全关闭应用...")
 
+            # 关闭前写入最后一次指标
+            self.metrics_timer.stop()
+            self._ui_lag_timer.stop()
+            if self.metrics_dir:
+                self.export_metrics()
+
             # 关闭BLE控制器
             self.controller.shutdown()
+            if self.log_store is not None:
+                self.log_store.close()
 
             print("应用关闭完成")
         except Exception as e:
@@ -46,7 +85,8 @@ class MainWindow(QMainWindow):
         self.setGeometry(100, 100, 1200, 800)
 
         # 应用样式
-        self.setStyleSheet(get_app_stylesheet())
+        with profiler.measure("apply app stylesheet"):
+            self.setStyleSheet(get_app_stylesheet())
 
         # 创建中央控件
         central_widget = QWidget()
@@ -66,10 +106,12 @@ class MainWindow(QMainWindow):
         content_layout.setSpacing(20)
 
         # 创建左侧面板（设备管理）
-        left_panel, self.left_widgets = self._create_left_panel_custom()
+        with profiler.measure("panel: left (devices)"):
+            left_panel, self.left_widgets = self._create_left_panel_custom()
 
         # 创建右侧面板（AT命令控制台）
-        right_panel, self.right_widgets = self._create_right_panel_custom()
+        with profiler.measure("panel: right (console)"):
+            right_panel, self.right_widgets = self._create_right_panel_custom()
 
         # 添加面板到内容布局
         content_layout.addWidget(left_panel)
@@ -82,6 +124,10 @@ class MainWindow(QMainWindow):
         footer_label = create_footer_label()
         main_layout.addWidget(footer_label)
 
+        # 状态栏显示当前MTU和收发速率
+        self.link_info_label = QLabel()
+        self.statusBar().addPermanentWidget(self.link_info_label)
+
         # 初始化控件引用
         self._init_widget_refs()
 
@@ -98,18 +144,7 @@ class MainWindow(QMainWindow):
         # 扫描状态标签
         scan_status_label = QLabel("🔍 正在后台扫描设备...")
         scan_status_label.setObjectName("scanStatusLabel")
-        scan_status_label.setStyleSheet("""
-            QLabel#scanStatusLabel {
-                background: #e6f3ff;
-                border: 1px solid #4a90e2;
-                border-radius: 8px;
-                padding: 8px 12px;
-                color: #2c5aa0;
-                font-weight: bold;
-                font-size: 13px;
-                margin-bottom: 5px;
-            }
-        """)
+        scan_status_label.setProperty("scanning", False)
         left_layout.addWidget(scan_status_label)
 
         # 设备列表标签
@@ -136,14 +171,22 @@ class MainWindow(QMainWindow):
         # 状态标签
         status_label = QLabel("状态: 系统初始化中...")
         status_label.setObjectName("statusLabel")
+        status_label.setProperty("connected", False)
         left_layout.addWidget(status_label)
 
+        # 连接中断/自动重连统计（首次中断后显示）
+        link_stats_label = QLabel()
+        link_stats_label.setObjectName("linkStatsLabel")
+        link_stats_label.setVisible(False)
+        left_layout.addWidget(link_stats_label)
+
         return left_panel, {
             'scan_status_label': scan_status_label,
             'device_list': self.device_list,
             'connect_btn': connect_btn,
             'disconnect_btn': disconnect_btn,
-            'status_label': status_label
+            'status_label': status_label,
+            'link_stats_label': link_stats_label
         }
 
     def _create_right_panel_custom(self):
@@ -160,25 +203,46 @@ class MainWindow(QMainWindow):
         preset_label.setStyleSheet("margin-bottom: 5px;")
         right_layout.addWidget(preset_label)
 
-        # 预设命令按钮
+        # 预设命令按钮：单条命令直接发送，多步的按宏执行（语法见at_macro）
         preset_layout = QHBoxLayout()
-        preset_commands = [
+        preset_macros = [
             ("📋 读取5条", "AT+LOGLATEST=5"),
             ("📊 获取状态", "AT+LOGSTATUS"),
             ("🔧 系统信息", "AT+LOGSTATS"),
             ("📈 日志统计", "AT+LOGCOUNT"),
+            ("🩺 诊断流程", "AT+LOGSTATUS\nAT+LOGSTATS\nAT+LOGCHECK\nexpect \\+LOGOK\n"
+                           "AT+LOGLATEST=5"),
             ("🗑️ 清除日志", "AT+LOGCLEAR")
         ]
 
         preset_buttons = []
-        for name, cmd in preset_commands:
+        for name, macro in preset_macros:
             btn = QPushButton(name)
-            btn.setProperty('command', cmd)
+            btn.setProperty('macro', macro)
+            btn.setToolTip(macro)
             preset_layout.addWidget(btn)
             preset_buttons.append(btn)
 
         right_layout.addLayout(preset_layout)
 
+        # 宏脚本：从文件载入执行，显示当前步骤
+        macro_layout = QHBoxLayout()
+        run_macro_btn = QPushButton("📜 运行宏文件")
+        stop_macro_btn = QPushButton("⏹ 停止宏")
+        stop_macro_btn.setEnabled(False)
+        macro_status_label = QLabel()
+        macro_status_label.setObjectName("macroStatusLabel")
+        # 监视新日志：轮询已连接设备，新记录输出到通讯日志并写入本地库
+        watch_btn = QPushButton("👀 监视新日志")
+        watch_btn.setCheckable(True)
+        watch_btn.setEnabled(False)
+        watch_btn.setToolTip("轮询设备的日志条数，新记录显示在通讯日志中并写入本地库")
+        macro_layout.addWidget(run_macro_btn)
+        macro_layout.addWidget(stop_macro_btn)
+        macro_layout.addWidget(watch_btn)
+        macro_layout.addWidget(macro_status_label, 1)
+        right_layout.addLayout(macro_layout)
+
         # 手动命令输入标签
         cmd_label = QLabel("手动输入AT命令:")
         cmd_label.setStyleSheet("margin-top: 5px; margin-bottom: 2px;")
@@ -194,14 +258,33 @@ class MainWindow(QMainWindow):
         cmd_layout.addWidget(send_btn)
         right_layout.addLayout(cmd_layout)
 
-        # 通讯日志标签
+        # 通讯日志标签，右侧为数据包面板开关
+        log_header = QHBoxLayout()
         log_label = QLabel("通讯日志:")
         log_label.setStyleSheet("margin-top: 8px; margin-bottom: 2px;")
-        right_layout.addWidget(log_label)
-
-        # 自定义日志显示区域
+        packets_btn = QPushButton("📦 数据包")
+        packets_btn.setCheckable(True)
+        packets_btn.setToolTip("查看每个原始通知的十六进制/ASCII转储")
+        diagnostics_btn = QPushButton("📈 诊断")
+        diagnostics_btn.setCheckable(True)
+        diagnostics_btn.setToolTip("查看吞吐量、命令往返时间、队列深度和事件循环延迟等运行指标")
+        log_header.addWidget(log_label)
+        log_header.addStretch()
+        log_header.addWidget(packets_btn)
+        log_header.addWidget(diagnostics_btn)
+        right_layout.addLayout(log_header)
+
+        # 日志过滤栏
+        log_filter_bar = LogFilterBar()
+        right_layout.addWidget(log_filter_bar)
+
+        # 自定义日志显示区域，过滤生效时切换到过滤结果视图
         self.log_text = LogTextEdit()
-        right_layout.addWidget(self.log_text)
+        self.filtered_log_view = FilteredLogView(self.log_text)
+        log_stack = QStackedWidget()
+        log_stack.addWidget(self.log_text)
+        log_stack.addWidget(self.filtered_log_view)
+        right_layout.addWidget(log_stack)
 
         # 控制按钮 - 添加帮助按钮
         control_layout = QHBoxLayout()
@@ -234,16 +317,29 @@ class MainWindow(QMainWindow):
         control_layout.addWidget(clear_log_btn)
         control_layout.addWidget(save_log_btn)
         control_layout.addStretch()  # 在帮助按钮前添加弹性空间，使其靠右显示
+        debug_check = QCheckBox("🐞 调试")
+        debug_check.setToolTip("显示扫描、通知和设备服务等调试信息")
+        debug_check.setChecked(self.controller.verbosity == LogLevel.DEBUG)
+        control_layout.addWidget(debug_check)
         control_layout.addWidget(help_btn)
         right_layout.addLayout(control_layout)
 
         return right_panel, {
             'preset_buttons': preset_buttons,
+            'run_macro_btn': run_macro_btn,
+            'stop_macro_btn': stop_macro_btn,
+            'macro_status_label': macro_status_label,
+            'watch_btn': watch_btn,
             'cmd_input': cmd_input,
             'send_btn': send_btn,
             'log_text': self.log_text,
+            'log_filter_bar': log_filter_bar,
+            'log_stack': log_stack,
+            'packets_btn': packets_btn,
+            'diagnostics_btn': diagnostics_btn,
             'clear_log_btn': clear_log_btn,
             'save_log_btn': save_log_btn,
+            'debug_check': debug_check,
             'help_btn': help_btn  # 添加帮助按钮到返回字典
         }
 
@@ -254,14 +350,26 @@ class MainWindow(QMainWindow):
         self.connect_btn = self.left_widgets['connect_btn']
         self.disconnect_btn = self.left_widgets['disconnect_btn']
         self.status_label = self.left_widgets['status_label']
+        self.link_stats_label = self.left_widgets['link_stats_label']
 
         # 右侧控件
         self.preset_buttons = self.right_widgets['preset_buttons']
+        self.run_macro_btn = self.right_widgets['run_macro_btn']
+        self.stop_macro_btn = self.right_widgets['stop_macro_btn']
+        self.macro_status_label = self.right_widgets['macro_status_label']
+        self.watch_btn = self.right_widgets['watch_btn']
         self.cmd_input = self.right_widgets['cmd_input']
         self.send_btn = self.right_widgets['send_btn']
         self.clear_log_btn = self.right_widgets['clear_log_btn']
         self.save_log_btn = self.right_widgets['save_log_btn']
+        self.debug_check = self.right_widgets['debug_check']
         self.help_btn = self.right_widgets['help_btn']  # 添加帮助按钮引用
+        self.log_filter_bar = self.right_widgets['log_filter_bar']
+        self.log_stack = self.right_widgets['log_stack']
+        self.packets_btn = self.right_widgets['packets_btn']
+        self.packet_inspector = None  # 第一次打开时才创建
+        self.diagnostics_btn = self.right_widgets['diagnostics_btn']
+        self.diagnostics_panel = None
 
     def connectSignals(self):
         """连接信号和槽"""
@@ -270,18 +378,25 @@ class MainWindow(QMainWindow):
         self.disconnect_btn.clicked.connect(self.controller.disconnectDevice)
 
         # 设备列表信号
-        self.device_list.itemClicked.connect(self.on_device_selected)
-        self.device_list.itemDoubleClicked.connect(self.on_device_double_clicked)
+        self.device_list.deviceSelected.connect(self.on_device_selected)
+        self.device_list.deviceActivated.connect(self.on_device_double_clicked)
 
         # 右侧面板信号
         for btn in self.preset_buttons:
             btn.clicked.connect(lambda checked, b=btn: self.send_preset_command(b))
+        self.run_macro_btn.clicked.connect(self.run_macro_file)
+        self.stop_macro_btn.clicked.connect(self.controller.abortMacro)
+        self.watch_btn.clicked.connect(self.controller.setWatching)
 
         self.send_btn.clicked.connect(self.send_command)
         self.cmd_input.returnPressed.connect(self.send_command)
         self.clear_log_btn.clicked.connect(self.clear_log)
         self.save_log_btn.clicked.connect(self.save_log)
         self.help_btn.clicked.connect(self.show_help)  # 连接帮助按钮信号
+        self.debug_check.toggled.connect(self.controller.setDebugMode)
+        self.log_filter_bar.filterChanged.connect(self.on_log_filter_changed)
+        self.packets_btn.toggled.connect(self.on_packets_toggled)
+        self.diagnostics_btn.toggled.connect(self.on_diagnostics_toggled)
 
         # BLE控制器信号
         self.controller.deviceFound.connect(self.on_device_found)
@@ -290,6 +405,12 @@ class MainWindow(QMainWindow):
         self.controller.connectedChanged.connect(self.on_connected_changed)
         self.controller.statusChanged.connect(self.on_status_changed)
         self.controller.logMessage.connect(self.on_log_message)
+        self.controller.linkStatsChanged.connect(self.on_link_stats_changed)
+        self.controller.linkInfoChanged.connect(self.on_link_info_changed)
+        self.controller.macroStep.connect(self.on_macro_step)
+        self.controller.macroFinished.connect(self.on_macro_finished)
+        self.controller.watchingChanged.connect(self.on_watching_changed)
+        self.controller.watchRecords.connect(self.on_watch_records)
 
     # 槽函数实现
     @pyqtSlot(str, str, int)
@@ -307,32 +428,9 @@ class MainWindow(QMainWindow):
         """扫描状态变化槽函数"""
         if scanning:
             self.scan_status_label.setText("🔍 正在扫描设备...")
-            self.scan_status_label.setStyleSheet("""
-                QLabel#scanStatusLabel {
-                    background: #fff3cd;
-                    border: 1px solid #ffc107;
-                    border-radius: 8px;
-                    padding: 8px 12px;
-                    color: #856404;
-                    font-weight: bold;
-                    font-size: 13px;
-                    margin-bottom: 5px;
-                }
-            """)
         else:
             self.scan_status_label.setText("⏸️ 扫描暂停")
-            self.scan_status_label.setStyleSheet("""
-                QLabel#scanStatusLabel {
-                    background: #e6f3ff;
-                    border: 1px solid #4a90e2;
-                    border-radius: 8px;
-                    padding: 8px 12px;
-                    color: #2c5aa0;
-                    font-weight: bold;
-                    font-size: 13px;
-                    margin-bottom: 5px;
-                }
-            """)
+        set_state_property(self.scan_status_label, "scanning", scanning)
 
     @pyqtSlot(bool)
     def on_connected_changed(self, connected):
@@ -340,34 +438,159 @@ class MainWindow(QMainWindow):
         self.connect_btn.setEnabled(not connected and bool(self.selected_address))
         self.disconnect_btn.setEnabled(connected)
         self.send_btn.setEnabled(connected)
+        self.watch_btn.setEnabled(connected)
 
         # 更新状态标签样式
-        if connected:
-            self.status_label.setObjectName("statusConnected")
-        else:
-            self.status_label.setObjectName("statusLabel")
-        self.status_label.setStyle(self.status_label.style())  # 刷新样式
+        set_state_property(self.status_label, "connected", connected)
+        if not connected:
+            self.link_info_label.clear()
 
     @pyqtSlot(str)
     def on_status_changed(self, status):
         """状态变化槽函数"""
         self.status_label.setText(f"状态: {status}")
 
-    @pyqtSlot(str, str)
-    def on_log_message(self, message, msg_type):
-        """日志消息槽函数"""
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        self.log_text.add_log_message(message, msg_type, timestamp)
+    @pyqtSlot(dict)
+    def on_link_stats_changed(self, stats):
+        """连接中断/重连统计变化槽函数"""
+        self.link_stats_label.setText(
+            f"🔁 中断 {stats['link_losses']} 次，重连 {stats['reconnects']} 次，"
+            f"累计中断 {stats['total_downtime']:.1f} 秒")
+        self.link_stats_label.setToolTip(f"最近一次中断: {stats['last_downtime']:.1f} 秒")
+        self.link_stats_label.setVisible(True)
+
+    @pyqtSlot(dict)
+    def on_link_info_changed(self, info):
+        """MTU和吞吐量变化槽函数"""
+        mode = "无应答写入" if info['write_without_response'] else "有应答写入"
+        self.link_info_label.setText(
+            f"MTU {info['mtu']} · {mode} {info['write_size']} 字节/包 · "
+            f"↑ {_format_rate(info['tx_rate'])} · ↓ {_format_rate(info['rx_rate'])}")
+
+    @pyqtSlot(dict)
+    def on_macro_step(self, result):
+        """宏的一步完成槽函数"""
+        self.stop_macro_btn.setEnabled(True)
+        self.macro_status_label.setText(
+            f"第 {result['line']} 行 · {result['elapsed'] * 1000:.0f} ms · {result['text']}")
+
+    @pyqtSlot(dict)
+    def on_macro_finished(self, summary):
+        """宏结束槽函数"""
+        self.stop_macro_btn.setEnabled(False)
+        state = "完成" if summary['ok'] else f"中止: {summary['error']}"
+        self.macro_status_label.setText(
+            f"{summary['name']}{state}（{summary['commands']} 条命令，{summary['elapsed']:.1f} 秒）")
 
-    def on_device_selected(self, item):
+    @pyqtSlot(bool)
+    def on_watching_changed(self, watching):
+        """监视新日志开始或结束槽函数"""
+        self.watch_btn.setChecked(watching)
+
+    @pyqtSlot(str, str, list, int)
+    def on_watch_records(self, address, name, records, count):
+        """监视到新日志槽函数：写入本地库（通讯日志中的输出由控制器完成）"""
+        if self.log_store is None:
+            from log_store import LogStore
+            self.log_store = LogStore()
+        self.log_store.add_records(address, name, records, count)
+
+    @pyqtSlot(str, int, 'qint64', 'qint64')
+    def on_log_message(self, message, msg_type, timestamp_ns, latency_ns):
+        """日志消息槽函数 - 时间取控制器收发时的时刻，而不是槽函数执行的时刻"""
+        start = time.perf_counter()
+        timestamp = session_clock.format(timestamp_ns, latency_ns)
+        self.log_text.add_log_message(message, msg_type, timestamp,
+                                      session_clock.wall_time(timestamp_ns))
+        self._log_append.observe(time.perf_counter() - start)
+
+    def on_log_filter_changed(self, log_filter):
+        """日志过滤条件变化"""
+        self.filtered_log_view.set_filter(log_filter)
+        self.packets_btn.setChecked(False)
+        self.diagnostics_btn.setChecked(False)
+        self._show_log_view()
+
+    def _show_log_view(self):
+        if self.filtered_log_view.log_filter is None:
+            self.log_stack.setCurrentWidget(self.log_text)
+        else:
+            self.log_stack.setCurrentWidget(self.filtered_log_view)
+
+    def on_packets_toggled(self, checked):
+        """在日志和数据包面板之间切换"""
+        if not checked:
+            self._show_log_view()
+            return
+        self.diagnostics_btn.setChecked(False)
+        if self.packet_inspector is None:
+            from packet_inspector import PacketInspector
+            self.packet_inspector = PacketInspector(self.controller.capture)
+            self.log_stack.addWidget(self.packet_inspector)
+        self.log_stack.setCurrentWidget(self.packet_inspector)
+
+    def on_diagnostics_toggled(self, checked):
+        """在日志和诊断面板之间切换"""
+        if not checked:
+            self._show_log_view()
+            return
+        self.packets_btn.setChecked(False)
+        if self.diagnostics_panel is None:
+            from diagnostics_panel import DiagnosticsPanel
+            self.diagnostics_panel = DiagnosticsPanel(metrics, self.metrics_dir)
+            self.log_stack.addWidget(self.diagnostics_panel)
+        self.log_stack.setCurrentWidget(self.diagnostics_panel)
+
+    # ---- 运行指标 ----
+
+    def _setup_metrics(self, interval):
+        """界面指标：日志追加耗时和界面事件循环延迟；指定目录时定期写入指标文件"""
+        self._log_append = metrics.histogram(
+            "ui_log_append_seconds", "一条日志追加到控制台的耗时", UI_BUCKETS)
+        self._ui_loop_lag = metrics.histogram(
+            "ui_event_loop_lag_seconds", "界面事件循环定时器的延迟", LOOP_LAG_BUCKETS)
+        metrics.gauge("ui_log_lines", "控制台中的日志行数", lambda: len(self.log_text.log_content))
+
+        # 精确定时器：默认的粗略定时器本身允许5%的误差
+        self._ui_lag_timer = QTimer(self)
+        self._ui_lag_timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self._ui_lag_timer.setInterval(UI_LAG_INTERVAL_MS)
+        self._ui_lag_timer.timeout.connect(self._measure_ui_lag)
+        self._ui_lag_expected = time.monotonic() + UI_LAG_INTERVAL_MS / 1000
+        self._ui_lag_timer.start()
+
+        self.metrics_sampler = MetricsSampler(metrics)
+        self._metrics_error = None
+        self.metrics_timer = QTimer(self)
+        self.metrics_timer.setInterval(int(interval * 1000))
+        self.metrics_timer.timeout.connect(self.export_metrics)
+        if self.metrics_dir:
+            self.metrics_timer.start()
+
+    def _measure_ui_lag(self):
+        now = time.monotonic()
+        self._ui_loop_lag.observe(max(0.0, now - self._ui_lag_expected))
+        self._ui_lag_expected = now + UI_LAG_INTERVAL_MS / 1000
+
+    def export_metrics(self):
+        """把指标写入 .prom 和 .json 文件，同一错误只报告一次"""
+        try:
+            write_snapshot(self.metrics_sampler.sample(), self.metrics_dir)
+            self._metrics_error = None
+        except OSError as e:
+            if str(e) != self._metrics_error:
+                self._metrics_error = str(e)
+                print(f"写入指标文件失败: {e}")
+
+    def on_device_selected(self, address):
         """设备选择事件"""
-        self.selected_address = item.data(1)
+        self.selected_address = address
         self.connect_btn.setEnabled(not self.controller._connected)
 
-    def on_device_double_clicked(self, item):
+    def on_device_double_clicked(self, address):
         """设备双击事件"""
         if not self.controller._connected:
-            self.selected_address = item.data(1)
+            self.selected_address = address
             self.connect_device()
 
     def connect_device(self):
@@ -391,10 +614,29 @@ class MainWindow(QMainWindow):
             self.cmd_input.clear()
 
     def send_preset_command(self, button):
-        """发送预设命令"""
-        command = button.property('command')
-        if command:
+        """执行预设命令按钮：单条命令与手动输入一样发送，多步的作为宏执行"""
+        macro = button.property('macro')
+        if not macro:
+            return
+        command = single_command(macro)
+        if command is not None:
             self.controller.sendCommand(command)
+        else:
+            self.controller.runMacro(macro, f"「{button.text()}」")
+
+    def run_macro_file(self):
+        """选择宏脚本文件并执行"""
+        filename, _ = QFileDialog.getOpenFileName(
+            self, "运行宏文件", "", "宏脚本 (*.macro *.txt);;所有文件 (*)")
+        if not filename:
+            return
+        try:
+            with open(filename, 'r', encoding='utf-8') as f:
+                macro = f.read()
+        except OSError as e:
+            QMessageBox.critical(self, "错误", f"读取宏文件失败：{e}")
+            return
+        self.controller.runMacro(macro, f"宏 {os.path.basename(filename)} ")
 
     def clear_log(self):
         """清除日志"""
@@ -402,6 +644,10 @@ class MainWindow(QMainWindow):
 
     def show_help(self):
         """显示帮助对话框"""
+        self.help_dialog.show(self)
+
+    def _create_help_message_box(self, parent):
+        """help_dialog模块不可用时的简易帮助对话框"""
         help_text = """AT命令参考手册
 
 ═══════════════════════════════════════════════════════════════
@@ -490,7 +736,7 @@ class MainWindow(QMainWindow):
 ═══════════════════════════════════════════════════════════════"""
 
         # 创建消息框并设置详细内容
-        msg_box = QMessageBox(self)
+        msg_box = QMessageBox(parent)
         msg_box.setWindowTitle("AT命令参考手册")
         msg_box.setText("📋 Surron设备AT命令完整列表")
         msg_box.setDetailedText(help_text)
@@ -542,9 +788,8 @@ class MainWindow(QMainWindow):
         
         # 设置对话框大小
         msg_box.resize(700, 500)
-        
-        # 显示对话框
-        msg_box.exec()
+
+        return msg_box
 
     def save_log(self):
         """保存日志到文件"""
@@ -0,0 +1,262 @@
+"""
+运行指标 - 不依赖Qt，供控制器、工作进程和界面共用
+
+计数器（Counter）、仪表（Gauge）和固定分桶的直方图（Histogram）登记在MetricsRegistry中，
+snapshot()生成可直接JSON序列化的快照，render_prometheus()把快照转换为Prometheus文本格式。
+MetricsSampler连续取快照并计算两次之间计数器的每秒速率和直方图的区间统计，
+write_snapshot()把一次采样原子地写成 .prom 和 .json 文件（供node_exporter的textfile collector等采集），
+诊断面板显示同一种采样。
+
+记录只是一次加法或列表下标加一，不加锁：每个指标只在一个线程中更新，
+其他线程读取到的是某一时刻的值。队列深度等可以随时计算的值登记为函数，取快照时才计算。
+"""
+
+import json
+import math
+import os
+import threading
+import time
+from bisect import bisect_left
+
+# 常用分桶（秒）
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LOOP_LAG_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+UI_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1)
+
+DEFAULT_BASENAME = "surronble"  # 导出文件名（不含扩展名）
+
+
+class Counter:
+    """只增不减的计数；function不为None时取快照时调用它得到当前值"""
+
+    kind = "counter"
+
+    def __init__(self, name, help_text, function=None):
+        self.name = name
+        self.help = help_text
+        self.function = function
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def sample(self):
+        return {"type": self.kind, "help": self.help,
+                "value": self.function() if self.function is not None else self.value}
+
+
+class Gauge(Counter):
+    """可增可减的当前值"""
+
+    kind = "gauge"
+
+    def set(self, value):
+        self.value = value
+
+    def dec(self, amount=1):
+        self.value -= amount
+
+
+class Histogram:
+    """固定分桶的直方图，buckets为从小到大的上界，最后另有 +Inf 桶"""
+
+    kind = "histogram"
+
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def sample(self):
+        counts = list(self.counts)
+        cumulative = []
+        total = 0
+        for bound, count in zip(self.buckets, counts):
+            total += count
+            cumulative.append([bound, total])
+        # count取各桶之和，与 +Inf 桶一致
+        return {"type": self.kind, "help": self.help, "buckets": cumulative,
+                "sum": self.sum, "count": total + counts[-1]}
+
+
+class MetricsRegistry:
+    """按名称登记指标；同名指标重复登记时返回已有的（函数以最后一次登记为准）"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []  # 返回快照字典的函数，例如工作进程转发来的指标
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name, *args):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args)
+            elif type(metric) is not cls:
+                raise ValueError(f"指标 {name} 已登记为 {metric.kind}")
+            elif cls is not Histogram and args[1] is not None:
+                metric.function = args[1]
+            return metric
+
+    def counter(self, name, help_text, function=None):
+        return self._register(Counter, name, help_text, function)
+
+    def gauge(self, name, help_text, function=None):
+        return self._register(Gauge, name, help_text, function)
+
+    def histogram(self, name, help_text, buckets=LATENCY_BUCKETS):
+        return self._register(Histogram, name, help_text, buckets)
+
+    def add_collector(self, collector):
+        with self._lock:
+            self._collectors.append(collector)
+
+    def remove_collector(self, collector):
+        with self._lock:
+            if collector in self._collectors:
+                self._collectors.remove(collector)
+
+    def snapshot(self):
+        """所有指标的当前值：名称 -> {"type", "help", "value"}，直方图为buckets/sum/count"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+        snapshot = {}
+        for metric in metrics:
+            try:
+                snapshot[metric.name] = metric.sample()
+            except Exception as e:
+                print(f"读取指标 {metric.name} 失败: {e}")
+        for collector in collectors:
+            snapshot.update(collector())
+        return snapshot
+
+
+def histogram_quantile(buckets, count, q):
+    """按累计分桶估计分位数，返回所在桶的上界（超出最大上界时返回inf，没有样本时返回nan）"""
+    if count <= 0:
+        return math.nan
+    rank = q * count
+    for bound, cumulative in buckets:
+        if cumulative >= rank:
+            return bound
+    return math.inf
+
+
+class MetricsSampler:
+    """连续取快照，计算与上一次采样之间的变化
+
+    每次采样返回字典：
+      time       墙上时间（秒）
+      elapsed    距上一次采样的秒数（第一次为0）
+      metrics    MetricsRegistry.snapshot()
+      rates      计数器名称 -> 区间内每秒增量
+      intervals  直方图名称 -> 区间内的 {"count", "mean", "p95"}
+    """
+
+    def __init__(self, registry):
+        self.registry = registry
+        self._previous = None
+        self._previous_time = None
+
+    def sample(self):
+        now = time.monotonic()
+        snapshot = self.registry.snapshot()
+        previous = self._previous or {}
+        elapsed = now - self._previous_time if self._previous_time is not None else 0.0
+        rates = {}
+        intervals = {}
+        for name, entry in snapshot.items():
+            before = previous.get(name)
+            if entry["type"] == "counter":
+                if before is not None and elapsed > 0:
+                    rates[name] = max(0.0, (entry["value"] - before["value"]) / elapsed)
+            elif entry["type"] == "histogram":
+                intervals[name] = _interval(entry, before)
+        self._previous = snapshot
+        self._previous_time = now
+        return {"time": time.time(), "elapsed": elapsed, "metrics": snapshot,
+                "rates": rates, "intervals": intervals}
+
+
+def _interval(entry, before):
+    """直方图在两次采样之间新增的样本的统计"""
+    if before is None:
+        buckets, count, total = entry["buckets"], entry["count"], entry["sum"]
+    else:
+        buckets = [[bound, cumulative - old]
+                   for (bound, cumulative), (_, old) in zip(entry["buckets"], before["buckets"])]
+        count = entry["count"] - before["count"]
+        total = entry["sum"] - before["sum"]
+    return {"count": count,
+            "mean": total / count if count > 0 else math.nan,
+            "p95": histogram_quantile(buckets, count, 0.95)}
+
+
+def _format_value(value):
+    if not isinstance(value, float):
+        return str(value)
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(value)
+
+
+def render_prometheus(snapshot):
+    """Prometheus文本格式（0.0.4）"""
+    lines = []
+    for name, entry in snapshot.items():
+        help_text = entry["help"].replace("\\", "\\\\").replace("\n", "\\n")
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {entry['type']}")
+        if entry["type"] == "histogram":
+            for bound, cumulative in entry["buckets"]:
+                lines.append(f'{name}_bucket{{le="{_format_value(float(bound))}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{le="+Inf"}} {entry["count"]}')
+            lines.append(f"{name}_sum {_format_value(float(entry['sum']))}")
+            lines.append(f"{name}_count {entry['count']}")
+        else:
+            lines.append(f"{name} {_format_value(entry['value'])}")
+    return "\n".join(lines) + "\n"
+
+
+def _json_safe(value):
+    """JSON不支持的NaN/Inf写为None"""
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    if isinstance(value, dict):
+        return {key: _json_safe(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_json_safe(item) for item in value]
+    return value
+
+
+def _replace_file(path, text):
+    """先写临时文件再替换，采集方不会读到写了一半的文件"""
+    temp_path = path + ".tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(temp_path, path)
+
+
+def write_snapshot(sample, directory, basename=DEFAULT_BASENAME):
+    """把一次采样写成 directory/basename.prom 和 directory/basename.json，返回两个路径"""
+    os.makedirs(directory, exist_ok=True)
+    prom_path = os.path.join(directory, basename + ".prom")
+    json_path = os.path.join(directory, basename + ".json")
+    _replace_file(prom_path, render_prometheus(sample["metrics"]))
+    data = dict(sample, created=time.strftime("%Y-%m-%d %H:%M:%S",
+                                              time.localtime(sample["time"])))
+    _replace_file(json_path, json.dumps(_json_safe(data), ensure_ascii=False, indent=2))
+    return prom_path, json_path
+
+
+# 全局实例（工作进程中是该进程自己的实例，指标经ble_process转发）
+metrics = MetricsRegistry()
@@ -0,0 +1,133 @@
+"""
+原始通知抓包缓冲区 - 不依赖Qt，供控制器、工作进程代理和数据包面板共用
+
+每个通知记录接收时刻（time.monotonic_ns）、长度、特征和原始字节。
+所有通知的字节连续存放在一个bytearray中，时刻、结束偏移和特征编号存放在array中，
+不为每个通知创建对象：10万个通知只占数据本身加每个约18字节。
+超过容量时一次丢弃最早的四分之一；序号（seq）在整个会话中连续递增，
+丢弃和清空都不改变已有通知的序号。
+"""
+
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import namedtuple
+
+DEFAULT_MAX_PACKETS = 200_000
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+DUMP_WIDTH = 16  # 十六进制转储每行的字节数
+
+Packet = namedtuple("Packet", "seq timestamp length characteristic data")
+
+# 可打印ASCII原样显示，其余字节显示为 '.'
+_ASCII_TABLE = bytes(b if 0x20 <= b < 0x7f else 0x2e for b in range(256))
+
+
+def characteristic_label(characteristic):
+    """特征的显示名称：bleak的特征对象取UUID，字符串原样使用"""
+    return str(getattr(characteristic, 'uuid', characteristic))
+
+
+class PacketCapture:
+    """按接收顺序保存通知，可在一个线程追加、另一个线程读取"""
+
+    def __init__(self, max_packets=DEFAULT_MAX_PACKETS, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_packets = max_packets
+        self.max_bytes = max_bytes
+        self.characteristics = []  # 特征名称，按首次出现的顺序
+        self._char_index = {}  # 特征对象 -> characteristics中的编号
+        self._lock = threading.Lock()
+        self.first_seq = 0  # 缓冲区中第一个通知的序号
+        self.dropped = 0  # 因超过容量丢弃的通知数
+        self.origin = None  # 会话中第一个通知的接收时刻（纳秒），显示相对时间用
+        self._reset()
+
+    def _reset(self):
+        self._data = bytearray()
+        self._ends = array('Q')  # 每个通知在_data中的结束偏移
+        self._times = array('q')
+        self._chars = array('H')
+
+    def __len__(self):
+        return len(self._times)
+
+    @property
+    def end_seq(self):
+        """下一个通知的序号"""
+        return self.first_seq + len(self._times)
+
+    @property
+    def size(self):
+        """保存的数据字节数"""
+        return len(self._data)
+
+    def append(self, characteristic, data, timestamp=None):
+        """记录一个通知，返回它的序号"""
+        if timestamp is None:
+            timestamp = time.monotonic_ns()
+        if self.origin is None:
+            self.origin = timestamp
+        index = self._char_index.get(characteristic)
+        if index is None:
+            index = self._add_characteristic(characteristic)
+        with self._lock:
+            self._data += data
+            self._ends.append(len(self._data))
+            self._chars.append(index)
+            self._times.append(timestamp)
+            seq = self.first_seq + len(self._times) - 1
+            if len(self._times) > self.max_packets or len(self._data) > self.max_bytes:
+                self._trim()
+        return seq
+
+    def _add_characteristic(self, characteristic):
+        label = characteristic_label(characteristic)
+        try:
+            index = self.characteristics.index(label)
+        except ValueError:
+            index = len(self.characteristics)
+            self.characteristics.append(label)
+        self._char_index[characteristic] = index
+        return index
+
+    def _trim(self):
+        """丢弃最早的通知，直到数量和字节数都降到容量的四分之三"""
+        count = len(self._times)
+        excess_bytes = len(self._data) - self.max_bytes * 3 // 4
+        drop = max(count // 4, bisect_left(self._ends, excess_bytes) + 1 if excess_bytes > 0 else 0)
+        drop = min(drop, count)
+        cut = self._ends[drop - 1]
+        del self._data[:cut]
+        self._ends = array('Q', [end - cut for end in self._ends[drop:]])
+        del self._times[:drop]
+        del self._chars[:drop]
+        self.first_seq += drop
+        self.dropped += drop
+
+    def clear(self):
+        """清空缓冲区，之后的通知继续沿用递增的序号"""
+        with self._lock:
+            self.first_seq = self.end_seq
+            self._reset()
+
+    def packet(self, seq):
+        """按序号取回一个通知，已被丢弃或尚未收到时返回None"""
+        with self._lock:
+            i = seq - self.first_seq
+            if not 0 <= i < len(self._times):
+                return None
+            start = self._ends[i - 1] if i else 0
+            end = self._ends[i]
+            return Packet(seq, self._times[i], end - start,
+                          self.characteristics[self._chars[i]], bytes(self._data[start:end]))
+
+
+def hex_dump(data, width=DUMP_WIDTH):
+    """十六进制/ASCII转储：每行为偏移、十六进制字节和可打印字符"""
+    lines = []
+    for offset in range(0, len(data), width):
+        chunk = data[offset:offset + width]
+        lines.append(f"{offset:04X}  {chunk.hex(' ').upper():<{width * 3 - 1}}  "
+                     f"|{chunk.translate(_ASCII_TABLE).decode('ascii')}|")
+    return '\n'.join(lines)
@@ -0,0 +1,193 @@
+"""
+数据包面板 - 列出每个原始通知，选中后显示十六进制/ASCII转储
+
+表格直接读取控制器的PacketCapture，不复制数据：行按页（PAGE_SIZE）在滚动到底部时载入，
+单元格内容在绘制时才从抓包缓冲区取出并格式化，查看10万个通知的会话也只占可见页的内存。
+"""
+
+from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QCheckBox,
+                             QTableView, QHeaderView, QAbstractItemView, QPlainTextEdit, QSplitter)
+from PyQt6.QtCore import Qt, QTimer, QAbstractTableModel, QModelIndex
+from PyQt6.QtGui import QFont
+
+from packet_capture import hex_dump
+
+PAGE_SIZE = 200  # 每次载入的行数
+REFRESH_INTERVAL_MS = 300  # 面板可见时检查新通知的间隔
+PREVIEW_BYTES = 16  # 表格中预览的字节数
+
+
+class PacketTableModel(QAbstractTableModel):
+    """抓包缓冲区的分页视图，第row行对应序号first_seq + row的通知"""
+
+    COLUMNS = ["#", "时间 (s)", "长度", "特征", "数据"]
+
+    def __init__(self, capture):
+        super().__init__()
+        self.capture = capture
+        self.first_seq = capture.first_seq
+        self.loaded = 0  # 已载入（rowCount报告）的行数
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.loaded
+
+    def columnCount(self, parent=QModelIndex()):
+        return len(self.COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.COLUMNS[section]
+        return None
+
+    def packet_at(self, row):
+        return self.capture.packet(self.first_seq + row)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or role != Qt.ItemDataRole.DisplayRole:
+            return None
+        packet = self.packet_at(index.row())
+        column = index.column()
+        if column == 0:
+            return str(self.first_seq + index.row())
+        if packet is None:
+            return "（已丢弃）" if column == 4 else ""
+        if column == 1:
+            return f"{(packet.timestamp - self.capture.origin) / 1e9:.6f}"
+        if column == 2:
+            return str(packet.length)
+        if column == 3:
+            return packet.characteristic
+        preview = packet.data[:PREVIEW_BYTES].hex(' ').upper()
+        return preview + " …" if packet.length > PREVIEW_BYTES else preview
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self.first_seq + self.loaded < self.capture.end_seq
+
+    def fetchMore(self, parent=QModelIndex()):
+        self.fetch(PAGE_SIZE)
+
+    def fetch(self, count):
+        """再载入最多count行"""
+        count = min(count, self.capture.end_seq - self.first_seq - self.loaded)
+        if count <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self.loaded, self.loaded + count - 1)
+        self.loaded += count
+        self.endInsertRows()
+
+    def refresh(self):
+        """缓冲区被清空或丢弃了已载入的行时从头载入，返回是否重置"""
+        if self.capture.first_seq <= self.first_seq:
+            return False
+        self.beginResetModel()
+        self.first_seq = self.capture.first_seq
+        self.loaded = 0
+        self.endResetModel()
+        return True
+
+
+class PacketInspector(QWidget):
+    """原始通知列表和选中通知的转储"""
+
+    def __init__(self, capture):
+        super().__init__()
+        self.capture = capture
+        self.model_ = PacketTableModel(capture)
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        toolbar = QHBoxLayout()
+        self.summary_label = QLabel()
+        self.follow_check = QCheckBox("跟随最新")
+        self.follow_check.setChecked(True)
+        self.clear_btn = QPushButton("🧹 清空")
+        toolbar.addWidget(self.summary_label, 1)
+        toolbar.addWidget(self.follow_check)
+        toolbar.addWidget(self.clear_btn)
+        layout.addLayout(toolbar)
+
+        self.table = QTableView()
+        self.table.setModel(self.model_)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.table.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+        self.table.setWordWrap(False)
+        self.table.verticalHeader().setVisible(False)
+        # 固定行高：视图不必为每一行计算尺寸
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        self.table.verticalHeader().setDefaultSectionSize(22)
+        header = self.table.horizontalHeader()
+        for column, width in enumerate((70, 100, 50, 110)):
+            header.setSectionResizeMode(column, QHeaderView.ResizeMode.Interactive)
+            header.resizeSection(column, width)
+        header.setStretchLastSection(True)
+
+        self.dump_view = QPlainTextEdit()
+        self.dump_view.setReadOnly(True)
+        self.dump_view.setLineWrapMode(QPlainTextEdit.LineWrapMode.NoWrap)
+        self.dump_view.setPlaceholderText("选择一个数据包查看十六进制/ASCII转储")
+        font = QFont("Consolas")
+        font.setStyleHint(QFont.StyleHint.Monospace)
+        self.dump_view.setFont(font)
+
+        splitter = QSplitter(Qt.Orientation.Vertical)
+        splitter.addWidget(self.table)
+        splitter.addWidget(self.dump_view)
+        splitter.setSizes([300, 150])
+        layout.addWidget(splitter)
+
+        self.setStyleSheet("""
+            QTableView, QPlainTextEdit {
+                background: #1e1e1e;
+                color: #d4d4d4;
+                border: 1px solid #333;
+                border-radius: 8px;
+                font-family: 'Consolas', 'Monaco', 'Courier New', monospace;
+                font-size: 12px;
+                selection-background-color: #3390ff;
+            }
+        """)
+
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setInterval(REFRESH_INTERVAL_MS)
+        self.refresh_timer.timeout.connect(self.refresh)
+        self.table.selectionModel().currentRowChanged.connect(self.on_current_changed)
+        self.clear_btn.clicked.connect(self.clear)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh()
+        self.refresh_timer.start()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.refresh_timer.stop()
+
+    def refresh(self):
+        """同步新收到的通知；跟随最新时载入全部并滚动到底部"""
+        if self.model_.refresh():
+            self.dump_view.clear()
+        if self.follow_check.isChecked() and self.model_.canFetchMore():
+            self.model_.fetch(self.capture.end_seq)
+            self.table.scrollToBottom()
+        elif not self.model_.loaded:
+            self.model_.fetch(PAGE_SIZE)
+        dropped = f"，已丢弃最早的 {self.capture.dropped} 个" if self.capture.dropped else ""
+        self.summary_label.setText(
+            f"共 {len(self.capture)} 个数据包，{self.capture.size} 字节{dropped}")
+
+    def on_current_changed(self, current, previous):
+        if not current.isValid():
+            return
+        packet = self.model_.packet_at(current.row())
+        if packet is None:
+            self.dump_view.setPlainText("该数据包已超出抓包缓冲区容量被丢弃")
+            return
+        elapsed = (packet.timestamp - self.capture.origin) / 1e9
+        self.dump_view.setPlainText(
+            f"#{packet.seq}  {elapsed:.6f} s  {packet.length} 字节  {packet.characteristic}\n\n"
+            + hex_dump(packet.data))
+
+    def clear(self):
+        self.capture.clear()
+        self.refresh()
@@ -0,0 +1,139 @@
+"""
+共享内存环形缓冲区 - 单生产者/单消费者，跨进程传递变长记录，不依赖Qt
+
+内存布局：
+  [0:8]   写位置（累计写入字节数，只由生产者更新）
+  [8:16]  读位置（累计读取字节数，只由消费者更新）
+  [16:]   数据区，每条记录为 4字节长度 + 内容，按4字节对齐
+记录放不下数据区末尾时写入回绕标记，从数据区开头继续。
+记录内容最长为 max_payload（数据区大小减4字节），更长的记录永远写不进去，由调用方拒绝。
+"""
+
+import struct
+from multiprocessing import shared_memory
+
+_HEADER = struct.Struct('<QQ')
+_POS = struct.Struct('<Q')
+_LEN = struct.Struct('<I')
+_HEADER_SIZE = _HEADER.size
+_WRAP = 0xFFFFFFFF  # 回绕标记
+
+DEFAULT_CAPACITY = 4 * 1024 * 1024
+
+
+def _record_size(length):
+    return (_LEN.size + length + 3) & ~3
+
+
+class ShmRing:
+    """基于multiprocessing.shared_memory的环形缓冲区"""
+
+    def __init__(self, shm, owner):
+        self._shm = shm
+        self._buf = shm.buf
+        self._owner = owner
+        self.capacity = shm.size - _HEADER_SIZE
+        self.capacity -= self.capacity % 4
+
+    @classmethod
+    def create(cls, capacity=DEFAULT_CAPACITY):
+        """创建新的缓冲区（由负责释放的一方调用）"""
+        capacity = (capacity + 3) & ~3
+        shm = shared_memory.SharedMemory(create=True, size=_HEADER_SIZE + capacity)
+        _HEADER.pack_into(shm.buf, 0, 0, 0)
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name):
+        """按名称连接已存在的缓冲区"""
+        return cls(shared_memory.SharedMemory(name=name), owner=False)
+
+    @property
+    def name(self):
+        return self._shm.name
+
+    @property
+    def max_payload(self):
+        """单条记录内容的最大字节数"""
+        return self.capacity - _LEN.size
+
+    def pending_bytes(self):
+        """尚未被读取的字节数"""
+        write_pos, read_pos = _HEADER.unpack_from(self._buf, 0)
+        return write_pos - read_pos
+
+    # ---- 生产者 ----
+
+    def write(self, payload):
+        """写入一条记录，空间不足（或记录超过max_payload）时返回False"""
+        length = len(payload)
+        size = _record_size(length)
+        buf = self._buf
+        capacity = self.capacity
+        if size > capacity:
+            return False
+
+        write_pos, read_pos = _HEADER.unpack_from(buf, 0)
+        offset = write_pos % capacity
+        tail = capacity - offset
+        free = capacity - (write_pos - read_pos)
+
+        if size > tail:
+            if tail > free:
+                return False
+            # 末尾放不下，写回绕标记（对齐保证剩余空间至少4字节）
+            _LEN.pack_into(buf, _HEADER_SIZE + offset, _WRAP)
+            write_pos += tail
+            free -= tail
+            offset = 0
+            if size > free:
+                # 开头的空间还不够：先发布回绕标记，消费者读过后从开头整段可用，
+                # 否则接近数据区大小的记录在写位置靠后时永远写不进去
+                _POS.pack_into(buf, 0, write_pos)
+                return False
+        elif size > free:
+            return False
+
+        start = _HEADER_SIZE + offset
+        _LEN.pack_into(buf, start, length)
+        buf[start + _LEN.size:start + _LEN.size + length] = payload
+        # 内容写完后才发布新的写位置
+        _POS.pack_into(buf, 0, write_pos + size)
+        return True
+
+    # ---- 消费者 ----
+
+    def read_all(self, limit=None):
+        """读出当前所有（最多limit条）记录"""
+        buf = self._buf
+        capacity = self.capacity
+        write_pos, read_pos = _HEADER.unpack_from(buf, 0)
+
+        records = []
+        while read_pos < write_pos:
+            offset = read_pos % capacity
+            start = _HEADER_SIZE + offset
+            length = _LEN.unpack_from(buf, start)[0]
+            if length == _WRAP:
+                read_pos += capacity - offset
+                continue
+            records.append(bytes(buf[start + _LEN.size:start + _LEN.size + length]))
+            read_pos += _record_size(length)
+            if limit is not None and len(records) >= limit:
+                break
+
+        _POS.pack_into(buf, 8, read_pos)
+        return records
+
+    def close(self):
+        """断开映射，创建方同时释放共享内存"""
+        if self._shm is None:
+            return
+        self._buf = None
+        self._shm.close()
+        if self._owner:
+            try:
+                self._shm.unlink()
+            except FileNotFoundError:
+                pass
+        self._shm = None
@@ -0,0 +1,376 @@
+"""
+模拟的Surron BLE日志设备 - 不依赖Qt和真实蓝牙
+
+实现与README一致的AT命令集，并提供与bleak接口相同的
+SimulatedClient / SimulatedScanner，用于基准测试和无设备调试。
+响应按行发送通知，可配置命令处理延迟、通知间隔和链路延迟来模拟BLE连接间隔。
+"""
+
+import asyncio
+import random
+import time
+from collections import deque
+from datetime import datetime
+
+from at_protocol import AT_SERVICE_UUID, AT_TX_CHAR_UUID, AT_RX_CHAR_UUID, LOG_CAPACITY
+
+DEFAULT_MTU = 247
+
+
+def checksum(timestamp, code):
+    """日志条目校验和（4位十六进制）"""
+    value = 0
+    for byte in f"{timestamp}{code}".encode('ascii'):
+        value = (value * 31 + byte) & 0xFFFF
+    return f"{value:04X}"
+
+
+class SimulatedLogDevice:
+    """模拟设备的日志存储和AT命令处理"""
+
+    def __init__(self, name="Surron-SIM", address="SIM:00:00:00:00:01", entries=0,
+                 rssi=-60, command_latency=0.03, notify_interval=0.0, mtu=DEFAULT_MTU, seed=None,
+                 link_delay=0.0):
+        self.name = name
+        self.address = address
+        self.rssi = rssi
+        self.command_latency = command_latency  # 命令到首个响应的延迟（秒）
+        self.notify_interval = notify_interval  # 相邻通知之间的间隔（秒）
+        # 单向链路延迟（秒，约一个连接间隔）：写入和通知都晚到，但多条命令的传输可以重叠
+        self.link_delay = link_delay
+        self.mtu = mtu
+        self.entries = []  # (seq, timestamp, code)
+        self.next_seq = 1
+        self.commands_received = 0
+        self._rng = random.Random(seed)
+        if entries:
+            self.generate(entries)
+
+    # ---- 日志存储 ----
+
+    def insert(self, code, timestamp):
+        """插入一条日志，超出容量时覆盖最旧的记录"""
+        self.entries.append((self.next_seq, int(timestamp), code.upper()))
+        self.next_seq += 1
+        if len(self.entries) > LOG_CAPACITY:
+            del self.entries[0]
+
+    def generate(self, count, start_time=1717830000):
+        """生成随机日志"""
+        categories = ['10', '20', '30', '40']
+        timestamp = start_time
+        for _ in range(count):
+            timestamp += self._rng.randrange(1, 60)
+            code = (self._rng.choice(categories) + f"{self._rng.randrange(256):02X}"
+                    + f"{self._rng.randrange(1 << 32):08X}")
+            self.insert(code, timestamp)
+
+    # ---- AT命令 ----
+
+    def handle(self, command):
+        """处理一条AT命令，返回响应行列表"""
+        self.commands_received += 1
+        command = command.strip()
+        name, _, arg = command.partition('=')
+        handler = self._HANDLERS.get(name.upper())
+        if handler is None:
+            return [f"+LOGERROR: Unknown command: {command}"]
+        try:
+            return handler(self, arg)
+        except (ValueError, IndexError):
+            return [f"+LOGERROR: Invalid parameter: {command}"]
+
+    def _data_lines(self, selected, title):
+        lines = [f"+LOGOK: {title}"]
+        total = len(selected)
+        for i, (seq, ts, code) in enumerate(selected, 1):
+            lines.append(f"+LOGDATA: {total},{i},{ts},{code},{checksum(ts, code)}")
+        lines.append(f"+LOGOK: Read complete, {total} entries")
+        return lines
+
+    def _help(self, arg):
+        return ["+LOGOK: Supported commands:"] + [f"  {name}" for name in sorted(self._HANDLERS)]
+
+    def _status(self, arg):
+        return ["+LOGOK: Flash log system: INITIALIZED", f"Total entries: {len(self.entries)}"]
+
+    def _stats(self, arg):
+        used = len(self.entries) * 24
+        oldest = self.entries[0][1] if self.entries else 0
+        newest = self.entries[-1][1] if self.entries else 0
+        return [
+            f"+LOGOK: Total entries: {len(self.entries)}",
+            f"Used space: {used} bytes",
+            f"Free space: {LOG_CAPACITY * 24 - used} bytes",
+            f"Error count: {len(self.entries)}",
+            f"Write cycles: {self.next_seq - 1}",
+            f"Oldest time: {oldest}",
+            f"Newest time: {newest}",
+        ]
+
+    def _count(self, arg):
+        return [str(len(self.entries))]
+
+    def _read_all(self, arg):
+        return self._data_lines(self.entries, "Reading all logs...")
+
+    def _latest(self, arg):
+        count = int(arg)
+        selected = self.entries[-count:] if count > 0 else []
+        return self._data_lines(selected, f"Reading latest {count} logs...")
+
+    def _range(self, arg):
+        start, end = (int(v) for v in arg.split(','))
+        selected = [e for e in self.entries if start <= e[0] <= end]
+        return self._data_lines(selected, f"Reading range {start}-{end}...")
+
+    def _time(self, arg):
+        start, end = (int(v) for v in arg.split(','))
+        selected = [e for e in self.entries if start <= e[1] <= end]
+        return self._data_lines(selected, f"Reading time {start}-{end}...")
+
+    def _error(self, arg):
+        code, match = arg.split(',')
+        code = code.upper()
+        match = int(match)
+        if len(code) != 12 or not 1 <= match <= 6:
+            raise ValueError(arg)
+        prefix = code[:match * 2]
+        selected = [e for e in self.entries if e[2].startswith(prefix)]
+        return self._data_lines(selected, f"Reading error code {code} (match {match} bytes)...")
+
+    def _insert(self, arg):
+        fields = arg.split(',')
+        code = fields[0]
+        int(code, 16)
+        if len(code) != 12:
+            raise ValueError(arg)
+        year, month, day, hour, minute, second = (int(v) for v in fields[1:7])
+        timestamp = datetime(year, month, day, hour, minute, second).timestamp()
+        self.insert(code, timestamp)
+        return [f"+LOGOK: Log inserted: [{code.upper()}]"]
+
+    def _insert_now(self, arg):
+        int(arg, 16)
+        if len(arg) != 12:
+            raise ValueError(arg)
+        self.insert(arg, time.time())
+        return [f"+LOGOK: Log inserted with current time: [{arg.upper()}]"]
+
+    def _check(self, arg):
+        return [f"+LOGOK: Integrity check passed, {len(self.entries)} entries"]
+
+    def _clear(self, arg):
+        self.entries.clear()
+        return ["+LOGOK: All logs cleared"]
+
+    _HANDLERS = {
+        "AT+LOGHELP": _help,
+        "AT+LOGSTATUS": _status,
+        "AT+LOGSTATS": _stats,
+        "AT+LOGCOUNT": _count,
+        "AT+LOGREADALL": _read_all,
+        "AT+LOGLATEST": _latest,
+        "AT+LOGRANGE": _range,
+        "AT+LOGTIME": _time,
+        "AT+LOGERROR": _error,
+        "AT+LOGINSERT": _insert,
+        "AT+LOGINSERTNOW": _insert_now,
+        "AT+LOGCHECK": _check,
+        "AT+LOGCLEAR": _clear,
+    }
+
+
+# 已注册的模拟设备: address -> SimulatedLogDevice
+DEVICES = {}
+
+
+def register_device(device):
+    """注册模拟设备，供SimulatedClient和SimulatedScanner使用"""
+    DEVICES[device.address] = device
+    return device
+
+
+class SimulatedCharacteristic:
+    """模拟的GATT特征"""
+
+    def __init__(self, uuid, properties, handle):
+        self.uuid = uuid
+        self.properties = properties
+        self.handle = handle
+
+    def __str__(self):
+        return self.uuid
+
+
+class SimulatedService:
+    """模拟的GATT服务"""
+
+    def __init__(self, uuid, characteristics):
+        self.uuid = uuid
+        self.characteristics = characteristics
+
+
+class SimulatedServices(list):
+    """模拟的服务集合（BleakGATTServiceCollection的最小子集）"""
+
+    def get_characteristic(self, handle):
+        for service in self:
+            for char in service.characteristics:
+                if char.handle == handle:
+                    return char
+        return None
+
+
+class SimulatedClient:
+    """与BleakClient接口一致的模拟客户端"""
+
+    def __init__(self, address_or_device, disconnected_callback=None, **kwargs):
+        address = getattr(address_or_device, 'address', address_or_device)
+        self.address = address
+        self.device = DEVICES.get(address) or register_device(SimulatedLogDevice(address=address))
+        self._disconnected_callback = disconnected_callback
+        self._connected = False
+        self._notify_callbacks = {}
+        self._pending = set()
+        self._rx_buffer = ""  # 尚未收到行结束符的命令（长命令会分多次写入）
+        self._last_response = None
+        self._outbox = deque()  # 有链路延迟时待送达的通知 (送达时间, 数据)
+        self._deliver_task = None
+        self._services = SimulatedServices([SimulatedService(AT_SERVICE_UUID, [
+            SimulatedCharacteristic(AT_TX_CHAR_UUID, ["write", "write-without-response"], 0x12),
+            SimulatedCharacteristic(AT_RX_CHAR_UUID, ["notify"], 0x14),
+        ])])
+
+    @property
+    def is_connected(self):
+        return self._connected
+
+    @property
+    def mtu_size(self):
+        return self.device.mtu
+
+    @property
+    def services(self):
+        return self._services
+
+    async def connect(self, **kwargs):
+        await asyncio.sleep(self.device.command_latency)
+        self._connected = True
+        return True
+
+    async def disconnect(self):
+        was_connected = self._connected
+        self._connected = False
+        self._notify_callbacks.clear()
+        for task in list(self._pending):
+            task.cancel()
+        if was_connected and self._disconnected_callback:
+            self._disconnected_callback(self)
+        return True
+
+    async def get_services(self, **kwargs):
+        return self._services
+
+    async def start_notify(self, char, callback, **kwargs):
+        self._notify_callbacks[getattr(char, 'uuid', char)] = (char, callback)
+
+    async def stop_notify(self, char):
+        self._notify_callbacks.pop(getattr(char, 'uuid', char), None)
+
+    async def write_gatt_char(self, char, data, response=None):
+        if not self._connected:
+            raise Exception("Not connected")
+        self._rx_buffer += bytes(data).decode('utf-8', errors='ignore')
+        *commands, self._rx_buffer = self._rx_buffer.replace('\r', '\n').split('\n')
+        commands = [command for command in commands if command.strip()]
+        if commands:
+            task = asyncio.ensure_future(self._respond(commands, self._last_response))
+            self._last_response = task
+            self._pending.add(task)
+            task.add_done_callback(self._pending.discard)
+        if response:
+            # 有应答写入要等应答传回
+            await asyncio.sleep(2 * self.device.link_delay or self.device.command_latency / 2)
+
+    async def _respond(self, commands, previous):
+        """按收到的顺序处理命令并逐条发送通知"""
+        if self.device.link_delay:
+            await asyncio.sleep(self.device.link_delay)
+        if previous is not None and not previous.done():
+            await asyncio.wait([previous])
+        for command in commands:
+            await asyncio.sleep(self.device.command_latency)
+            for line in self.device.handle(command):
+                await self._notify((line + "\r\n").encode('utf-8'))
+
+    async def _notify(self, payload):
+        chunk = max(20, self.device.mtu - 3)
+        for start in range(0, len(payload), chunk):
+            if not self._connected:
+                return
+            if self.device.link_delay:
+                self._outbox.append((time.monotonic() + self.device.link_delay,
+                                     payload[start:start + chunk]))
+                if self._deliver_task is None or self._deliver_task.done():
+                    self._deliver_task = asyncio.ensure_future(self._deliver())
+                    self._pending.add(self._deliver_task)
+                    self._deliver_task.add_done_callback(self._pending.discard)
+            else:
+                self._deliver_now(payload[start:start + chunk])
+            if self.device.notify_interval:
+                await asyncio.sleep(self.device.notify_interval)
+
+    def _deliver_now(self, data):
+        for char, callback in list(self._notify_callbacks.values()):
+            callback(char, bytearray(data))
+
+    async def _deliver(self):
+        """按发送顺序在链路延迟之后送达通知"""
+        while self._outbox and self._connected:
+            due, data = self._outbox[0]
+            delay = due - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._outbox.popleft()
+            self._deliver_now(data)
+
+    def simulate_link_loss(self):
+        """模拟链路断开"""
+        self._connected = False
+        self._notify_callbacks.clear()
+        for task in list(self._pending):
+            task.cancel()
+        if self._disconnected_callback:
+            self._disconnected_callback(self)
+
+
+class _Advert:
+    def __init__(self, rssi):
+        self.rssi = rssi
+
+
+class SimulatedScanner:
+    """与BleakScanner接口一致的模拟扫描器"""
+
+    def __init__(self, detection_callback=None, advert_interval=0.1, **kwargs):
+        self._callback = detection_callback
+        self._interval = advert_interval
+        self._task = None
+
+    async def start(self):
+        self._task = asyncio.ensure_future(self._advertise())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _advertise(self):
+        rng = random.Random()
+        while True:
+            for device in list(DEVICES.values()):
+                if self._callback:
+                    rssi = device.rssi + rng.randrange(-3, 4)
+                    self._callback(device, _Advert(rssi))
+            await asyncio.sleep(self._interval)
@@ -0,0 +1,97 @@
+"""
+启动性能分析 - 配合 surronBle.py --profile-startup 使用
+
+记录模块导入、主窗口及各面板构建、样式表应用和首次BLE事件循环的耗时，
+输出按耗时排序的表格并写入JSON文件。未启用时所有记录调用都是空操作。
+"""
+
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+
+class StartupProfiler:
+    """启动耗时记录器"""
+
+    def __init__(self):
+        self.enabled = False
+        self.origin = time.perf_counter()  # 以本模块导入时刻为零点
+        self.records = []
+        self._lock = threading.Lock()
+
+    def enable(self):
+        """启用记录"""
+        self.enabled = True
+
+    def record(self, name, duration, category="stage", start=None):
+        """记录一项耗时（秒）"""
+        if not self.enabled:
+            return
+        if start is None:
+            start = time.perf_counter() - duration
+        entry = {
+            "name": name,
+            "category": category,
+            "start_ms": round((start - self.origin) * 1000, 3),
+            "duration_ms": round(duration * 1000, 3),
+            "thread": threading.current_thread().name,
+        }
+        with self._lock:
+            self.records.append(entry)
+
+    @contextmanager
+    def measure(self, name, category="stage"):
+        """计时上下文"""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start, category, start)
+
+    def mark(self, name, since, category="event"):
+        """记录从since（perf_counter值）到现在的耗时"""
+        if self.enabled:
+            self.record(name, time.perf_counter() - since, category, since)
+
+    def has(self, name):
+        """是否已记录过指定名称"""
+        with self._lock:
+            return any(r["name"] == name for r in self.records)
+
+    def sorted_records(self):
+        """按耗时从大到小排序的记录"""
+        with self._lock:
+            return sorted(self.records, key=lambda r: r["duration_ms"], reverse=True)
+
+    def report(self):
+        """生成排序后的文本表格"""
+        rows = self.sorted_records()
+        name_width = max([len(r["name"]) for r in rows] + [10])
+        lines = [
+            f"{'阶段':<{name_width}}  {'类别':<8} {'耗时(ms)':>10} {'起点(ms)':>10}  线程",
+            "-" * (name_width + 48),
+        ]
+        for r in rows:
+            lines.append(f"{r['name']:<{name_width}}  {r['category']:<8} "
+                         f"{r['duration_ms']:>10.1f} {r['start_ms']:>10.1f}  {r['thread']}")
+        return "\n".join(lines)
+
+    def write_json(self, path):
+        """把记录写入JSON文件"""
+        data = {
+            "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "records": self.sorted_records(),
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+# 常用记录名称
+FIRST_LOOP_TICK = "ble: first event-loop tick"
+
+# 全局实例
+profiler = StartupProfiler()
@@ -5,6 +5,7 @@ Surron BLE AT通讯工具
 
 依赖库:
 pip install PyQt6 bleak
+可选: pip install qasync  (--qt-loop 单线程事件循环模式)
 
 作者: T01284
 版本: 2.1.0
@@ -12,12 +13,64 @@ pip install PyQt6 bleak
 
 import sys
 import signal
+import time
+import argparse
 import traceback
+import importlib
+import importlib.util
+
+from startup_profile import profiler, FIRST_LOOP_TICK
 from PyQt6.QtWidgets import QApplication, QMessageBox, QSplashScreen
 from PyQt6.QtCore import QTimer, Qt
 from PyQt6.QtGui import QPixmap, QPainter, QFont, QColor, QIcon
 
-from main_window import MainWindow
+
+class StartupStages:
+    """分阶段启动 - 在启动画面上显示真实进度并记录每个阶段的耗时"""
+
+    def __init__(self):
+        self.app = None
+        self.splash = None
+        self.start_time = time.perf_counter()
+        self.total = None
+        self.stages = []  # (名称, 耗时秒)
+        self._current = None
+        self._current_start = self.start_time
+
+    def attach(self, app, splash):
+        """启动画面创建后，后续阶段在启动画面上显示进度"""
+        self.app = app
+        self.splash = splash
+
+    def begin(self, name, message=None):
+        """结束上一阶段并开始新阶段"""
+        self._finish_current()
+        self._current = name
+        self._current_start = time.perf_counter()
+        if self.splash and message:
+            self.splash.showMessage(message, Qt.AlignmentFlag.AlignBottom, QColor(255, 255, 255))
+            self.app.processEvents()
+
+    def finish(self):
+        """结束全部阶段，返回总耗时（秒）"""
+        self._finish_current()
+        self.total = time.perf_counter() - self.start_time
+        return self.total
+
+    def _finish_current(self):
+        if self._current is not None:
+            elapsed = time.perf_counter() - self._current_start
+            self.stages.append((self._current, elapsed))
+            profiler.record(self._current, elapsed, "startup", self._current_start)
+            self._current = None
+
+    def print_report(self):
+        """打印各阶段耗时"""
+        print("⏱️ 启动阶段耗时:")
+        for name, elapsed in self.stages:
+            print(f"   {name:<16} {elapsed * 1000:8.1f} ms")
+        if self.total is not None:
+            print(f"   {'可交互总耗时':<16} {self.total * 1000:8.1f} ms")
 
 
 def create_splash_screen():
@@ -53,6 +106,56 @@ def create_splash_screen():
     return splash
 
 
+# --profile-startup 时单独计时导入的模块（按依赖顺序）
+PROFILED_IMPORTS = ["ui_components", "custom_widgets", "main_window"]
+PROFILE_WAIT_MS = 3000  # 等待首次BLE事件循环的最长时间
+
+
+def parse_args(argv):
+    """解析命令行参数，未识别的参数留给Qt"""
+    parser = argparse.ArgumentParser(description="Surron BLE AT通讯工具")
+    parser.add_argument("--profile-startup", nargs="?", const="startup_profile.json",
+                        default=None, metavar="JSON",
+                        help="记录启动各阶段耗时，打印排序表格并写入JSON文件")
+    parser.add_argument("--qt-loop", action="store_true",
+                        help="asyncio事件循环与Qt事件循环在同一线程运行（需要qasync）")
+    parser.add_argument("--ble-process", action="store_true",
+                        help="扫描、连接和通知处理在独立进程中运行")
+    parser.add_argument("--debug", action="store_true",
+                        help="以调试模式启动，日志中显示扫描、通知和设备服务等细节（运行时可在界面中切换）")
+    parser.add_argument("--metrics-dir", default=None, metavar="DIR",
+                        help="定期把运行指标写入 DIR/surronble.prom（Prometheus文本格式）和 surronble.json")
+    parser.add_argument("--metrics-interval", type=float, default=10.0, metavar="SECONDS",
+                        help="--metrics-dir 的写入周期（秒）")
+    return parser.parse_known_args(argv[1:])
+
+
+def import_profiled_modules():
+    """逐个导入界面模块并记录耗时"""
+    for module_name in PROFILED_IMPORTS:
+        with profiler.measure(f"import {module_name}", "import"):
+            importlib.import_module(module_name)
+
+
+def finish_startup_profile(json_path):
+    """等待首次BLE事件循环（或超时）后输出分析报告"""
+    deadline = time.perf_counter() + PROFILE_WAIT_MS / 1000
+
+    def poll():
+        if not profiler.has(FIRST_LOOP_TICK) and time.perf_counter() < deadline:
+            QTimer.singleShot(20, poll)
+            return
+        print("\n📊 启动性能分析:")
+        print(profiler.report())
+        try:
+            profiler.write_json(json_path)
+            print(f"📄 已写入 {json_path}")
+        except OSError as e:
+            print(f"写入启动分析文件失败: {e}")
+
+    poll()
+
+
 def setup_signal_handlers():
     """设置信号处理器"""
 
@@ -70,19 +173,13 @@ def check_dependencies():
     """检查依赖库"""
     missing_deps = []
 
-    try:
-        import PyQt6
-        print("✓ PyQt6 已安装")
-    except ImportError:
-        missing_deps.append("PyQt6")
-        print("❌ PyQt6 未安装")
-
-    try:
-        import bleak
-        print("✓ bleak 已安装")
-    except ImportError:
-        missing_deps.append("bleak")
-        print("❌ bleak 未安装")
+    # 只查找模块，不实际导入，避免启动时加载bleak
+    for module_name, package_name in (("PyQt6", "PyQt6"), ("bleak", "bleak")):
+        if importlib.util.find_spec(module_name) is not None:
+            print(f"✓ {package_name} 已安装")
+        else:
+            missing_deps.append(package_name)
+            print(f"❌ {package_name} 未安装")
 
     return missing_deps
 
@@ -116,6 +213,10 @@ pip install PyQt6 bleak
 
 def main():
     """主函数"""
+    args, qt_argv = parse_args(sys.argv)
+    if args.profile_startup:
+        profiler.enable()
+
     print("=" * 60)
     print("🔧 Surron BLE AT通讯工具 v2.1.0 (现代化无边框界面)")
     print("=" * 60)
@@ -129,9 +230,12 @@ def main():
 
     print("✅ 依赖库检查通过")
 
+    stages = StartupStages()
+
     try:
         # 创建应用程序
-        app = QApplication(sys.argv)
+        stages.begin("创建应用")
+        app = QApplication(sys.argv[:1] + qt_argv)
         app.setApplicationName("Surron BLE Tool")
         app.setApplicationVersion("2.1.0")
         app.setOrganizationName("Surron")
@@ -141,10 +245,14 @@ def main():
         app.setStyle('Fusion')  # 使用现代化样式
 
         # 创建启动画面
+        stages.begin("启动画面")
         print("🎨 创建启动画面...")
         splash = create_splash_screen()
         splash.show()
         app.processEvents()
+        stages.attach(app, splash)
+
+        stages.begin("信号处理")
 
         # 设置信号处理
         setup_signal_handlers()
@@ -156,31 +264,43 @@ def main():
 
         print("✅ 应用程序初始化完成")
 
-        # 模拟加载过程
-        import time
-        splash.showMessage("正在初始化BLE控制器...", Qt.AlignmentFlag.AlignBottom, QColor(255, 255, 255))
-        app.processEvents()
-        time.sleep(0.5)
-
-        splash.showMessage("正在加载UI组件...", Qt.AlignmentFlag.AlignBottom, QColor(255, 255, 255))
-        app.processEvents()
-        time.sleep(0.5)
-
-        splash.showMessage("正在应用现代化样式...", Qt.AlignmentFlag.AlignBottom, QColor(255, 255, 255))
-        app.processEvents()
-        time.sleep(0.5)
-
-        # 创建主窗口
+        # 加载UI模块
+        stages.begin("加载UI组件", "正在加载UI组件...")
+        if profiler.enabled:
+            import_profiled_modules()
+        from main_window import MainWindow
+        from ble_controller import (LOOP_MODE_THREAD, LOOP_MODE_QT, LOOP_MODE_PROCESS,
+                                    create_qt_event_loop)
+
+        # 单线程模式：asyncio循环由Qt事件循环驱动
+        event_loop = None
+        loop_mode = LOOP_MODE_THREAD
+        if args.qt_loop:
+            event_loop = create_qt_event_loop(app)
+            loop_mode = LOOP_MODE_QT
+            print("🔁 使用Qt集成的asyncio事件循环")
+        elif args.ble_process:
+            loop_mode = LOOP_MODE_PROCESS
+            print("🔀 BLE通讯在独立进程中运行")
+
+        # 创建主窗口（BLE控制器在窗口显示后于后台启动）
+        stages.begin("创建主窗口", "正在创建主窗口...")
         print("🪟 创建无边框主窗口...")
-        main_window = MainWindow()
+        with profiler.measure("MainWindow()"):
+            main_window = MainWindow(loop_mode=loop_mode, debug=args.debug,
+                                     metrics_dir=args.metrics_dir,
+                                     metrics_interval=args.metrics_interval)
 
         # 关闭启动画面并显示主窗口
-        splash.showMessage("启动完成！", Qt.AlignmentFlag.AlignBottom, QColor(255, 255, 255))
+        stages.begin("显示主窗口", "启动完成！")
+        main_window.show()
+        splash.finish(main_window)
         app.processEvents()
-        time.sleep(0.3)
 
-        splash.close()
-        main_window.show()
+        stages.finish()
+        stages.print_report()
+        if profiler.enabled:
+            finish_startup_profile(args.profile_startup)
 
         print("✅ 主窗口已显示")
         print("=" * 60)
@@ -189,7 +309,11 @@ def main():
         print("💡 提示: 双击标题栏可以最大化/还原窗口")
 
         # 运行应用程序
-        result = app.exec()
+        if event_loop is not None:
+            with event_loop:
+                result = event_loop.run_forever()
+        else:
+            result = app.exec()
 
         print("\n✅ 程序正常退出")
         return result
@@ -0,0 +1,435 @@
+#!/usr/bin/env python3
+"""
+Surron BLE 无界面命令行工具 - 不导入PyQt
+
+用法:
+  python surron_cli.py scan [--timeout 5]
+  python surron_cli.py at <名称或地址> AT+LOGCOUNT AT+LOGSTATS [--window 4]
+  python surron_cli.py download <名称或地址>... [--format store|csv|jsonl] [--db surron_logs.db]
+  python surron_cli.py download --all          # 下载扫描到的所有Surron设备
+  python surron_cli.py fleet --all --concurrency 4   # 多台设备并发下载，实时显示进度
+  python surron_cli.py fleet --auto [--duration 3600]  # 持续扫描，自动调度下载进店的车辆
+  python surron_cli.py seed <名称或地址> --generate 2000 [--checkpoint seed.json]  # 批量写入测试日志
+  python surron_cli.py seed <名称或地址> --csv logs.csv   # 也可以是 --jsonl，格式同导出文件
+  python surron_cli.py macro <名称或地址> bench.macro [--var n=100]  # 执行宏脚本（语法见at_macro.py）
+  python surron_cli.py watch <名称或地址> [--max-interval 1]  # 监视新增日志，写入本地库并显示
+
+数据输出到标准输出（CSV/JSONL），进度和错误信息输出到标准错误。
+--simulate N 使用N台模拟设备代替蓝牙，用于无设备调试。
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+import ble_session
+from at_macro import MacroAbort, MacroError, MacroRunner, format_statistics, parse_macro
+from at_pipeline import DEFAULT_WINDOW as PIPELINE_WINDOW
+from ble_session import ATSession, ATSessionError, resolve_target, scan, watch_adverts
+from device_registry import DeviceRegistry
+from fleet import FleetHarvester, DEFAULT_CONCURRENCY, format_progress
+from fleet_scheduler import HarvestScheduler
+from fleet_scheduler import DEFAULT_WINDOW as HARVEST_WINDOW
+from log_seeder import BulkInserter, Checkpoint, generate, read_csv, read_jsonl
+from log_seeder import DEFAULT_WINDOW as SEED_WINDOW
+from log_store import LogStore, DEFAULT_DB_PATH
+from log_watcher import MAX_INTERVAL, MIN_INTERVAL, watch
+
+CSV_FIELDS = ["device", "name", "timestamp", "time", "code", "checksum"]
+
+
+def info(message):
+    """进度信息输出到标准错误，不影响数据输出"""
+    print(message, file=sys.stderr, flush=True)
+
+
+def use_simulated_devices(count):
+    """用模拟设备代替bleak"""
+    import simulated_device
+
+    for i in range(1, count + 1):
+        simulated_device.register_device(simulated_device.SimulatedLogDevice(
+            name=f"Surron-SIM{i:02d}", address=f"SIM:00:00:00:00:{i:02X}",
+            entries=200 * i, rssi=-50 - 5 * i, seed=i))
+    ble_session.BleakClient = simulated_device.SimulatedClient
+    ble_session.BleakScanner = simulated_device.SimulatedScanner
+
+
+class RecordWriter:
+    """把下载的记录写入本地库或以CSV/JSONL写到标准输出"""
+
+    def __init__(self, fmt, db_path, verbose=True):
+        self.fmt = fmt
+        self.verbose = verbose
+        self.store = LogStore(db_path) if fmt == "store" else None
+        self._csv = None
+        if fmt == "csv":
+            self._csv = csv.writer(sys.stdout)
+            self._csv.writerow(CSV_FIELDS)
+
+    def write(self, address, name, records, device_count=None):
+        if self.store is not None:
+            inserted = self.store.add_records(address, name, records, device_count)
+            if self.verbose:
+                info(f"💾 {name}: 新增 {inserted} 条，本地共 {self.store.count(address)} 条")
+            return
+        for r in records:
+            row = [address, name, r.timestamp, datetime.fromtimestamp(r.timestamp).isoformat(),
+                   r.code, r.checksum]
+            if self._csv is not None:
+                self._csv.writerow(row)
+            else:
+                sys.stdout.write(json.dumps(dict(zip(CSV_FIELDS, row)), ensure_ascii=False) + "\n")
+        sys.stdout.flush()
+
+    def close(self):
+        if self.store is not None:
+            self.store.close()
+
+
+async def cmd_scan(args):
+    devices = await scan(args.timeout, surron_only=not args.all_devices)
+    for address, (name, rssi) in sorted(devices.items(), key=lambda item: -item[1][1]):
+        print(f"{address}\t{rssi}\t{name}")
+    info(f"共发现 {len(devices)} 台设备")
+    return 0
+
+
+async def _targets(args):
+    """命令行目标 -> [(地址, 名称)]"""
+    if getattr(args, "all", False):
+        devices = await scan(args.timeout)
+        return [(address, name) for address, (name, _) in devices.items()]
+    targets = []
+    for target in args.targets:
+        targets.append(await resolve_target(target, args.timeout))
+    return targets
+
+
+async def cmd_at(args):
+    address, name = await resolve_target(args.target, args.timeout)
+    info(f"🔗 正在连接 {name} ({address})...")
+    async with ATSession(address, name) as session:
+        responses = await session.pipeline(args.commands, window=args.window)
+        for command, lines in zip(args.commands, responses):
+            if args.format == "jsonl":
+                for line in lines:
+                    print(json.dumps({"device": address, "command": command, "line": line},
+                                     ensure_ascii=False))
+            else:
+                print(f"→ {command}")
+                for line in lines:
+                    print(line)
+    return 0
+
+
+async def cmd_download(args):
+    targets = await _targets(args)
+    if not targets:
+        info("未找到可下载的设备")
+        return 1
+
+    writer = RecordWriter(args.format, args.db)
+    failed = 0
+    try:
+        for address, name in targets:
+            info(f"🔗 正在连接 {name} ({address})...")
+            try:
+                async with ATSession(address, name) as session:
+                    records = await session.download()
+                info(f"📥 {name}: 读取 {len(records)} 条")
+                writer.write(address, name, records)
+            except (ATSessionError, asyncio.TimeoutError, OSError) as e:
+                failed += 1
+                info(f"❌ {name}: {e or type(e).__name__}")
+    finally:
+        writer.close()
+    return 1 if failed else 0
+
+
+async def _show_progress(harvester, interval):
+    """终端中原地刷新进度表，非终端时只在结束时输出一次"""
+    tty = sys.stderr.isatty()
+    height = 0
+
+    def draw():
+        text = format_progress(harvester)
+        if height:
+            sys.stderr.write(f"\x1b[{height}F\x1b[J")
+        sys.stderr.write(text + "\n")
+        sys.stderr.flush()
+        return text.count("\n") + 1
+
+    try:
+        while True:
+            if tty:
+                height = draw()
+            await asyncio.sleep(interval)
+    finally:
+        draw()
+
+
+def _load_sync_stats(db_path):
+    """从本地库读取各设备的同步信息，库不存在时为空"""
+    if not os.path.exists(db_path):
+        return {}
+    with LogStore(db_path) as store:
+        return store.sync_stats()
+
+
+async def _run_scheduled(harvester, args):
+    """持续扫描并按调度器选择的顺序下载"""
+    registry = DeviceRegistry()
+    scheduler = HarvestScheduler(registry, _load_sync_stats(args.db), window=args.window)
+    watcher = asyncio.ensure_future(watch_adverts(registry))
+    try:
+        await harvester.run(scheduler, args.duration)
+    finally:
+        watcher.cancel()
+        await asyncio.gather(watcher, return_exceptions=True)
+
+
+async def cmd_fleet(args):
+    targets = [] if args.auto else await _targets(args)
+    if not targets and not args.auto:
+        info("未找到可下载的设备")
+        return 1
+
+    writer = RecordWriter(args.format, args.db, verbose=False)
+    harvester = FleetHarvester(args.concurrency, on_result=writer.write)
+    display = asyncio.ensure_future(_show_progress(harvester, args.interval))
+    try:
+        if args.auto:
+            await _run_scheduled(harvester, args)
+        else:
+            await harvester.harvest(targets)
+    finally:
+        display.cancel()
+        await asyncio.gather(display, return_exceptions=True)
+        writer.close()
+    _, failed, _, _, _ = harvester.aggregate()
+    return 1 if failed else 0
+
+
+def _seed_entries(args):
+    """--csv/--jsonl/--generate -> (记录列表, 来源描述)，来源描述用于核对检查点"""
+    if args.csv:
+        return read_csv(args.csv), f"csv:{os.path.abspath(args.csv)}"
+    if args.jsonl:
+        return read_jsonl(args.jsonl), f"jsonl:{os.path.abspath(args.jsonl)}"
+    start_time = args.start_time
+    prefix = f"generate:count={args.generate},seed={args.seed},interval={args.interval:g},start="
+    if start_time is None and args.checkpoint and os.path.exists(args.checkpoint):
+        # 未指定起始时间时沿用检查点中的，保证生成同样的数据
+        with open(args.checkpoint, encoding="utf-8") as f:
+            source = json.load(f).get("source", "")
+        if source.startswith(prefix):
+            start_time = int(source[len(prefix):])
+    if start_time is None:
+        start_time = int(time.time() - args.generate * args.interval)
+    entries = generate(args.generate, start_time, args.interval, seed=args.seed)
+    return entries, f"{prefix}{start_time}"
+
+
+async def cmd_seed(args):
+    try:
+        entries, source = _seed_entries(args)
+    except (OSError, ValueError, KeyError) as e:
+        info(f"❌ 读取数据失败: {e}")
+        return 1
+    checkpoint = Checkpoint(args.checkpoint, source, len(entries))
+    try:
+        checkpoint.load()
+    except ValueError as e:
+        info(f"❌ {e}")
+        return 1
+
+    address, name = await resolve_target(args.target, args.timeout)
+    if checkpoint.done:
+        info(f"↩️ 从检查点继续: 已完成 {checkpoint.done}/{len(entries)}")
+    info(f"🔗 正在写入 {name} ({address}): {len(entries) - checkpoint.done} 条, 在途 {args.window}")
+    tty = sys.stderr.isatty()
+
+    def show(inserter):
+        line = (f"已写入 {inserter.done}/{len(entries)} ({inserter.done * 100 // max(1, len(entries))}%),"
+                f" {inserter.inserts_per_second:,.0f} 条/秒, 拒绝 {checkpoint.rejected},"
+                f" 重连 {inserter.reconnects}")
+        if tty:
+            sys.stderr.write(f"\r\x1b[K{line}")
+            sys.stderr.flush()
+
+    inserter = BulkInserter(address, name, entries, checkpoint, window=args.window,
+                            retries=args.retries, on_progress=show)
+    try:
+        rejected = await inserter.run()
+    finally:
+        if tty:
+            sys.stderr.write("\n")
+    info(f"✅ {name}: 本次写入 {inserter.inserted} 条, {inserter.inserts_per_second:,.0f} 条/秒, "
+         f"拒绝 {rejected} 条, 重连 {inserter.reconnects} 次")
+    for index, line in inserter.errors[:10]:
+        info(f"  第 {index + 1} 条: {line}")
+    return 1 if rejected else 0
+
+
+async def cmd_macro(args):
+    try:
+        with open(args.file, encoding="utf-8") as f:
+            steps = parse_macro(f.read())
+    except (OSError, MacroError) as e:
+        info(f"❌ 读取宏失败: {e}")
+        return 1
+    variables = {}
+    for item in args.var:
+        name, _, value = item.partition("=")
+        variables[name.strip()] = value.strip()
+
+    address, name = await resolve_target(args.target, args.timeout)
+    info(f"🔗 正在连接 {name} ({address})...")
+    runner = MacroRunner(None, on_print=info, variables=variables)
+    status = 0
+    async with ATSession(address, name, on_line=runner.feed) as session:
+        async def execute(command):
+            lines = await session.command(command)
+            print(f"→ {command}")
+            for line in lines:
+                print(line)
+            return lines
+
+        runner.execute = execute
+        try:
+            await runner.run(steps)
+        except MacroAbort as e:
+            info(f"❌ 宏中止: {e}")
+            status = 1
+    info(f"{'✅' if status == 0 else '⚠️'} 执行 {runner.commands} 条命令, 用时 {runner.elapsed:.2f} 秒")
+    for line in format_statistics(runner.stats):
+        info(f"  {line}")
+    return status
+
+
+async def cmd_watch(args):
+    address, name = await resolve_target(args.target, args.timeout)
+    writer = RecordWriter(args.format, args.db, verbose=False)
+    info(f"👀 正在监视 {name} ({address})，按 Ctrl+C 停止")
+
+    def on_records(records, count):
+        for r in records:
+            info(f"🆕 {datetime.fromtimestamp(r.timestamp):%Y-%m-%d %H:%M:%S}  {r.code}  "
+                 f"(设备共 {count} 条)")
+        writer.write(address, name, records, count)
+
+    try:
+        watcher = await watch(address, name, on_records, duration=args.duration,
+                              retries=args.retries,
+                              on_reconnect=lambda e: info(f"⚠️ 连接中断（{e}），正在重连..."),
+                              min_interval=args.min_interval, max_interval=args.max_interval)
+    finally:
+        writer.close()
+    if watcher is not None:
+        info(f"✅ 新增 {watcher.received} 条, 轮询 {watcher.polls} 次, 读取 {watcher.fetches} 次")
+    return 0
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Surron BLE 无界面命令行工具")
+    parser.add_argument("--timeout", type=float, default=5.0, help="扫描时间（秒）")
+    parser.add_argument("--simulate", type=int, default=0, metavar="N",
+                        help="使用N台模拟设备代替蓝牙")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("scan", help="扫描Surron设备")
+    p.add_argument("--all-devices", action="store_true", help="显示所有BLE设备")
+
+    p = sub.add_parser("at", help="连接设备并依次执行AT命令")
+    p.add_argument("target", help="设备名称或地址")
+    p.add_argument("commands", nargs="+", help="AT命令")
+    p.add_argument("--format", choices=["text", "jsonl"], default="text")
+    p.add_argument("--window", type=int, default=PIPELINE_WINDOW,
+                   help="同时在途的只读命令数（1为逐条执行）")
+
+    p = sub.add_parser("download", help="下载设备中的全部日志")
+    p.add_argument("targets", nargs="*", help="设备名称或地址")
+    p.add_argument("--all", action="store_true", help="下载扫描到的所有Surron设备")
+    p.add_argument("--format", choices=["store", "csv", "jsonl"], default="store",
+                   help="写入本地库（默认）或以CSV/JSONL输出到标准输出")
+    p.add_argument("--db", default=DEFAULT_DB_PATH, help="本地库文件")
+
+    p = sub.add_parser("fleet", help="多台设备并发下载")
+    p.add_argument("targets", nargs="*", help="设备名称或地址")
+    p.add_argument("--all", action="store_true", help="下载扫描到的所有Surron设备")
+    p.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                   help="同时连接的设备数（按适配器能力设置）")
+    p.add_argument("--interval", type=float, default=0.5, help="进度刷新间隔（秒）")
+    p.add_argument("--auto", action="store_true",
+                   help="持续扫描，按信号强度、上次同步时间和估计未同步条数自动选择设备")
+    p.add_argument("--duration", type=float, default=None, help="--auto 运行时长（秒），默认一直运行")
+    p.add_argument("--window", type=float, default=HARVEST_WINDOW,
+                   help="同一设备两次下载的最小间隔（秒）")
+    p.add_argument("--format", choices=["store", "csv", "jsonl"], default="store",
+                   help="写入本地库（默认）或以CSV/JSONL输出到标准输出")
+    p.add_argument("--db", default=DEFAULT_DB_PATH, help="本地库文件")
+
+    p = sub.add_parser("seed", help="批量写入测试日志（AT+LOGINSERT）")
+    p.add_argument("target", help="设备名称或地址")
+    source = p.add_mutually_exclusive_group(required=True)
+    source.add_argument("--csv", help="CSV文件（code列和timestamp或time列）")
+    source.add_argument("--jsonl", help="JSONL文件（每行含code和timestamp或time）")
+    source.add_argument("--generate", type=int, metavar="N", help="按分布生成N条日志")
+    p.add_argument("--seed", type=int, default=0, help="--generate 的随机种子")
+    p.add_argument("--start-time", type=int, default=None,
+                   help="--generate 的起始时间戳，默认使最后一条接近当前时间")
+    p.add_argument("--interval", type=float, default=30.0, help="--generate 的平均间隔（秒）")
+    p.add_argument("--window", type=int, default=SEED_WINDOW, help="同时在途的写入条数")
+    p.add_argument("--checkpoint", default=None, help="检查点文件，存在时从中继续")
+    p.add_argument("--retries", type=int, default=5, help="连接中断后的最多重连次数")
+
+    p = sub.add_parser("macro", help="执行AT命令宏脚本")
+    p.add_argument("target", help="设备名称或地址")
+    p.add_argument("file", help="宏脚本文件")
+    p.add_argument("--var", action="append", default=[], metavar="名称=值",
+                   help="预先设置的变量（可重复）")
+
+    p = sub.add_parser("watch", help="监视设备新增的日志")
+    p.add_argument("target", help="设备名称或地址")
+    p.add_argument("--min-interval", type=float, default=MIN_INTERVAL,
+                   help="有新记录后的轮询间隔（秒）")
+    p.add_argument("--max-interval", type=float, default=MAX_INTERVAL,
+                   help="无变化时逐步放大到的最长轮询间隔（秒），即新记录的最长延迟")
+    p.add_argument("--duration", type=float, default=None, help="监视时长（秒），默认一直运行")
+    p.add_argument("--retries", type=int, default=5, help="连接中断后的最多连续重连次数")
+    p.add_argument("--format", choices=["store", "csv", "jsonl"], default="store",
+                   help="写入本地库（默认）或以CSV/JSONL输出到标准输出")
+    p.add_argument("--db", default=DEFAULT_DB_PATH, help="本地库文件")
+
+    args = parser.parse_args(argv)
+    if (args.command in ("download", "fleet") and not args.targets and not args.all
+            and not getattr(args, "auto", False)):
+        parser.error(f"{args.command} 需要指定设备或 --all")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    if args.simulate:
+        use_simulated_devices(args.simulate)
+
+    handler = {"scan": cmd_scan, "at": cmd_at, "download": cmd_download,
+               "fleet": cmd_fleet, "seed": cmd_seed, "macro": cmd_macro,
+               "watch": cmd_watch}[args.command]
+    try:
+        return asyncio.run(handler(args))
+    except ATSessionError as e:
+        info(f"❌ {e}")
+        return 1
+    except KeyboardInterrupt:
+        return 130
+
+
+if __name__ == "__main__":
+    sys.exit(main())
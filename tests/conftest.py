@@ -0,0 +1,29 @@
+import os
+import sys
+
+import pytest
+
+# 模块都在仓库根目录
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def simulated_bike(monkeypatch):
+    """注册模拟设备并让ble_session改用模拟的bleak，返回创建设备的函数"""
+    import ble_session
+    import simulated_device
+
+    monkeypatch.setattr(ble_session, "BleakClient", simulated_device.SimulatedClient)
+    monkeypatch.setattr(ble_session, "BleakScanner", simulated_device.SimulatedScanner)
+    monkeypatch.setattr(simulated_device, "DEVICES", {})
+
+    def create(entries=0, **kwargs):
+        index = len(simulated_device.DEVICES) + 1
+        kwargs.setdefault("name", f"Surron-TEST{index:02d}")
+        kwargs.setdefault("address", f"SIM:TE:ST:00:00:{index:02X}")
+        kwargs.setdefault("command_latency", 0.0)
+        kwargs.setdefault("seed", index)
+        device = simulated_device.SimulatedLogDevice(entries=entries, **kwargs)
+        return simulated_device.register_device(device)
+
+    return create
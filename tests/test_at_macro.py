@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+
+from at_macro import (MacroAbort, MacroError, MacroRunner, count_commands, parse_macro,
+                      single_command, step_statistics)
+
+
+def run_macro(text, responses, variables=None, lines_after=None):
+    """用固定的响应执行宏，返回 (发出的命令, 输出的文本, runner)"""
+    sent, printed = [], []
+
+    async def execute(command):
+        sent.append(command)
+        for line in (lines_after or {}).get(command, []):
+            asyncio.get_running_loop().call_later(0.01, runner.feed, line)
+        return list(responses.get(command.partition('=')[0], ["+LOGOK: done"]))
+
+    runner = MacroRunner(execute, on_print=printed.append, variables=variables)
+    asyncio.run(runner.run(parse_macro(text)))
+    return sent, printed, runner
+
+
+def test_parse_nested_blocks():
+    steps = parse_macro("# 注释\nset n = 2\nfor i in 1..${n}\n  repeat 2\n    AT+LOGCOUNT\n"
+                        "  end\nend\nat+logstats\n")
+    assert [s.kind for s in steps] == ["set", "for", "command"]
+    assert steps[1].body[0].kind == "repeat" and steps[1].body[0].body[0].args == "AT+LOGCOUNT"
+    assert count_commands(steps) == 2
+
+
+@pytest.mark.parametrize("text, line", [
+    ("end", 1), ("for i\nend", 1), ("repeat 2\nAT+LOGCOUNT", 1), ("set x", 1),
+    ("AT+LOGCOUNT\nexpect (", 2), ("onerror maybe", 1), ("jump 3", 1), ("wait", 1),
+])
+def test_syntax_errors_report_line(text, line):
+    with pytest.raises(MacroError) as error:
+        parse_macro(text)
+    assert error.value.line == line
+
+
+def test_loops_and_variables():
+    text = ("set base = 10 * 2\nfor i in 1..5 step 2\n  set n = ${base} + ${i}\n"
+            "  AT+LOGLATEST=${n}\nend\n"
+            "for c in 3,2\n  AT+LOGRANGE=${c},${c}\nend\nrepeat 2\n  AT+LOGCOUNT\nend\n"
+            "set name = Surron-X\nprint ${name} ok")
+    sent, printed, runner = run_macro(text, {})
+    assert sent == ["AT+LOGLATEST=21", "AT+LOGLATEST=23", "AT+LOGLATEST=25",
+                    "AT+LOGRANGE=3,3", "AT+LOGRANGE=2,2", "AT+LOGCOUNT", "AT+LOGCOUNT"]
+    assert printed == ["Surron-X ok"]
+    assert runner.commands == 7
+    stats = {line: (count, text) for line, text, count, *_ in step_statistics(runner.stats)}
+    assert stats[4] == (3, "AT+LOGLATEST=${n}")
+
+
+def test_expect_captures_named_groups():
+    _, printed, _ = run_macro("AT+LOGCOUNT\nexpect ^(?P<total>\\d+)$\nprint 共 ${total} 条",
+                              {"AT+LOGCOUNT": ["42"]})
+    assert printed == ["共 42 条"]
+
+
+def test_expect_mismatch_aborts():
+    with pytest.raises(MacroAbort, match="响应中没有匹配的行"):
+        run_macro("AT+LOGCOUNT\nexpect ^OK$\nAT+LOGSTATS", {"AT+LOGCOUNT": ["42"]})
+
+
+def test_error_response_aborts_unless_onerror_continue():
+    responses = {"AT+LOGCLEAR": ["+LOGERROR: busy"]}
+    with pytest.raises(MacroAbort, match="busy"):
+        run_macro("AT+LOGCLEAR\nAT+LOGCOUNT", responses)
+    sent, _, _ = run_macro("onerror continue\nAT+LOGCLEAR\nonerror abort\nAT+LOGCOUNT", responses)
+    assert sent == ["AT+LOGCLEAR", "AT+LOGCOUNT"]
+    with pytest.raises(MacroAbort):
+        run_macro("onerror continue\nAT+LOGCLEAR\nonerror abort\nAT+LOGCLEAR", responses)
+
+
+def test_wait_sees_lines_after_command_and_times_out():
+    sent, printed, _ = run_macro("AT+LOGCHECK\nwait ready (?P<n>\\d+) timeout 1\nprint ${n}", {},
+                                 lines_after={"AT+LOGCHECK": ["noise", "ready 7"]})
+    assert printed == ["7"]
+    with pytest.raises(MacroAbort, match="秒内没有匹配的行"):
+        run_macro("AT+LOGCHECK\nwait never timeout 0.05", {})
+
+
+def test_abort_and_undefined_variable():
+    with pytest.raises(MacroAbort, match="停止 3"):
+        run_macro("set x = 3\nabort 停止 ${x}", {})
+    with pytest.raises(MacroAbort, match="未定义的变量 y"):
+        run_macro("AT+LOGLATEST=${y}", {})
+
+
+def test_single_command():
+    assert single_command("  AT+LOGLATEST=5 \n") == "AT+LOGLATEST=5"
+    assert single_command("# 清除\nAT+LOGCLEAR") == "AT+LOGCLEAR"
+    assert single_command("AT+LOGCLEAR\nexpect \\+LOGOK") is None
+    assert single_command("AT+LOGCOUNT\nAT+LOGSTATS") is None
+    assert single_command("AT+LOGLATEST=${n}") is None
+    assert single_command("for i\nAT+LOGCOUNT") is None
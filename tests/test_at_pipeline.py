@@ -0,0 +1,97 @@
+import asyncio
+
+from at_pipeline import CommandPipeline
+from at_protocol import CommandProgress, classify_line, is_pipelinable
+from ble_session import ATSession
+
+
+def progress(command):
+    return CommandProgress(command)
+
+
+def test_read_only_commands_fill_the_window():
+    pipeline = CommandPipeline(window=2)
+    first, second, third = (progress(c) for c in ("AT+LOGCOUNT", "AT+LOGLATEST=5", "AT+LOGCOUNT"))
+
+    async def send():
+        await pipeline.acquire([first])
+        await pipeline.acquire([second])
+        assert not pipeline.can_send([third])
+        waiter = asyncio.ensure_future(pipeline.acquire([third]))
+        await asyncio.sleep(0)
+        assert not waiter.done() and pipeline.waiting == 1
+        pipeline.feed(classify_line("42"))  # 结束最早的AT+LOGCOUNT
+        await waiter
+        return list(pipeline.outstanding)
+
+    assert asyncio.run(send()) == [second, third]
+    assert first.done and not second.done
+
+
+def test_blocking_commands_run_alone():
+    pipeline = CommandPipeline(window=4)
+    read, clear = progress("AT+LOGCOUNT"), progress("AT+LOGCLEAR")
+
+    async def send():
+        await pipeline.acquire([read])
+        assert not pipeline.can_send([clear])
+        pipeline.feed(classify_line("3"))
+        await pipeline.acquire([clear])
+        assert not pipeline.can_send([progress("AT+LOGCOUNT")])
+        pipeline.feed(classify_line("+LOGOK: All logs cleared"))
+        assert pipeline.can_send([progress("AT+LOGCOUNT")])
+
+    asyncio.run(send())
+
+
+def test_appends_overlap_only_with_pipelined_writes():
+    inserts = [progress(f"AT+LOGINSERTNOW=10AA0000000{i}") for i in range(3)]
+    assert not is_pipelinable(inserts[0].command)
+    pipeline = CommandPipeline(window=4)
+    appends = CommandPipeline(window=4, pipelined_writes=True)
+
+    async def send():
+        await pipeline.acquire([inserts[0]])
+        for insert in inserts:
+            await appends.acquire([insert])
+
+    asyncio.run(send())
+    assert not pipeline.can_send([inserts[1]])
+    assert len(appends) == 3
+
+
+def test_script_waits_for_empty_pipeline():
+    pipeline = CommandPipeline(window=4)
+    script = [progress("AT+LOGCOUNT"), progress("AT+LOGCOUNT")]
+    asyncio.run(pipeline.acquire([progress("AT+LOGCOUNT")]))
+    assert not pipeline.can_send(script)
+    pipeline.feed(classify_line("1"))
+    assert pipeline.can_send(script)
+
+
+def test_status_and_stats_are_not_pipelined():
+    for command in ("AT+LOGSTATUS", "AT+LOGSTATS", "AT+LOGHELP"):
+        assert not is_pipelinable(command)
+        assert progress(command).ends_on_idle
+    assert is_pipelinable("AT+LOGRANGE=1,10") and is_pipelinable("AT+LOGCOUNT")
+
+
+def test_status_without_known_last_line_falls_back_to_idle(simulated_bike):
+    bike = simulated_bike(entries=4)
+    handle = bike.handle
+
+    def handle_without_total(command):
+        lines = handle(command)
+        return [line for line in lines if not line.startswith("Total entries:")]
+
+    bike.handle = handle_without_total
+
+    async def pipeline():
+        async with ATSession(bike.address) as session:
+            commands = ["AT+LOGCOUNT", "AT+LOGSTATUS", "AT+LOGLATEST=2", "AT+LOGCOUNT"]
+            return await session.pipeline(commands, window=4, idle_timeout=0.1)
+
+    count, status, latest, count_again = asyncio.run(pipeline())
+    assert count == count_again == ["4"]
+    assert status == ["+LOGOK: Flash log system: INITIALIZED"]
+    assert latest[0].startswith("+LOGOK: Reading latest 2") and len(latest) == 4
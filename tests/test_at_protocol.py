@@ -0,0 +1,38 @@
+from at_protocol import LineAssembler
+
+
+def test_lone_cr_completes_line_immediately():
+    assembler = LineAssembler()
+    assert assembler.feed(b"+LOGCOUNT: 42\r") == ["+LOGCOUNT: 42"]
+    assert not assembler.pending
+
+
+def test_line_terminators_are_equivalent():
+    for terminator in (b"\r", b"\n", b"\r\n"):
+        assembler = LineAssembler()
+        assert assembler.feed(b"OK" + terminator + b"ERR" + terminator + b"+X") == ["OK", "ERR"]
+        assert assembler.flush() == ["+X"]
+
+
+def test_crlf_split_across_notifications():
+    assembler = LineAssembler()
+    assert assembler.feed(b"+LOGDATA: 1,2\r") == ["+LOGDATA: 1,2"]
+    assert assembler.feed(b"\nOK\r") == ["OK"]
+    assert assembler.feed(b"\n") == []
+    assert not assembler.pending
+
+
+def test_multibyte_character_split_across_notifications():
+    data = "设备已连接\r\n".encode("utf-8")
+    assembler = LineAssembler()
+    assert assembler.feed(data[:4]) == []
+    assert assembler.feed(data[4:]) == ["设备已连接"]
+
+
+def test_only_cr_and_lf_end_lines():
+    # splitlines会在这些字符处分行，它们出现在一行中间时必须保留
+    text = "A\x0bB\x0cC\x1cD\x1dE\x1eF\x85G\u2028H\u2029I"
+    assembler = LineAssembler()
+    assert assembler.feed((text + "\r\n").encode("utf-8")) == [text]
+    assert assembler.feed(("+X " + text).encode("utf-8")) == []
+    assert assembler.flush() == ["+X " + text]
@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+
+from ble_session import ATSession, ATSessionError, resolve_target
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_download_returns_every_record(simulated_bike):
+    bike = simulated_bike(entries=25)
+
+    async def download():
+        async with ATSession(bike.address, bike.name) as session:
+            return await session.download()
+
+    records = run(download())
+    assert [(r.timestamp, r.code) for r in records] == [(ts, code) for _, ts, code in bike.entries]
+    assert [r.index for r in records] == list(range(1, 26))
+
+
+def test_command_with_and_without_end_marker(simulated_bike):
+    bike = simulated_bike(entries=3)
+
+    async def commands():
+        async with ATSession(bike.address) as session:
+            count = await session.command("AT+LOGCOUNT")
+            status = await session.command("AT+LOGSTATUS", idle_timeout=0.05)
+            error = await session.command("AT+LOGBOGUS")
+            return count, status, error
+
+    count, status, error = run(commands())
+    assert count == ["3"]
+    assert status == ["+LOGOK: Flash log system: INITIALIZED", "Total entries: 3"]
+    assert error[0].startswith("+LOGERROR:")
+
+
+def test_download_raises_on_error_line(simulated_bike):
+    bike = simulated_bike(entries=1)
+
+    async def download():
+        async with ATSession(bike.address) as session:
+            return await session.download("AT+LOGRANGE=x")
+
+    with pytest.raises(ATSessionError):
+        run(download())
+
+
+def test_link_loss_fails_pending_command(simulated_bike):
+    bike = simulated_bike(entries=3000, notify_interval=0.001)
+
+    async def lose_link():
+        async with ATSession(bike.address) as session:
+            loop = asyncio.get_running_loop()
+            loop.call_later(0.05, session.client.simulate_link_loss)
+            await session.command("AT+LOGREADALL")
+
+    with pytest.raises(ATSessionError, match="断开"):
+        run(lose_link())
+
+
+def test_resolve_target_by_name_is_case_insensitive(simulated_bike):
+    bike = simulated_bike(name="Surron-Blue")
+    assert run(resolve_target("surron-blue", timeout=0.15)) == (bike.address, "Surron-Blue")
+    with pytest.raises(ATSessionError):
+        run(resolve_target("Surron-Red", timeout=0.15))
@@ -0,0 +1,13 @@
+from at_pipeline import DEFAULT_WINDOW as PIPELINE_WINDOW
+from fleet_scheduler import DEFAULT_WINDOW as HARVEST_WINDOW
+from surron_cli import parse_args
+
+
+def test_at_window_defaults_to_pipeline_window():
+    args = parse_args(["at", "x", "AT+LOGCOUNT"])
+    assert args.window == PIPELINE_WINDOW == 4
+
+
+def test_fleet_window_defaults_to_harvest_interval():
+    args = parse_args(["fleet", "--all"])
+    assert args.window == HARVEST_WINDOW
@@ -0,0 +1,53 @@
+import asyncio
+
+import ble_session
+from fleet import STATE_DONE, STATE_FAILED, FleetHarvester, format_progress
+
+
+def collect(results):
+    def on_result(address, name, records):
+        results[address] = records
+    return on_result
+
+
+def test_harvest_downloads_every_bike_within_concurrency(simulated_bike, monkeypatch):
+    bikes = [simulated_bike(entries=40 * i, notify_interval=0.0005) for i in range(1, 5)]
+    active = []
+    peak = []
+    download = ble_session.ATSession.download
+
+    async def counting_download(session, *args):
+        active.append(session)
+        peak.append(len(active))
+        try:
+            return await download(session, *args)
+        finally:
+            active.remove(session)
+
+    monkeypatch.setattr(ble_session.ATSession, "download", counting_download)
+    results = {}
+    harvester = FleetHarvester(concurrency=2, on_result=collect(results))
+    progress = asyncio.run(harvester.harvest([(b.address, b.name) for b in bikes]))
+
+    assert max(peak) == 2
+    assert all(p.state == STATE_DONE for p in progress.values())
+    for bike in bikes:
+        assert [r.timestamp for r in results[bike.address]] == [ts for _, ts, _ in bike.entries]
+        assert progress[bike.address].received == len(bike.entries)
+    done, failed, received, total, _ = harvester.aggregate()
+    assert (done, failed, received, total) == (4, 0, 400, 400)
+    assert "4/4 台完成" in format_progress(harvester)
+
+
+def test_failed_bike_does_not_stop_the_others(simulated_bike):
+    good = simulated_bike(entries=10)
+    bad = simulated_bike(entries=10)
+    bad.handle = lambda command: ["+LOGERROR: Flash read failed"]
+    results = {}
+    harvester = FleetHarvester(on_result=collect(results))
+    progress = asyncio.run(harvester.harvest([(good.address, good.name), (bad.address, bad.name)]))
+
+    assert progress[good.address].state == STATE_DONE
+    assert progress[bad.address].state == STATE_FAILED
+    assert "Flash read failed" in progress[bad.address].error
+    assert list(results) == [good.address]
@@ -0,0 +1,75 @@
+import pytest
+
+from at_protocol import LOG_CAPACITY
+from device_registry import RSSI_SMOOTHING, DeviceRegistry
+from fleet_scheduler import HarvestScheduler
+
+NOW = 1_000_000.0
+
+
+@pytest.fixture
+def registry():
+    registry = DeviceRegistry()
+    registry.seen("A", "Surron-A", -50, now=NOW)
+    registry.seen("B", "Surron-B", -90, now=NOW)
+    registry.seen("C", "Phone", -40, now=NOW)
+    return registry
+
+
+def test_registry_smooths_rssi_and_expires():
+    registry = DeviceRegistry()
+    registry.seen("A", "Surron-A", -80, now=0.0)
+    sighting = registry.seen("A", "Surron-A2", -60, now=5.0)
+    assert sighting.rssi_avg == pytest.approx(-80 + RSSI_SMOOTHING * 20)
+    assert (sighting.name, sighting.adverts) == ("Surron-A2", 2)
+    assert (sighting.first_seen, sighting.last_seen) == (0.0, 5.0)
+    registry.seen("B", "Surron-B", -70, now=20.0)
+    assert [s.address for s in registry.recent(10.0, now=21.0)] == ["B"]
+    assert [s.address for s in registry.expire(10.0, now=21.0)] == ["A"]
+    assert "A" not in registry and len(registry) == 1
+
+
+def test_stronger_signal_wins_when_nothing_synced(registry):
+    scheduler = HarvestScheduler(registry)
+    ranked = scheduler.candidates(now=NOW)
+    assert [s.address for _, s in ranked] == ["A", "B"]  # 非Surron设备不参与
+    assert scheduler.next(now=NOW).address == "A"
+    assert scheduler.next(now=NOW).address == "B"  # A已在下载中
+    assert scheduler.next(now=NOW) is None
+
+
+def test_long_unsynced_bike_outranks_strong_recent_one(registry):
+    stats = {"A": (NOW - 2000.0, 0.01), "B": (NOW - 20 * 3600.0, 0.05)}
+    scheduler = HarvestScheduler(registry, sync_stats=stats)
+    assert scheduler.unsynced_estimate("A", NOW) == pytest.approx(20.0)
+    assert scheduler.unsynced_estimate("B", NOW) == LOG_CAPACITY
+    assert [s.address for _, s in scheduler.candidates(now=NOW)] == ["B", "A"]
+
+
+def test_success_holds_bike_for_window(registry):
+    scheduler = HarvestScheduler(registry, window=600.0)
+    scheduler.next(now=NOW)
+    scheduler.finished("A", True, now=NOW)
+    registry.seen("A", "Surron-A", -50, now=NOW + 599.0)
+    assert "A" not in [s.address for _, s in scheduler.candidates(now=NOW + 599.0)]
+    registry.seen("A", "Surron-A", -50, now=NOW + 601.0)
+    assert "A" in [s.address for _, s in scheduler.candidates(now=NOW + 601.0)]
+
+
+def test_failures_back_off_exponentially_up_to_max(registry):
+    scheduler = HarvestScheduler(registry, backoff_base=10.0, backoff_max=35.0)
+    delays = []
+    for _ in range(4):
+        scheduler.finished("A", False, now=NOW)
+        delays.append(scheduler.retry_at["A"] - NOW)
+    assert delays == [10.0, 20.0, 35.0, 35.0]
+    registry.seen("A", "Surron-A", -50, now=NOW + 34.0)
+    assert "A" not in [s.address for _, s in scheduler.candidates(now=NOW + 34.0)]
+    assert "A" in [s.address for _, s in scheduler.candidates(now=NOW + 35.0)]
+    scheduler.finished("A", True, now=NOW + 40.0)
+    assert "A" not in scheduler.failures and "A" not in scheduler.retry_at
+
+
+def test_bike_gone_quiet_is_skipped(registry):
+    scheduler = HarvestScheduler(registry, advert_max_age=10.0)
+    assert scheduler.candidates(now=NOW + 11.0) == []
@@ -0,0 +1,74 @@
+import re
+
+import pytest
+
+import log_index
+from log_index import LogFilter, LogIndex
+
+LINES = [
+    ("开始扫描设备", "info"),
+    ("扫描完成，找到 2 个设备", "info"),
+    ("连接已断开", "warning"),
+    ("→ AT+LOGERROR=0A1B", "sent"),
+    ("← +LOGERROR: 0a1b2c3d4e5f,3", "received"),
+    ("← +LOGERROR: 0A1BFFFFFFFF,1", "received"),
+    ("← +LOGDATA: 3000,1,1732741965,30d13f2c3323,4138", "received"),
+    ("Data rate OK", "info"),
+    ("超时未响应", "error"),
+]
+
+
+@pytest.fixture
+def index():
+    index = LogIndex()
+    for i, (text, msg_type) in enumerate(LINES):
+        index.add(text, msg_type, timestamp=1000.0 + i)
+    return index
+
+
+def expected(index, log_filter):
+    return [i for i in range(len(index)) if index.matches(i, log_filter)]
+
+
+@pytest.mark.parametrize("text", ["扫描", "扫描设备", "描", "连接已断开", "已断", "完成，", "2 个", "超时未"])
+def test_cjk_text_uses_bigram_index(index, text):
+    log_filter = LogFilter(text=text)
+    want = [i for i, (line, _) in enumerate(LINES) if text in line]
+    assert want
+    assert index.query(log_filter) == want == expected(index, log_filter)
+
+
+@pytest.mark.parametrize("text", ["a", "A", "e", "at+", "LOG", "0a1b", "Data rate", "1,"])
+def test_short_and_common_text(index, text):
+    log_filter = LogFilter(text=text)
+    want = [i for i, (line, _) in enumerate(LINES) if text.lower() in line.lower()]
+    assert index.query(log_filter) == want == expected(index, log_filter)
+
+
+@pytest.mark.parametrize("prefix", ["0A", "0a1", " 0a1b ", "0A1B2C3D4E5F", "0A1B2C3D4E5F0", "0A1B2C3D4E5F00", "FF", "ZZ"])
+def test_error_prefix_query_agrees_with_matches(index, prefix):
+    log_filter = LogFilter(error_prefix=prefix)
+    assert index.query(log_filter) == expected(index, log_filter)
+
+
+def test_error_prefix_longer_than_code_matches_nothing(index):
+    assert index.query(LogFilter(error_prefix="0A1B2C3D4E5F00")) == []
+    assert index.query(LogFilter(error_prefix="0a1b2c3d4e5f")) == [4]
+
+
+@pytest.mark.parametrize("pattern", [r"logdata:\s+\d+", r"^←", r"OK$", r"\D\d", r"[A-F]{4}", r"断开$",
+                                     r"(?i)data", r"\bdata\b", r"0A1B\w*,3"])
+def test_regex_is_case_insensitive_per_line(index, pattern):
+    log_filter = LogFilter(text=pattern, regex=True)
+    want = [i for i, (line, _) in enumerate(LINES) if re.search(pattern, line, re.IGNORECASE)]
+    assert index.query(log_filter) == want == expected(index, log_filter)
+
+
+def test_regex_fast_path_scans_new_lines_in_chunks(index, monkeypatch):
+    monkeypatch.setattr(log_index, "REGEX_CHUNK_LINES", 2)
+    log_filter = LogFilter(text=r"^\S+ \+logerror", regex=True)
+    assert index.query(log_filter) == [4, 5]
+    index.add("← +LOGERROR: 123456789ABC,2", "received")
+    index.add("x +LOGERROR", "info")
+    assert index.query(log_filter) == [4, 5, 9, 10]
+    assert index.matches(10, log_filter)
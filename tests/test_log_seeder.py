@@ -0,0 +1,156 @@
+import asyncio
+import json
+
+import pytest
+
+import ble_session
+import log_seeder
+import simulated_device
+from ble_session import ATSessionError
+from log_seeder import BulkInserter, Checkpoint, generate, read_csv, read_jsonl
+
+SOURCE = "generate:test"
+
+
+@pytest.fixture(autouse=True)
+def no_reconnect_delay(monkeypatch):
+    monkeypatch.setattr(log_seeder, "RECONNECT_DELAY", 0.0)
+
+
+def seed(bike, entries, checkpoint, **kwargs):
+    inserter = BulkInserter(bike.address, bike.name, entries, checkpoint, **kwargs)
+    return inserter, asyncio.run(inserter.run())
+
+
+def keys(bike):
+    return [(code, ts) for _, ts, code in bike.entries]
+
+
+def test_read_csv_and_jsonl(tmp_path):
+    (tmp_path / "logs.csv").write_text("code,timestamp\n10aa00000001,100\n20BB00000002,160.0\n")
+    (tmp_path / "logs.jsonl").write_text('{"code": "10AA00000001", "timestamp": 100}\n\n')
+    assert read_csv(str(tmp_path / "logs.csv")) == [("10AA00000001", 100), ("20BB00000002", 160)]
+    assert read_jsonl(str(tmp_path / "logs.jsonl")) == [("10AA00000001", 100)]
+    (tmp_path / "bad.csv").write_text("code,timestamp\n10AA,100\n")
+    with pytest.raises(ValueError):
+        read_csv(str(tmp_path / "bad.csv"))
+
+
+def test_generate_is_reproducible_and_increasing():
+    entries = generate(50, start_time=1000, seed=7)
+    assert entries == generate(50, start_time=1000, seed=7)
+    timestamps = [ts for _, ts in entries]
+    assert timestamps == sorted(set(timestamps)) and timestamps[0] > 1000
+    assert all(code[:2] in log_seeder.DEFAULT_CATEGORIES and len(code) == 12 for code, _ in entries)
+
+
+def test_insert_all_and_save_checkpoint(simulated_bike, tmp_path):
+    bike = simulated_bike()
+    entries = generate(40, start_time=1_700_000_000, seed=1)
+    path = str(tmp_path / "seed.json")
+    inserter, rejected = seed(bike, entries, Checkpoint(path, SOURCE, len(entries)))
+    assert rejected == 0 and inserter.inserted == 40
+    assert keys(bike) == entries
+    with open(path, encoding="utf-8") as f:
+        assert json.load(f)["done"] == 40
+
+
+def test_resume_from_checkpoint_file(simulated_bike, tmp_path):
+    bike = simulated_bike()
+    entries = generate(30, start_time=1_700_000_000, seed=2)
+    path = str(tmp_path / "seed.json")
+    # 上次运行确认了10条，之后在途的3条也已生效，但未写入检查点
+    for code, ts in entries[:13]:
+        bike.insert(code, ts)
+    previous = Checkpoint(path, SOURCE, len(entries))
+    previous.done = 10
+    previous.save()
+
+    checkpoint = Checkpoint(path, SOURCE, len(entries))
+    checkpoint.load()
+    inserter, _ = seed(bike, entries, checkpoint)
+    assert keys(bike) == entries  # 没有重复写入
+    assert inserter.inserted == 20
+
+    with pytest.raises(ValueError):
+        Checkpoint(path, "other", len(entries)).load()
+
+
+def test_reconcile_does_not_depend_on_latest_order(simulated_bike):
+    bike = simulated_bike()
+    entries = generate(20, start_time=1_700_000_000, seed=3)
+    for code, ts in entries[:8]:
+        bike.insert(code, ts)
+    handle = bike.handle
+
+    def latest_reversed(command):
+        lines = handle(command)
+        if command.startswith("AT+LOGLATEST"):
+            lines = lines[:1] + lines[-2:0:-1] + lines[-1:]
+        return lines
+
+    bike.handle = latest_reversed
+    checkpoint = Checkpoint(None, SOURCE, len(entries))
+    checkpoint.done = 5
+    seed(bike, entries, checkpoint, window=8)
+    assert keys(bike) == entries
+
+
+def test_link_loss_mid_seed_resumes_without_duplicates(simulated_bike, monkeypatch):
+    clients = []
+
+    class TrackedClient(simulated_device.SimulatedClient):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            clients.append(self)
+
+    monkeypatch.setattr(ble_session, "BleakClient", TrackedClient)
+    bike = simulated_bike()
+    entries = generate(60, start_time=1_700_000_000, seed=4)
+    handle = bike.handle
+    inserts = []
+
+    def drop_link_once(command):
+        lines = handle(command)
+        if command.startswith("AT+LOGINSERT="):
+            inserts.append(command)
+            if len(inserts) == 25:
+                # 写入已生效，但确认还没送达时链路断开
+                asyncio.get_running_loop().call_soon(clients[-1].simulate_link_loss)
+                return []
+        return lines
+
+    bike.handle = drop_link_once
+    inserter, rejected = seed(bike, entries, Checkpoint(None, SOURCE, len(entries)))
+    assert inserter.reconnects == 1 and rejected == 0
+    assert keys(bike) == entries
+
+
+def test_plain_logok_without_echo_is_accepted(simulated_bike):
+    bike = simulated_bike()
+    handle = bike.handle
+
+    def without_echo(command):
+        lines = handle(command)
+        return ["+LOGOK: Log inserted"] if command.startswith("AT+LOGINSERT=") else lines
+
+    bike.handle = without_echo
+    entries = generate(5, start_time=1_700_000_000, seed=5)
+    inserter, rejected = seed(bike, entries, Checkpoint(None, SOURCE, len(entries)), retries=0)
+    assert (inserter.inserted, rejected) == (5, 0)
+
+
+def test_wrong_echo_and_rejections(simulated_bike):
+    bike = simulated_bike()
+    entries = generate(4, start_time=1_700_000_000, seed=6)
+    handle = bike.handle
+    bike.handle = lambda command: (["+LOGERROR: Flash full"] if command.endswith(",0")
+                                   else handle(command))
+    entries[1] = (entries[1][0], entries[1][1] - entries[1][1] % 60)  # 秒为0的一条被拒绝
+    inserter, rejected = seed(bike, entries, Checkpoint(None, SOURCE, len(entries)), retries=0)
+    assert rejected == 1 and inserter.errors[0][0] == 1
+
+    other = simulated_bike()
+    other.handle = lambda command: ["+LOGOK: Log inserted: [FFFFFFFFFFFF]"]
+    with pytest.raises(ATSessionError):
+        seed(other, entries[:1], Checkpoint(None, SOURCE, 1), retries=0)
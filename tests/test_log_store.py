@@ -0,0 +1,32 @@
+from at_protocol import LogRecord
+from log_store import LogStore
+
+
+def record(timestamp, code, index=1):
+    return LogRecord(0, index, timestamp, code, "ABCD")
+
+
+def test_records_deduplicated_per_device(tmp_path):
+    with LogStore(str(tmp_path / "logs.db")) as store:
+        first = [record(100, "10AA00000001"), record(160, "20BB00000002")]
+        assert store.add_records("A", "Surron-A", first) == 2
+        assert store.add_records("A", "Surron-A", first + [record(200, "10AA00000001")],
+                                 device_count=3) == 1
+        assert store.add_records("B", "Surron-B", first) == 2
+
+        assert store.count() == 5
+        assert store.count("A") == 3
+        assert [r[1] for r in store.records("A")] == [100, 160, 200]
+        device = store.device("A")
+        assert (device["name"], device["last_count"], device["sync_count"]) == ("Surron-A", 3, 2)
+        assert store.device("C") is None
+        assert [d["address"] for d in store.devices()] == ["A", "B"]
+
+
+def test_sync_stats_rate_from_timestamp_span(tmp_path):
+    with LogStore(str(tmp_path / "logs.db")) as store:
+        store.add_records("A", "Surron-A", [record(0, "10AA00000001"), record(100, "10AA00000002")])
+        store.add_records("B", "Surron-B", [record(50, "10AA00000001")])
+        stats = store.sync_stats()
+        assert stats["A"][1] == 2 / 100
+        assert stats["B"][1] == 0.0
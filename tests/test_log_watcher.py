@@ -0,0 +1,181 @@
+import asyncio
+import time
+
+import pytest
+
+import ble_session
+import log_watcher
+import simulated_device
+from at_protocol import LOG_CAPACITY
+from log_watcher import LogWatcher, watch
+from simulated_device import SimulatedLogDevice
+
+
+class DeviceSession:
+    """直接调用模拟设备处理命令的会话"""
+
+    def __init__(self, device):
+        self.device = device
+        self.commands = []
+
+    async def command(self, command):
+        self.commands.append(command)
+        return self.device.handle(command)
+
+
+def make_watcher(device, **options):
+    batches = []
+    watcher = LogWatcher(DeviceSession(device),
+                         lambda records, count: batches.append((records, count)), **options)
+    asyncio.run(watcher.start())
+    return watcher, batches
+
+
+def poll(watcher):
+    return asyncio.run(watcher.poll())
+
+
+def codes(records):
+    return [r.code for r in records]
+
+
+def test_existing_logs_skipped_and_delta_fetched():
+    device = SimulatedLogDevice(entries=10, seed=1)
+    watcher, batches = make_watcher(device)
+    assert watcher.count == 10 and poll(watcher) == [] and not batches
+
+    device.insert("10AA00000001", 1_800_000_000)
+    device.insert("20BB00000002", 1_800_000_060)
+    watcher.session.commands.clear()
+    records = poll(watcher)
+    assert codes(records) == ["10AA00000001", "20BB00000002"]
+    # 多取一条用于确认与上次最新的记录衔接
+    assert watcher.session.commands == ["AT+LOGCOUNT", "AT+LOGLATEST=3"]
+    assert batches == [(records, 12)]
+    assert watcher.received == 2 and watcher.cleared == 0
+
+
+def test_fetch_after_count_reset_returns_only_new_records():
+    device = SimulatedLogDevice(entries=10, seed=2)
+    watcher, _ = make_watcher(device)
+
+    # 清空后又写入了比原来更多的记录：条数的差值不是新增的条数
+    device.handle("AT+LOGCLEAR")
+    for i in range(12):
+        device.insert(f"30CC{i:08X}", 1_800_000_000 + i)
+    records = poll(watcher)
+    assert codes(records) == [f"30CC{i:08X}" for i in range(12)]
+    assert watcher.fetches == 3  # 3 -> 6 -> 12 条，直到取完全部日志
+
+    # 条数变少时计为一次清空
+    device.handle("AT+LOGCLEAR")
+    device.insert("40DD00000001", 1_800_001_000)
+    assert codes(poll(watcher)) == ["40DD00000001"]
+    assert watcher.cleared == 1 and watcher.count == 1
+
+
+def test_full_log_compares_newest_record():
+    device = SimulatedLogDevice(entries=LOG_CAPACITY, seed=3)
+    watcher, _ = make_watcher(device)
+    assert poll(watcher) == []
+
+    # 写满后覆盖最旧的记录，条数不变
+    device.insert("10EE00000001", 1_900_000_000)
+    records = poll(watcher)
+    assert watcher.count == LOG_CAPACITY
+    assert codes(records) == ["10EE00000001"]
+    assert poll(watcher) == []
+
+
+def test_interval_backs_off_and_resets_on_new_records():
+    device = SimulatedLogDevice(entries=3, seed=4)
+    watcher, _ = make_watcher(device, min_interval=0.1, max_interval=0.4, backoff=2)
+    intervals = []
+    for _ in range(3):
+        poll(watcher)
+        intervals.append(watcher.interval)
+    assert intervals == pytest.approx([0.2, 0.4, 0.4])
+    device.insert("10FF00000001", 1_800_000_000)
+    poll(watcher)
+    assert watcher.interval == pytest.approx(0.1)
+
+
+def test_watch_reconnects_and_fetches_records_added_meanwhile(simulated_bike, monkeypatch):
+    monkeypatch.setattr(log_watcher, "RECONNECT_DELAY", 0.0)
+    clients = []
+
+    class TrackedClient(simulated_device.SimulatedClient):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            clients.append(self)
+
+    monkeypatch.setattr(ble_session, "BleakClient", TrackedClient)
+    bike = simulated_bike(entries=5)
+    handle = bike.handle
+    counts = []
+
+    def drop_link_once(command):
+        if command == "AT+LOGCOUNT":
+            counts.append(command)
+            if len(counts) == 3:
+                # 中断期间设备记录了新的故障
+                bike.insert("20AB00000001", 1_800_000_000)
+                asyncio.get_running_loop().call_soon(clients[-1].simulate_link_loss)
+                return []
+        return handle(command)
+
+    bike.handle = drop_link_once
+    received, reconnects = [], []
+    watcher = asyncio.run(watch(bike.address, bike.name,
+                                lambda records, count: received.extend(records),
+                                duration=1.0, on_reconnect=reconnects.append,
+                                min_interval=0.01, max_interval=0.05))
+    assert len(reconnects) == 1 and len(clients) == 2
+    assert codes(received) == ["20AB00000001"]
+    assert watcher.received == 1 and watcher.count == 6
+
+
+def test_controller_watch_logs_new_records(simulated_bike, monkeypatch):
+    pytest.importorskip("PyQt6")
+    from PyQt6.QtCore import QCoreApplication
+    import ble_controller
+    from ble_controller import BLEController
+
+    app = QCoreApplication.instance() or QCoreApplication([])
+    monkeypatch.setattr(ble_controller, "BLEAK_AVAILABLE", True)
+    monkeypatch.setattr(ble_controller, "BleakClient", simulated_device.SimulatedClient)
+    monkeypatch.setattr(ble_controller, "BleakScanner", simulated_device.SimulatedScanner)
+    bike = simulated_bike(entries=5)
+
+    def wait(condition, timeout=10.0):
+        deadline = time.monotonic() + timeout
+        while not condition() and time.monotonic() < deadline:
+            app.processEvents()
+            time.sleep(0.01)
+        return condition()
+
+    controller = BLEController(autostart=False)
+    watching, batches, logged = [], [], []
+    controller.watchingChanged.connect(watching.append)
+    controller.watchRecords.connect(lambda *args: batches.append(args))
+    controller.logMessage.connect(lambda message, *_: logged.append(message))
+    controller.start(scan=False)
+    try:
+        assert controller.wait_until_ready(5.0)
+        controller.connectDevice(bike.address)
+        assert wait(lambda: controller._connected)
+        controller.setWatching(True)
+        assert wait(lambda: watching == [True])
+        controller.loop.call_soon_threadsafe(bike.insert, "10AB00000001", 1_800_000_000)
+        assert wait(lambda: batches)
+        address, name, records, count = batches[0]
+        assert address == bike.address and count == 6
+        assert codes(records) == ["10AB00000001"]
+        assert any(message.startswith("🆕") and "10AB00000001" in message for message in logged)
+        # 轮询命令不输出到通讯日志
+        assert not any("AT+LOGCOUNT" in message for message in logged)
+
+        controller.disconnectDevice()
+        assert wait(lambda: watching == [True, False])
+    finally:
+        controller.shutdown()
@@ -0,0 +1,155 @@
+import json
+import math
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import metrics as metrics_module
+from metrics import (MetricsRegistry, MetricsSampler, histogram_quantile, render_prometheus,
+                     write_snapshot)
+
+
+def test_counter_gauge_and_function_values():
+    registry = MetricsRegistry()
+    sent = registry.counter("sent_total", "发出的命令数")
+    depth = registry.gauge("depth", "队列深度")
+    queue = [1, 2, 3]
+    registry.gauge("queue", "待处理", lambda: len(queue))
+    sent.inc()
+    sent.inc(4)
+    depth.set(7)
+    depth.dec(2)
+    snapshot = registry.snapshot()
+    assert snapshot["sent_total"] == {"type": "counter", "help": "发出的命令数", "value": 5}
+    assert snapshot["depth"]["value"] == 5
+    assert snapshot["queue"] == {"type": "gauge", "help": "待处理", "value": 3}
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    rtt = registry.histogram("rtt", "往返时间", (0.5, 0.1, 1.0))
+    for value in (0.05, 0.1, 0.3, 0.7, 2.0):
+        rtt.observe(value)
+    sample = registry.snapshot()["rtt"]
+    # 上界排序，等于上界的值计入该桶，超过最大上界的计入 +Inf
+    assert sample["buckets"] == [[0.1, 2], [0.5, 3], [1.0, 4]]
+    assert sample["count"] == 5 and sample["sum"] == pytest.approx(3.15)
+
+
+def test_duplicate_registration_returns_existing_metric():
+    registry = MetricsRegistry()
+    first = registry.counter("bytes_total", "字节数", lambda: 1)
+    second = registry.counter("bytes_total", "字节数", lambda: 2)
+    assert second is first
+    # 函数以最后一次登记为准，不带函数的重复登记不覆盖
+    assert registry.counter("bytes_total", "字节数") is first
+    assert registry.snapshot()["bytes_total"]["value"] == 2
+    assert registry.histogram("lag", "延迟") is registry.histogram("lag", "延迟")
+    with pytest.raises(ValueError):
+        registry.gauge("bytes_total", "字节数")
+    with pytest.raises(ValueError):
+        registry.counter("lag", "延迟")
+
+
+def test_collectors_and_failing_functions():
+    registry = MetricsRegistry()
+    registry.gauge("broken", "出错", lambda: 1 / 0)
+
+    def worker():
+        return {"worker_up": {"type": "gauge", "help": "工作进程", "value": 1}}
+
+    registry.add_collector(worker)
+    snapshot = registry.snapshot()
+    assert "broken" not in snapshot and snapshot["worker_up"]["value"] == 1
+    registry.remove_collector(worker)
+    registry.remove_collector(worker)
+    assert "worker_up" not in registry.snapshot()
+
+
+def test_histogram_quantile():
+    buckets = [[0.1, 50], [0.5, 90], [1.0, 100]]
+    assert histogram_quantile(buckets, 100, 0.5) == 0.1
+    assert histogram_quantile(buckets, 100, 0.9) == 0.5
+    assert histogram_quantile(buckets, 100, 0.95) == 1.0
+    assert histogram_quantile(buckets, 120, 0.95) == math.inf
+    assert math.isnan(histogram_quantile(buckets, 0, 0.5))
+
+
+def test_sampler_rates_and_histogram_intervals(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr(metrics_module, "time",
+                        SimpleNamespace(monotonic=lambda: clock[0], time=time.time))
+    registry = MetricsRegistry()
+    sent = registry.counter("sent_total", "发出的命令数")
+    rtt = registry.histogram("rtt", "往返时间", (0.1, 1.0))
+    sampler = MetricsSampler(registry)
+
+    sent.inc(10)
+    rtt.observe(0.05)
+    first = sampler.sample()
+    assert first["elapsed"] == 0.0 and first["rates"] == {}
+    assert first["intervals"]["rtt"] == {"count": 1, "mean": 0.05, "p95": 0.1}
+
+    clock[0] += 2.0
+    sent.inc(6)
+    rtt.observe(0.5)
+    rtt.observe(0.7)
+    second = sampler.sample()
+    assert second["elapsed"] == 2.0
+    assert second["rates"] == {"sent_total": 3.0}
+    # 只统计两次采样之间新增的样本
+    assert second["intervals"]["rtt"] == {"count": 2, "mean": pytest.approx(0.6), "p95": 1.0}
+
+    clock[0] += 1.0
+    third = sampler.sample()
+    assert third["rates"] == {"sent_total": 0.0}
+    assert third["intervals"]["rtt"]["count"] == 0
+    assert math.isnan(third["intervals"]["rtt"]["mean"])
+    assert math.isnan(third["intervals"]["rtt"]["p95"])
+
+
+def test_render_prometheus():
+    registry = MetricsRegistry()
+    registry.counter("sent_total", "发出的\n命令数").inc(3)
+    registry.gauge("ratio", "比例").set(math.nan)
+    rtt = registry.histogram("rtt", "往返时间", (0.1, 1))
+    rtt.observe(0.05)
+    rtt.observe(5.0)
+    assert render_prometheus(registry.snapshot()).splitlines() == [
+        "# HELP sent_total 发出的\\n命令数",
+        "# TYPE sent_total counter",
+        "sent_total 3",
+        "# HELP ratio 比例",
+        "# TYPE ratio gauge",
+        "ratio NaN",
+        "# HELP rtt 往返时间",
+        "# TYPE rtt histogram",
+        'rtt_bucket{le="0.1"} 1',
+        'rtt_bucket{le="1.0"} 1',
+        'rtt_bucket{le="+Inf"} 2',
+        "rtt_sum 5.05",
+        "rtt_count 2",
+    ]
+
+
+def test_write_snapshot_replaces_files_and_writes_nan_as_null(tmp_path):
+    registry = MetricsRegistry()
+    registry.counter("sent_total", "发出的命令数").inc(2)
+    registry.histogram("rtt", "往返时间", (0.1,))
+    sampler = MetricsSampler(registry)
+    directory = str(tmp_path / "metrics")
+
+    prom_path, json_path = write_snapshot(sampler.sample(), directory)
+    assert prom_path.endswith("surronble.prom") and json_path.endswith("surronble.json")
+    assert "sent_total 2" in open(prom_path, encoding="utf-8").read()
+    with open(json_path, encoding="utf-8") as f:
+        data = json.load(f)
+    assert data["metrics"]["sent_total"]["value"] == 2
+    # 没有样本的直方图区间统计为NaN，写成null
+    assert data["intervals"]["rtt"] == {"count": 0, "mean": None, "p95": None}
+    assert "created" in data
+
+    write_snapshot(sampler.sample(), directory, basename="again")
+    assert sorted(p.name for p in (tmp_path / "metrics").iterdir()) == [
+        "again.json", "again.prom", "surronble.json", "surronble.prom"]
@@ -0,0 +1,75 @@
+from packet_capture import PacketCapture, characteristic_label, hex_dump
+
+RX_UUID = "00006e52-0000-1000-8000-00805f9b34fb"
+
+
+class Characteristic:
+    """bleak特征对象的替身（按对象本身哈希）"""
+
+    def __init__(self, uuid):
+        self.uuid = uuid
+
+
+def test_packets_round_trip_with_sequence_and_characteristic():
+    capture = PacketCapture()
+    char = Characteristic(RX_UUID)
+    assert capture.append(char, b"+LOGOK: a\r\n", timestamp=100) == 0
+    assert capture.append("other", b"", timestamp=150) == 1
+    assert capture.append(char, b"xy", timestamp=200) == 2
+
+    assert len(capture) == 3 and capture.size == 13 and capture.end_seq == 3
+    assert capture.origin == 100
+    assert capture.packet(0) == (0, 100, 11, RX_UUID, b"+LOGOK: a\r\n")
+    assert capture.packet(1).data == b"" and capture.packet(1).characteristic == "other"
+    assert capture.packet(2).data == b"xy"
+    assert capture.packet(3) is None and capture.packet(-1) is None
+
+
+def test_equal_labels_share_one_characteristic_entry():
+    capture = PacketCapture()
+    capture.append(Characteristic(RX_UUID), b"a")
+    # 重连后bleak给出新的特征对象，名称相同时沿用同一编号
+    capture.append(Characteristic(RX_UUID), b"b")
+    capture.append(RX_UUID, b"c")
+    assert capture.characteristics == [RX_UUID]
+    assert characteristic_label(Characteristic(RX_UUID)) == RX_UUID
+
+
+def test_trim_by_count_keeps_sequence_numbers():
+    capture = PacketCapture(max_packets=8)
+    for i in range(9):
+        capture.append("rx", bytes([i]), timestamp=i)
+    # 超过容量时丢弃最早的四分之一
+    assert capture.dropped == 2 and capture.first_seq == 2 and len(capture) == 7
+    assert capture.packet(1) is None
+    assert capture.packet(2).data == b"\x02" and capture.packet(8).data == b"\x08"
+    assert capture.size == 7
+
+
+def test_trim_by_bytes_drops_until_three_quarters_full():
+    capture = PacketCapture(max_bytes=100)
+    for i in range(4):
+        capture.append("rx", bytes([i]) * 30)
+    # 120字节 > 100：丢弃最早的2个，剩下60字节 <= 75
+    assert capture.dropped == 2 and capture.size == 60
+    capture.append("rx", b"\x04" * 30)
+    assert capture.dropped == 2 and capture.size == 90
+    assert [capture.packet(seq).data[0] for seq in (2, 3, 4)] == [2, 3, 4]
+
+
+def test_clear_continues_sequence():
+    capture = PacketCapture()
+    capture.append("rx", b"a", timestamp=10)
+    capture.append("rx", b"b", timestamp=20)
+    capture.clear()
+    assert len(capture) == 0 and capture.size == 0 and capture.packet(1) is None
+    assert capture.append("rx", b"c", timestamp=30) == 2
+    assert capture.packet(2).data == b"c"
+    assert capture.dropped == 0 and capture.origin == 10
+
+
+def test_hex_dump_pads_last_line_and_masks_unprintable():
+    dump = hex_dump(b"+LOGOK: Read complete\r\n\x00\xff", width=16).split("\n")
+    assert dump[0] == "0000  2B 4C 4F 47 4F 4B 3A 20 52 65 61 64 20 63 6F 6D  |+LOGOK: Read com|"
+    assert dump[1] == "0010  70 6C 65 74 65 0D 0A 00 FF" + " " * 21 + "  |plete....|"
+    assert hex_dump(b"") == ""
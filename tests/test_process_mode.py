@@ -0,0 +1,39 @@
+import time
+
+import pytest
+
+pytest.importorskip("PyQt6")
+from PyQt6.QtCore import QCoreApplication  # noqa: E402
+
+from ble_process import ProcessBLEController  # noqa: E402
+from log_format import LogLevel  # noqa: E402
+
+DEVICE = dict(name="Surron-T", address="SIM:T1", entries=5, seed=1)
+
+
+def _wait(app, condition, timeout):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        app.processEvents()
+        time.sleep(0.01)
+    return condition()
+
+
+def test_records_delivered_when_verbosity_raised():
+    app = QCoreApplication.instance() or QCoreApplication([])
+    controller = ProcessBLEController(autostart=False, simulated=[DEVICE])
+    records, logged = [], []
+    controller.recordReceived.connect(records.append)
+    controller.logMessage.connect(lambda message, *_: logged.append(message))
+    controller.start()
+    try:
+        controller.connectDevice(DEVICE["address"])
+        assert _wait(app, lambda: controller._connected, 15.0)
+        controller.setVerbosity(LogLevel.WARNING)
+        logged.clear()
+        controller.sendCommand("AT+LOGLATEST=3")
+        assert _wait(app, lambda: len(records) >= 3, 10.0)
+        # 数据照常送达，INFO级别的接收行不进入日志
+        assert not any(message.startswith("← +LOGDATA") for message in logged)
+    finally:
+        controller.shutdown()
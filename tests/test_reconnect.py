@@ -0,0 +1,48 @@
+import asyncio
+import time
+
+import pytest
+
+pytest.importorskip("PyQt6")
+pytest.importorskip("bleak")
+from PyQt6.QtCore import QCoreApplication  # noqa: E402
+
+import ble_controller  # noqa: E402
+from ble_controller import BLEController  # noqa: E402
+
+
+class HangingClient:
+    """connect()一直不返回的BleakClient替身"""
+
+    instances = []
+
+    def __init__(self, address, disconnected_callback=None):
+        self.address = address
+        self.disconnected = False
+        HangingClient.instances.append(self)
+
+    async def connect(self):
+        await asyncio.Event().wait()
+
+    async def disconnect(self):
+        self.disconnected = True
+
+
+def test_cancelled_reconnect_clears_half_open_client(monkeypatch):
+    QCoreApplication.instance() or QCoreApplication([])
+    monkeypatch.setattr(ble_controller, "BleakClient", HangingClient)
+    controller = BLEController(autostart=False)
+    state = {"address": "AA:BB:CC:DD:EE:FF", "since": time.monotonic(), "attempts": 0,
+             "retry_at": 0.0, "task": None}
+    controller._reconnect = state
+
+    async def run():
+        controller.loop = asyncio.get_running_loop()
+        state["task"] = asyncio.create_task(controller._reconnect_device(state))
+        await asyncio.sleep(0.05)
+        assert controller.client is HangingClient.instances[-1]
+        await controller._cancel_reconnect()
+
+    asyncio.run(run())
+    assert controller.client is None
+    assert HangingClient.instances[-1].disconnected
@@ -0,0 +1,75 @@
+import pytest
+
+from shm_ring import ShmRing
+
+
+@pytest.fixture
+def ring():
+    ring = ShmRing.create(64)
+    yield ring
+    ring.close()
+
+
+def test_records_round_trip_in_order(ring):
+    assert ring.write(b"a") and ring.write(b"bcde") and ring.write(b"")
+    assert ring.read_all() == [b"a", b"bcde", b""]
+    assert ring.pending_bytes() == 0
+
+
+def test_full_ring_rejects_until_read(ring):
+    assert ring.write(b"x" * 28)
+    assert ring.write(b"y" * 28)
+    assert not ring.write(b"z")
+    assert ring.read_all(limit=1) == [b"x" * 28]
+    assert ring.write(b"z")
+    assert ring.read_all() == [b"y" * 28, b"z"]
+
+
+def test_record_wraps_to_start(ring):
+    assert ring.write(b"1" * 36)
+    assert ring.read_all() == [b"1" * 36]
+    # 写位置40，末尾只剩24字节，20字节的记录（含长度24字节）还放得下，28字节的要回绕
+    assert ring.write(b"2" * 28)
+    assert ring.read_all() == [b"2" * 28]
+    assert ring.pending_bytes() == 0
+
+
+def test_record_larger_than_tail_and_head_wraps_after_drain(ring):
+    assert ring.write(b"1" * 36)
+    assert ring.write(b"2" * 4)
+    # 写位置48：末尾16字节、开头（读走之前）不足，先只写回绕标记
+    assert not ring.write(b"3" * 56)
+    assert ring.read_all() == [b"1" * 36, b"2" * 4]
+    assert ring.write(b"3" * 56)
+    assert ring.read_all() == [b"3" * 56]
+
+
+def test_oversized_record_never_written(ring):
+    assert ring.max_payload == 60
+    assert not ring.write(b"x" * 61)
+    assert ring.pending_bytes() == 0
+    assert ring.write(b"x" * 60)
+    assert ring.read_all() == [b"x" * 60]
+
+
+def test_publisher_backlog_and_oversized_records(ring):
+    pytest.importorskip("PyQt6")
+    from ble_process import RingPublisher
+
+    wakes = []
+    publisher = RingPublisher(ring, lambda: wakes.append(1))
+    publisher.publish(b"a" * 40)
+    publisher.publish(b"b" * 20)
+    publisher.publish(b"c" * 20)
+    assert len(publisher.backlog) == 2
+    publisher.publish(b"d" * 100)
+    assert publisher.dropped == 1
+    assert len(publisher.backlog) == 2
+
+    assert ring.read_all() == [b"a" * 40]
+    publisher.flush()
+    assert ring.read_all() == [b"b" * 20, b"c" * 20]
+    assert not publisher.backlog
+    publisher.publish(b"e")
+    assert ring.read_all() == [b"e"]
+    assert wakes
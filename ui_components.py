@@ -1,8 +1,15 @@
+from datetime import datetime, timedelta
+
 from PyQt6.QtWidgets import (QVBoxLayout, QHBoxLayout, QWidget, QPushButton,
-                             QListWidget, QTextEdit, QLineEdit, QLabel, QGroupBox,
-                             QListWidgetItem)
-from PyQt6.QtCore import Qt
-from PyQt6.QtGui import QTextOption
+                             QTextEdit, QLineEdit, QLabel, QGroupBox, QListView, QTableView,
+                             QHeaderView, QAbstractItemView, QComboBox, QCheckBox, QTimeEdit)
+from PyQt6.QtCore import (Qt, pyqtSignal, QTimer, QTime, QAbstractListModel, QAbstractTableModel,
+                          QSortFilterProxyModel, QModelIndex)
+from PyQt6.QtGui import (QTextOption, QTextCursor, QTextCharFormat, QTextBlockFormat,
+                         QColor, QFont)
+
+from log_format import MESSAGE_STYLES, LINE_SEPARATOR, MessageType, message_type, wrap_message
+from log_index import LogIndex, LogFilter
 
 
 def get_app_stylesheet():
@@ -47,7 +54,7 @@ def get_app_stylesheet():
         QPushButton:hover {
             background: #5a67d8;
         }
-        QPushButton:pressed {
+        QPushButton:pressed, QPushButton:checked {
             background: #4c51bf;
         }
         QPushButton:disabled {
@@ -78,28 +85,33 @@ def get_app_stylesheet():
         QPushButton#saveLogButton:hover {
             background: #319795;
         }
-        QListWidget {
+        QListWidget, QTableView {
             background: #f8f9fa;
             border: 1px solid #dee2e6;
             border-radius: 8px;
             padding: 5px;
             font-size: 12px;
         }
-        QListWidget::item {
+        QListWidget::item, QTableView::item {
             background: transparent;
-            border-radius: 5px;
             padding: 6px;
-            margin: 1px;
-            border: 1px solid transparent;
+            border: none;
             color: #2d3748;
         }
-        QListWidget::item:hover {
+        QListWidget::item:hover, QTableView::item:hover {
             background: #e9ecef;
-            border: 1px solid #667eea;
         }
-        QListWidget::item:selected {
+        QListWidget::item:selected, QTableView::item:selected {
             background: rgba(102, 126, 234, 0.15);
-            border: 2px solid #667eea;
+            color: #2d3748;
+            font-weight: bold;
+        }
+        QHeaderView::section {
+            background: #edf2f7;
+            color: #4a5568;
+            border: none;
+            padding: 4px 6px;
+            font-size: 12px;
             font-weight: bold;
         }
         QTextEdit {
@@ -131,11 +143,34 @@ def get_app_stylesheet():
             font-weight: bold;
             font-size: 13px;
         }
-        QLabel#statusConnected {
+        QLabel#statusLabel[connected="true"] {
             background: #d4edda;
             border-color: #c3e6cb;
             color: #155724;
         }
+        QLabel#linkStatsLabel {
+            color: #856404;
+            padding: 2px 12px;
+        }
+        QLabel#macroStatusLabel {
+            color: #4a5568;
+            font-size: 12px;
+        }
+        QLabel#scanStatusLabel {
+            background: #e6f3ff;
+            border: 1px solid #4a90e2;
+            border-radius: 8px;
+            padding: 8px 12px;
+            color: #2c5aa0;
+            font-weight: bold;
+            font-size: 13px;
+            margin-bottom: 5px;
+        }
+        QLabel#scanStatusLabel[scanning="true"] {
+            background: #fff3cd;
+            border-color: #ffc107;
+            color: #856404;
+        }
         QLabel {
             color: #333;
             font-size: 13px;
@@ -146,6 +181,20 @@ def get_app_stylesheet():
     """
 
 
+def set_state_property(widget, name, value):
+    """设置状态动态属性，只对该控件重新应用样式
+
+    状态样式统一写在 get_app_stylesheet 中，以 [name="value"] 选择器区分，
+    切换状态时不再重新解析样式表。
+    """
+    if widget.property(name) == value:
+        return
+    widget.setProperty(name, value)
+    style = widget.style()
+    style.unpolish(widget)
+    style.polish(widget)
+
+
 def create_title_label():
     """创建标题标签"""
     title_label = QLabel("Surron故障日志读取测试工具 - 持续扫描模式")
@@ -198,58 +247,222 @@ def create_right_panel():
     pass
 
 
-class DeviceListWidget(QListWidget):
-    """自定义设备列表控件 - 支持设备添加和移除"""
+class MessageFormats:
+    """按消息类型预先创建的文本格式 - 追加日志时只按类型查表，不再生成样式字符串"""
+
+    FONT_FAMILIES = ['Consolas', 'Monaco', 'Courier New', 'monospace']
+
+    def __init__(self, font_size=13, timestamp_size=11, block_margin=3, icon_on_own_line=True):
+        self.icon_on_own_line = icon_on_own_line
+
+        # 每条消息一个文本块
+        self.block = QTextBlockFormat()
+        self.block.setTopMargin(block_margin)
+        self.block.setBottomMargin(block_margin)
+        self.block.setLeftMargin(6)
+        self.block.setBackground(QColor(255, 255, 255, 8))
+
+        # 时间戳格式
+        self.timestamp = QTextCharFormat()
+        self.timestamp.setForeground(QColor("#888888"))
+        self.timestamp.setFont(self._font(timestamp_size))
+
+        # 各消息类型的格式和图标
+        self.by_type = {}
+        self.icons = {}
+        for msg_type, (color, icon) in MESSAGE_STYLES.items():
+            fmt = QTextCharFormat()
+            fmt.setForeground(QColor(color))
+            fmt.setFont(self._font(font_size))
+            self.by_type[msg_type] = fmt
+            self.icons[msg_type] = icon
+
+    @classmethod
+    def _font(cls, pixel_size):
+        font = QFont()
+        font.setFamilies(cls.FONT_FAMILIES)
+        font.setPixelSize(pixel_size)
+        return font
+
+    def append(self, cursor, text, msg_type, timestamp):
+        """在光标处追加一条消息（光标应位于文档末尾）"""
+        msg_type = message_type(msg_type)
+        fmt = self.by_type[msg_type]
+
+        if cursor.atStart():
+            cursor.setBlockFormat(self.block)
+        else:
+            cursor.insertBlock(self.block)
+
+        cursor.insertText(f"[{timestamp}] ", self.timestamp)
+        separator = LINE_SEPARATOR if self.icon_on_own_line else ' '
+        cursor.insertText(f"{self.icons[msg_type]}{separator}{text}", fmt)
+
+
+class DeviceTableModel(QAbstractTableModel):
+    """设备表模型 - 以地址为键，更新时只通知变化的单元格"""
+
+    COLUMNS = ["名称", "地址", "RSSI"]
+    NAME, ADDRESS, RSSI = range(3)
+
+    AddressRole = Qt.ItemDataRole.UserRole
+    SortRole = Qt.ItemDataRole.UserRole + 1
 
     def __init__(self):
         super().__init__()
-        self.setMinimumHeight(300)
-        self.device_items = {}  # 存储 address -> QListWidgetItem 的映射
+        self._rows = []  # [name, address, rssi]
+        self._row_of = {}  # address -> 行号
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return self.COLUMNS[section]
+        return None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        name, address, rssi = self._rows[index.row()]
+        column = index.column()
+
+        if role == Qt.ItemDataRole.DisplayRole:
+            if column == self.NAME:
+                return f"📱 {name}"
+            if column == self.ADDRESS:
+                return address
+            return f"📶 {rssi} dBm"
+        if role == self.SortRole:
+            return (name.lower(), address, rssi)[column]
+        if role == self.AddressRole:
+            return address
+        if role == Qt.ItemDataRole.ToolTipRole:
+            return f"{name}\n{address}\nRSSI: {rssi} dBm"
+        return None
 
     def add_device(self, name, address, rssi):
-        """添加设备到列表"""
-        # 检查是否已存在
-        if address in self.device_items:
-            # 更新现有项
-            item = self.device_items[address]
-            item.setText(f"📱 {name}\n📍 {address}\n📶 RSSI: {rssi} dBm")
+        """添加或更新设备，O(1)查找"""
+        row = self._row_of.get(address)
+        if row is None:
+            row = len(self._rows)
+            self.beginInsertRows(QModelIndex(), row, row)
+            self._rows.append([name, address, rssi])
+            self._row_of[address] = row
+            self.endInsertRows()
+            return
+
+        entry = self._rows[row]
+        if entry[2] != rssi:
+            entry[2] = rssi
+            cell = self.index(row, self.RSSI)
+            self.dataChanged.emit(cell, cell, [Qt.ItemDataRole.DisplayRole])
+        if entry[0] != name:
+            entry[0] = name
+            cell = self.index(row, self.NAME)
+            self.dataChanged.emit(cell, cell, [Qt.ItemDataRole.DisplayRole])
+
+    def remove_device(self, address):
+        """移除设备"""
+        row = self._row_of.pop(address, None)
+        if row is None:
             return
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self._rows[row]
+        # 设备离线很少发生，只重排其后的行号
+        for i in range(row, len(self._rows)):
+            self._row_of[self._rows[i][1]] = i
+        self.endRemoveRows()
 
-        # 添加新项
-        item = QListWidgetItem(f"📱 {name}\n📍 {address}\n📶 RSSI: {rssi} dBm")
-        item.setData(1, address)  # 存储地址
-        self.addItem(item)
-        self.device_items[address] = item
+    def clear(self):
+        """清空设备"""
+        self.beginResetModel()
+        self._rows.clear()
+        self._row_of.clear()
+        self.endResetModel()
+
+    def __contains__(self, address):
+        return address in self._row_of
+
+
+class DeviceListWidget(QTableView):
+    """设备列表控件 - 基于模型/代理模型，可按RSSI或名称排序"""
+
+    deviceSelected = pyqtSignal(str)  # address
+    deviceActivated = pyqtSignal(str)  # address - 双击
+
+    def __init__(self):
+        super().__init__()
+        self.setMinimumHeight(300)
+
+        self.device_model = DeviceTableModel()
+        self.proxy_model = QSortFilterProxyModel(self)
+        self.proxy_model.setSourceModel(self.device_model)
+        self.proxy_model.setSortRole(DeviceTableModel.SortRole)
+        self.proxy_model.setDynamicSortFilter(True)
+        self.setModel(self.proxy_model)
+
+        self.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+        self.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.setShowGrid(False)
+        self.setWordWrap(False)
+        self.verticalHeader().setVisible(False)
+        self.verticalHeader().setDefaultSectionSize(32)
+        header = self.horizontalHeader()
+        header.setSectionResizeMode(DeviceTableModel.NAME, QHeaderView.ResizeMode.Stretch)
+        header.setSectionResizeMode(DeviceTableModel.ADDRESS, QHeaderView.ResizeMode.ResizeToContents)
+        header.setSectionResizeMode(DeviceTableModel.RSSI, QHeaderView.ResizeMode.ResizeToContents)
+
+        # 默认按信号强度从强到弱排序，点击表头可切换
+        self.setSortingEnabled(True)
+        self.sortByColumn(DeviceTableModel.RSSI, Qt.SortOrder.DescendingOrder)
+
+        self.clicked.connect(self._emit_selected)
+        self.doubleClicked.connect(self._emit_activated)
+
+    def add_device(self, name, address, rssi):
+        """添加设备到列表"""
+        self.device_model.add_device(name, address, rssi)
 
     def remove_device(self, address):
         """从列表中移除设备"""
-        if address in self.device_items:
-            item = self.device_items[address]
-            row = self.row(item)
-            if row != -1:
-                self.takeItem(row)
-            del self.device_items[address]
+        self.device_model.remove_device(address)
 
     def get_selected_address(self):
         """获取选中设备的地址"""
-        current_item = self.currentItem()
-        if current_item:
-            return current_item.data(1)
+        index = self.currentIndex()
+        if index.isValid():
+            return index.data(DeviceTableModel.AddressRole)
         return None
 
     def clear(self):
-        """重写clear方法，同时清理映射"""
-        super().clear()
-        self.device_items.clear()
+        """清空设备列表"""
+        self.device_model.clear()
+
+    def _emit_selected(self, index):
+        self.deviceSelected.emit(index.data(DeviceTableModel.AddressRole))
+
+    def _emit_activated(self, index):
+        self.deviceActivated.emit(index.data(DeviceTableModel.AddressRole))
 
 
 class LogTextEdit(QTextEdit):
     """自定义日志文本控件 - 支持自动换行"""
 
+    lineAdded = pyqtSignal(int)  # 新增日志的行号
+    logCleared = pyqtSignal()
+
+    _formats = None  # 所有实例共享的MessageFormats
+
     def __init__(self):
         super().__init__()
         self.setReadOnly(True)
         self.log_content = []  # 存储纯文本日志
+        self.index = LogIndex()  # 过滤用的增量索引，行号与log_content一致
         self.setStyleSheet("""
             QTextEdit {
                 background: #1e1e1e;
@@ -285,105 +498,38 @@ class LogTextEdit(QTextEdit):
         self.setWordWrapMode(QTextOption.WrapMode.WrapAtWordBoundaryOrAnywhere)
         self.setLineWrapMode(QTextEdit.LineWrapMode.WidgetWidth)
 
-    def add_log_message(self, message, msg_type, timestamp):
-        """添加日志消息 - 支持自动换行"""
-        # 根据类型设置颜色和图标
-        type_config = {
-            "error": {"color": "#ff6b6b", "icon": "❌"},
-            "success": {"color": "#51cf66", "icon": "✅"},
-            "warning": {"color": "#ffd43b", "icon": "⚠️"},
-            "sent": {"color": "#74c0fc", "icon": "📤"},
-            "received": {"color": "#69db7c", "icon": "📥"},
-            "info": {"color": "#91a7ff", "icon": "ℹ️"}
-        }
-
-        config = type_config.get(msg_type, {"color": "#ffffff", "icon": "📝"})
-
-        # 处理长消息的换行显示
-        formatted_message = self._format_long_message(message)
-
-        # 创建HTML格式的消息
-        html_msg = f'''
-        <div style="margin: 3px 0; padding: 6px 10px; border-left: 4px solid {config['color']}; background: rgba(255,255,255,0.03); border-radius: 4px;">
-            <div style="margin-bottom: 2px;">
-                <span style="color: #888; font-size: 11px; font-family: monospace;">[{timestamp}]</span>
-                <span style="color: {config['color']}; margin: 0 6px; font-size: 14px;">{config['icon']}</span>
-            </div>
-            <div style="color: {config['color']}; word-wrap: break-word; white-space: pre-wrap; font-family: 'Consolas', 'Monaco', 'Courier New', monospace; font-size: 13px; line-height: 1.4;">
-                {formatted_message}
-            </div>
-        </div>
-        '''
+        # 消息格式只在启动时创建一次
+        if LogTextEdit._formats is None:
+            LogTextEdit._formats = MessageFormats()
+        self.formats = LogTextEdit._formats
+        self._cursor = QTextCursor(self.document())
+
+    def add_log_message(self, message, msg_type, timestamp, wall_time=None):
+        """添加日志消息 - 支持自动换行
 
+        timestamp为显示的时间文本，wall_time为时间过滤用的墙上时间（秒，默认为当前时间）。
+        """
         # 存储纯文本版本用于保存
         plain_msg = f"[{timestamp}] {message}"
         self.log_content.append(plain_msg)
 
-        # 插入HTML内容
-        cursor = self.textCursor()
-        cursor.movePosition(cursor.MoveOperation.End)
-        cursor.insertHtml(html_msg)
+        # 按类型取预先创建的格式，只插入纯文本
+        self._cursor.movePosition(QTextCursor.MoveOperation.End)
+        self.formats.append(self._cursor, wrap_message(message), msg_type, timestamp)
 
         # 自动滚动到底部
         scrollbar = self.verticalScrollBar()
         scrollbar.setValue(scrollbar.maximum())
 
-    def _format_long_message(self, message):
-        """格式化长消息，适当换行和美化显示"""
-        if not message:
-            return message
-
-        # 转义HTML特殊字符
-        import html
-        message = html.escape(message)
-
-        # 处理特别长的消息（超过100个字符）
-        if len(message) > 100:
-            # 在合适的位置插入换行
-            formatted_lines = []
-            current_line = ""
-
-            # 按空格分割，但保持完整性
-            words = message.split(' ')
-
-            for word in words:
-                # 如果当前行加上新词超过100字符，就换行
-                if len(current_line + ' ' + word) > 100 and current_line:
-                    formatted_lines.append(current_line.strip())
-                    current_line = word
-                else:
-                    if current_line:
-                        current_line += ' ' + word
-                    else:
-                        current_line = word
-
-                # 如果单个词就很长，强制在合适位置换行
-                if len(current_line) > 120:
-                    # 寻找合适的分割点（逗号、分号、等号等）
-                    split_chars = [',', ';', '=', ':', '-', '_']
-                    best_split = -1
-
-                    for i in range(80, min(len(current_line), 120)):
-                        if current_line[i] in split_chars:
-                            best_split = i + 1
-                            break
-
-                    if best_split > 0:
-                        formatted_lines.append(current_line[:best_split])
-                        current_line = current_line[best_split:]
-
-            # 添加最后一行
-            if current_line:
-                formatted_lines.append(current_line.strip())
-
-            return '\n'.join(formatted_lines)
-
-        return message
+        self.lineAdded.emit(self.index.add(message, msg_type, wall_time))
 
     def clear_log(self):
         """清除日志"""
         self.clear()
         self.log_content.clear()
+        self.index.clear()
+        self._cursor = QTextCursor(self.document())
+        self.logCleared.emit()
 
     def get_log_content(self):
         """获取日志内容"""
@@ -398,4 +544,194 @@ class LogTextEdit(QTextEdit):
 
         # 自动滚动到底部
         scrollbar = self.verticalScrollBar()
-        scrollbar.setValue(scrollbar.maximum())
\ No newline at end of file
+        scrollbar.setValue(scrollbar.maximum())
+
+class LogFilterBar(QWidget):
+    """控制台过滤栏 - 按类型、文本/正则、错误码前缀和时间范围过滤"""
+
+    filterChanged = pyqtSignal(object)  # LogFilter，条件为空时为None
+
+    TYPE_NAMES = [
+        ((MessageType.ERROR, MessageType.RESPONSE_ERROR), "错误"),
+        ((MessageType.WARNING,), "警告"),
+        ((MessageType.SUCCESS,), "成功"),
+        ((MessageType.SENT,), "发送"),
+        ((MessageType.RECEIVED, MessageType.RESPONSE_OK, MessageType.RESPONSE_ERROR,
+          MessageType.RESPONSE_DATA), "接收"),
+        ((MessageType.RESPONSE_OK,), "接收: OK"),
+        ((MessageType.RESPONSE_ERROR,), "接收: ERROR"),
+        ((MessageType.RESPONSE_DATA,), "接收: 日志数据"),
+        ((MessageType.RECEIVED,), "接收: 文本"),
+        ((MessageType.INFO,), "信息"),
+    ]
+
+    def __init__(self):
+        super().__init__()
+        layout = QHBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.setSpacing(6)
+
+        self.type_combo = QComboBox()
+        self.type_combo.addItem("全部类型", None)
+        for msg_types, name in self.TYPE_NAMES:
+            self.type_combo.addItem(name, msg_types)
+
+        self.text_input = QLineEdit()
+        self.text_input.setPlaceholderText("搜索文本...")
+        self.regex_check = QCheckBox("正则")
+
+        self.code_input = QLineEdit()
+        self.code_input.setPlaceholderText("错误码前缀")
+        self.code_input.setMaximumWidth(120)
+
+        self.time_check = QCheckBox("时间")
+        self.start_edit = QTimeEdit(QTime(0, 0, 0))
+        self.end_edit = QTimeEdit(QTime(23, 59, 59))
+        for edit in (self.start_edit, self.end_edit):
+            edit.setDisplayFormat("HH:mm:ss")
+            edit.setEnabled(False)
+
+        self.reset_btn = QPushButton("✖")
+        self.reset_btn.setToolTip("清除过滤条件")
+        self.reset_btn.setFixedWidth(36)
+
+        for widget in (self.type_combo, self.text_input, self.regex_check, self.code_input,
+                       self.time_check, self.start_edit, self.end_edit, self.reset_btn):
+            layout.addWidget(widget)
+
+        # 输入防抖，避免每次按键都查询
+        self._debounce = QTimer(self)
+        self._debounce.setSingleShot(True)
+        self._debounce.setInterval(150)
+        self._debounce.timeout.connect(self._emit_filter)
+
+        self.type_combo.currentIndexChanged.connect(self._debounce.start)
+        self.text_input.textChanged.connect(self._debounce.start)
+        self.regex_check.toggled.connect(self._debounce.start)
+        self.code_input.textChanged.connect(self._debounce.start)
+        self.time_check.toggled.connect(self.start_edit.setEnabled)
+        self.time_check.toggled.connect(self.end_edit.setEnabled)
+        self.time_check.toggled.connect(self._debounce.start)
+        self.start_edit.timeChanged.connect(self._debounce.start)
+        self.end_edit.timeChanged.connect(self._debounce.start)
+        self.reset_btn.clicked.connect(self.reset)
+
+    def current_filter(self):
+        """根据输入生成LogFilter，无条件时返回None"""
+        msg_types = self.type_combo.currentData()
+        start_time = end_time = None
+        if self.time_check.isChecked():
+            start_time, end_time = self._time_range()
+
+        log_filter = LogFilter(
+            types=list(msg_types) if msg_types is not None else None,
+            text=self.text_input.text(),
+            regex=self.regex_check.isChecked(),
+            error_prefix=self.code_input.text(),
+            start_time=start_time,
+            end_time=end_time,
+        )
+        return None if log_filter.is_empty() else log_filter
+
+    def _time_range(self):
+        """把当天的起止时间转换为时间戳，结束早于开始时视为跨天"""
+        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        start, end = self.start_edit.time(), self.end_edit.time()
+        start_dt = today + timedelta(hours=start.hour(), minutes=start.minute(), seconds=start.second())
+        end_dt = today + timedelta(hours=end.hour(), minutes=end.minute(), seconds=end.second() + 1)
+        if end_dt <= start_dt:
+            end_dt += timedelta(days=1)
+        return start_dt.timestamp(), end_dt.timestamp()
+
+    def reset(self):
+        """清除所有过滤条件"""
+        self.type_combo.setCurrentIndex(0)
+        self.text_input.clear()
+        self.regex_check.setChecked(False)
+        self.code_input.clear()
+        self.time_check.setChecked(False)
+
+    def _emit_filter(self):
+        self.filterChanged.emit(self.current_filter())
+
+
+class FilteredLogModel(QAbstractListModel):
+    """过滤结果模型 - 只保存命中的行号，显示时按需读取日志文本"""
+
+    def __init__(self, log_text):
+        super().__init__()
+        self.log_text = log_text
+        self.ids = []
+        self.colors = {t: QColor(color) for t, (color, _) in MESSAGE_STYLES.items()}
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.ids)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        line_id = self.ids[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return self.log_text.log_content[line_id]
+        if role == Qt.ItemDataRole.ForegroundRole:
+            return self.colors[self.log_text.index.types[line_id]]
+        return None
+
+    def set_ids(self, ids):
+        """替换全部结果"""
+        self.beginResetModel()
+        self.ids = ids
+        self.endResetModel()
+
+    def append_id(self, line_id):
+        """过滤生效期间追加新命中的行"""
+        row = len(self.ids)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.ids.append(line_id)
+        self.endInsertRows()
+
+
+class FilteredLogView(QListView):
+    """过滤结果视图 - 不修改控制台文档，结果行按需绘制"""
+
+    def __init__(self, log_text):
+        super().__init__()
+        self.log_text = log_text
+        self.log_filter = None
+        self.model_ = FilteredLogModel(log_text)
+        self.setModel(self.model_)
+        self.setUniformItemSizes(True)
+        self.setWordWrap(False)
+        self.setStyleSheet("""
+            QListView {
+                background: #1e1e1e;
+                border: 1px solid #333;
+                border-radius: 8px;
+                padding: 12px;
+                font-family: 'Consolas', 'Monaco', 'Courier New', monospace;
+                font-size: 13px;
+                selection-background-color: #3390ff;
+            }
+        """)
+
+        log_text.lineAdded.connect(self.on_line_added)
+        log_text.logCleared.connect(self.on_log_cleared)
+
+    def set_filter(self, log_filter):
+        """应用过滤条件，None表示取消过滤"""
+        self.log_filter = log_filter
+        ids = self.log_text.index.query(log_filter) if log_filter else []
+        self.model_.set_ids(ids)
+        self.scrollToBottom()
+
+    def on_log_cleared(self):
+        """控制台日志被清除"""
+        self.model_.set_ids([])
+
+    def on_line_added(self, line_id):
+        """新日志到达时只检查这一行"""
+        if self.log_filter is None:
+            return
+        if self.log_text.index.matches(line_id, self.log_filter):
+            self.model_.append_id(line_id)
+            self.scrollToBottom()